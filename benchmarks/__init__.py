@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup():
+    sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_store.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases, \
+        teardown_test_environment
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def timer(results, name):
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
@@ -0,0 +1,93 @@
+"""
+Latency of POST /orders/assign as completed orders pile up in the live orders table, and after
+`manage.py archive_orders` moves them to the archive.
+
+    python -m benchmarks.bench_archive [requests] [history rows ...]
+"""
+import json
+import random
+import sys
+import time
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from benchmarks.servers import percentile  # noqa: E402
+from delivery_service.archive import archive_orders  # noqa: E402
+from delivery_service.models import DeliveryBatchModel, DeliveryIntervalModel, OrderModel  # noqa: E402
+
+COURIERS = 200
+ORDERS = 20000
+HISTORY_START = 1000001
+
+
+def seed(client):
+    client.post(reverse('import_couriers'), content_type='application/json', data=json.dumps({'data': [
+        {'courier_id': courier_id, 'courier_type': 'car', 'regions': random.sample(range(1, 101), 3),
+         'working_hours': ['09:00-18:00']} for courier_id in range(1, COURIERS + 1)]}))
+    client.post(reverse('import_orders'), content_type='application/json', data=json.dumps({'data': [
+        {'order_id': order_id, 'weight': round(random.uniform(0.01, 5), 2), 'region': random.randint(1, 100),
+         'delivery_hours': ['10:00-12:00']} for order_id in range(1, ORDERS + 1)]}))
+
+
+def add_history(first_id, last_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO {} (order_id, weight, region, delivery_hours, courier_id, courier_salary_coefficient, "
+            "assign_time, complete_time, delivery_time) "
+            "SELECT g, 1.0, g %% 100 + 1, '{{{{10:00,12:00}}}}', g %% %s + 1, 9, now() - interval '30 days', "
+            "now() - interval '30 days' + interval '30 minutes', 1800 FROM generate_series(%s, %s) g"
+            .format(OrderModel._meta.db_table), [COURIERS, first_id, last_id])
+        cursor.execute("INSERT INTO {} (order_id, minutes) SELECT g, int4range(600, 721) "
+                       "FROM generate_series(%s, %s) g".format(DeliveryIntervalModel._meta.db_table),
+                       [first_id, last_id])
+        cursor.execute('VACUUM ANALYZE')
+
+
+def assign_latencies(client, requests):
+    result = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.post(reverse('assign_orders'), content_type='application/json',
+                               data=json.dumps({'courier_id': random.randint(1, COURIERS)}))
+        result.append(time.perf_counter() - start)
+        assert response.status_code == 200
+        OrderModel.objects.filter(order_id__in=[order['id'] for order in json.loads(response.content)['orders']]) \
+            .update(courier=None, assign_time=None, courier_salary_coefficient=None)
+        DeliveryBatchModel.objects.all().delete()
+    return sorted(result)
+
+
+def main(requests, history):
+    random.seed(0)
+    client = Client()
+    seed(client)
+    print('{:>12} {:>10} {:>10} {:>10}'.format('history', 'table', 'p50 ms', 'p99 ms'))
+    total = 0
+    for rows in history:
+        add_history(HISTORY_START + total, HISTORY_START + rows - 1)
+        total = rows
+        result = assign_latencies(client, requests)
+        print('{:>12} {:>10} {:>10.2f} {:>10.2f}'.format(total, 'live', percentile(result, 0.5),
+                                                         percentile(result, 0.99)))
+    start = time.perf_counter()
+    moved = archive_orders(timezone.now(), 5000)
+    elapsed = time.perf_counter() - start
+    with connection.cursor() as cursor:
+        cursor.execute('VACUUM ANALYZE')
+    result = assign_latencies(client, requests)
+    print('{:>12} {:>10} {:>10.2f} {:>10.2f}'.format(total, 'archived', percentile(result, 0.5),
+                                                     percentile(result, 0.99)))
+    print('archived {} orders in {:.1f} s ({:.0f} rows/s)'.format(moved, elapsed, moved / elapsed))
+
+
+if __name__ == '__main__':
+    with test_database():
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+             [int(arg) for arg in sys.argv[2:]] or [0, 100000, 1000000])
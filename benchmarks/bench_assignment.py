@@ -0,0 +1,44 @@
+"""
+Latency and packing quality of the /orders/assign engines on synthetic open orders.
+
+    python -m benchmarks.bench_assignment [sizes...]
+"""
+import random
+import sys
+import time
+
+from benchmarks import setup
+
+setup()
+
+from delivery_service.assignment import Candidate, ENGINES, smallest_first, weight_units  # noqa: E402
+from delivery_service.utils import courier_capacity_and_salary_coefficient  # noqa: E402
+
+
+def candidates(size):
+    return [Candidate(order_id, weight_units(random.uniform(0.01, 50) ** random.uniform(0.5, 1)),
+                      random.randrange(8 * 60, 22 * 60))
+            for order_id in range(size)]
+
+
+def main(sizes):
+    random.seed(0)
+    print('{:>7} {:>5} {:>9} {:>11} {:>7} {:>8} {:>12}'.format(
+        'orders', 'type', 'engine', 'latency ms', 'orders', 'max', 'utilization'))
+    for size in sizes:
+        pool = candidates(size)
+        for courier_type in ('foot', 'bike', 'car'):
+            capacity = weight_units(courier_capacity_and_salary_coefficient(courier_type)['capacity'])
+            best_count = len(smallest_first(pool, capacity))
+            for name, engine in ENGINES.items():
+                start = time.perf_counter()
+                chosen = engine(pool, capacity)
+                latency = (time.perf_counter() - start) * 1000
+                packed = sum(candidate.weight for candidate in chosen)
+                assert packed <= capacity
+                print('{:>7} {:>5} {:>9} {:>11.2f} {:>7} {:>8} {:>11.1f}%'.format(
+                    size, courier_type, name, latency, len(chosen), best_count, packed / capacity * 100))
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,77 @@
+"""
+Per-endpoint request latency with SERIALIZER_CODEC='drf' against SERIALIZER_CODEC='fast'.
+
+    python -m benchmarks.bench_codec [orders]
+"""
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from delivery_service.models import CourierModel, OrderModel  # noqa: E402
+
+
+def timed(results, name, function, *args):
+    start = time.perf_counter()
+    response = function(*args)
+    results.setdefault(name, []).append(time.perf_counter() - start)
+    assert response.status_code < 400, response.content
+    return response
+
+
+def run(client, orders):
+    post = lambda url, data: client.post(url, data=json.dumps(data), content_type='application/json')  # noqa: E731
+    results = {}
+    couriers = [{'courier_id': courier_id, 'courier_type': 'car', 'regions': [1, 2, 3],
+                 'working_hours': ['09:00-13:00', '14:00-18:00']} for courier_id in range(1, 101)]
+    payload = [{'order_id': order_id, 'weight': round(random.uniform(0.01, 2), 2), 'region': random.randint(1, 3),
+                'delivery_hours': ['10:00-12:00', '16:00-21:30']} for order_id in range(1, orders + 1)]
+    for start in range(0, len(couriers), 10):
+        timed(results, 'POST /couriers (10)', post, reverse('import_couriers'), {'data': couriers[start:start + 10]})
+    for start in range(0, len(payload), 100):
+        timed(results, 'POST /orders (100)', post, reverse('import_orders'), {'data': payload[start:start + 100]})
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    for courier in couriers:
+        timed(results, 'GET /couriers/<id>', client.get, reverse('modify_courier', args=[courier['courier_id']]))
+        timed(results, 'PATCH /couriers/<id>', client.patch, reverse('modify_courier', args=[courier['courier_id']]),
+              json.dumps({'regions': [1, 2, 3, 4]}), 'application/json')
+    assigned = []
+    for courier in couriers:
+        response = timed(results, 'POST /orders/assign', post, reverse('assign_orders'),
+                         {'courier_id': courier['courier_id']})
+        assigned += [(courier['courier_id'], order['id']) for order in json.loads(response.content)['orders']]
+    complete_time = datetime.now(timezone.utc) + timedelta(hours=1)
+    for courier_id, order_id in assigned[:1000]:
+        timed(results, 'POST /orders/complete', post, reverse('complete_order'),
+              {'courier_id': courier_id, 'order_id': order_id, 'complete_time': complete_time.isoformat()})
+    return results
+
+
+def main(orders):
+    client = Client()
+    measurements = {}
+    for codec in ('drf', 'fast'):
+        random.seed(0)
+        with override_settings(SERIALIZER_CODEC=codec, COURIER_CACHE_TIMEOUT=0):
+            measurements[codec] = run(client, orders)
+        OrderModel.objects.all().delete()
+        CourierModel.objects.all().delete()
+    print('{:>22} {:>9} {:>9} {:>9}'.format('endpoint', 'drf ms', 'fast ms', 'speedup'))
+    for name in measurements['drf']:
+        drf, fast = statistics.mean(measurements['drf'][name]), statistics.mean(measurements['fast'][name])
+        print('{:>22} {:>9.3f} {:>9.3f} {:>8.2f}x'.format(name, drf * 1000, fast * 1000, drf / fast))
+
+
+if __name__ == '__main__':
+    with test_database():
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
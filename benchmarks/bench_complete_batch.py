@@ -0,0 +1,74 @@
+"""
+Time to sync a backlog of completions of one courier with POST /orders/complete per order against one
+POST /orders/complete/batch.
+
+    python -m benchmarks.bench_complete_batch [orders per backlog ...]
+"""
+import datetime
+import json
+import sys
+import time
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from delivery_service.models import CourierModel, DeliveryBatchModel, OrderModel  # noqa: E402
+from delivery_service.outbox import process_events  # noqa: E402
+
+ASSIGN_TIME = datetime.datetime(2021, 1, 10, 9, 0, tzinfo=datetime.timezone.utc)
+
+
+def backlog(client, courier_id, first_id, size):
+    client.post(reverse('import_couriers'), content_type='application/json', data=json.dumps({'data': [
+        {'courier_id': courier_id, 'courier_type': 'car', 'regions': [1, 2, 3], 'working_hours': ['09:00-18:00']}]}))
+    client.post(reverse('import_orders'), content_type='application/json', data=json.dumps({'data': [
+        {'order_id': order_id, 'weight': 0.1, 'region': order_id % 3 + 1, 'delivery_hours': ['10:00-12:00']}
+        for order_id in range(first_id, first_id + size)]}))
+    batch = DeliveryBatchModel.objects.create(courier_id=courier_id, assign_time=ASSIGN_TIME, open_orders=size)
+    OrderModel.objects.filter(order_id__gte=first_id, order_id__lt=first_id + size).update(
+        courier_id=courier_id, assign_time=ASSIGN_TIME, courier_salary_coefficient=9, batch=batch)
+    return [{'courier_id': courier_id, 'order_id': order_id,
+             'complete_time': (ASSIGN_TIME + datetime.timedelta(minutes=order_id - first_id + 1)).isoformat()}
+            for order_id in range(first_id, first_id + size)]
+
+
+def single(client, items):
+    for item in items:
+        response = client.post(reverse('complete_order'), content_type='application/json', data=json.dumps(item))
+        assert response.status_code == 200, response.content
+
+
+def batch(client, items):
+    response = client.post(reverse('batch_complete_orders'), content_type='application/json',
+                           data=json.dumps({'data': items}))
+    assert len(response.json()['orders']) == len(items), response.content
+
+
+def main(sizes):
+    client = Client()
+    print('{:>8} {:>16} {:>10} {:>10}'.format('orders', 'method', 'ms', 'queries'))
+    courier_id = 0
+    for size in sizes:
+        results = {}
+        for name, run in (('complete', single), ('complete/batch', batch)):
+            courier_id += 1
+            items = backlog(client, courier_id, courier_id * 100000, size)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                run(client, items)
+                elapsed = time.perf_counter() - start
+            process_events(1000)
+            results[name] = CourierModel.objects.values_list('earnings', 'rating').get(courier_id=courier_id)
+            print('{:>8} {:>16} {:>10.1f} {:>10}'.format(size, name, elapsed * 1000, len(queries)))
+        assert len(set(results.values())) == 1, results
+
+
+if __name__ == '__main__':
+    with test_database(), override_settings(DEBUG=True):
+        main([int(arg) for arg in sys.argv[1:]] or [10, 50, 200])
@@ -0,0 +1,51 @@
+"""
+Latency of GET /couriers/<id> with the read-through cache against COURIER_CACHE_TIMEOUT=0.
+
+    python -m benchmarks.bench_courier_cache [requests]
+"""
+import json
+import random
+import statistics
+import sys
+import time
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from delivery_service import cache as courier_cache  # noqa: E402
+
+
+def latencies(client, courier_ids):
+    result = []
+    for courier_id in courier_ids:
+        start = time.perf_counter()
+        response = client.get(reverse('modify_courier', args=[courier_id]))
+        result.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return result
+
+
+def main(requests):
+    random.seed(0)
+    client = Client()
+    client.post(reverse('import_couriers'), content_type='application/json', data=json.dumps({'data': [
+        {'courier_id': courier_id, 'courier_type': 'bike', 'regions': [1, 2, 3],
+         'working_hours': ['09:00-13:00', '14:00-18:00']} for courier_id in range(1, 101)]}))
+    courier_ids = [random.randint(1, 100) for _ in range(requests)]
+    print('{:>9} {:>10} {:>10} {:>10}'.format('', 'mean ms', 'p50 ms', 'p99 ms'))
+    for name, timeout in (('uncached', 0), ('cached', 300)):
+        with override_settings(COURIER_CACHE_TIMEOUT=timeout):
+            result = sorted(latencies(client, courier_ids))
+        print('{:>9} {:>10.3f} {:>10.3f} {:>10.3f}'.format(name, statistics.mean(result) * 1000,
+                                                          result[len(result) // 2] * 1000,
+                                                          result[int(len(result) * 0.99)] * 1000))
+    print('cache hits: {}, misses: {}'.format(courier_cache.lookups.value(('hit',)),
+                                              courier_cache.lookups.value(('miss',))))
+
+
+if __name__ == '__main__':
+    with test_database():
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
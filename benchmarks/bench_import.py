@@ -0,0 +1,62 @@
+"""
+Rows/sec of POST /couriers and POST /orders: bulk path against the old per-row path.
+
+    python -m benchmarks.bench_import [sizes...]
+"""
+import json
+import random
+import sys
+
+from benchmarks import setup, test_database, timer
+
+setup()
+
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from rest_framework import serializers  # noqa: E402
+from delivery_service.models import CourierModel, OrderModel  # noqa: E402
+from delivery_service.serializers import CourierSerializer, OrderSerializer  # noqa: E402
+
+
+def couriers_payload(size):
+    return [{'courier_id': i, 'courier_type': random.choice(('foot', 'bike', 'car')),
+             'regions': random.sample(range(1, 100), 3), 'working_hours': ['09:00-13:00', '14:00-18:00']}
+            for i in range(1, size + 1)]
+
+
+def orders_payload(size):
+    return [{'order_id': i, 'weight': round(random.uniform(0.01, 50), 2), 'region': random.randint(1, 100),
+             'delivery_hours': ['10:00-12:00', '16:00-21:30']} for i in range(1, size + 1)]
+
+
+def per_row_import(serializer_class, payload):
+    serialized = serializers.ListSerializer(child=serializer_class(), data=payload)
+    serialized.is_valid()
+    serialized.save()
+
+
+def main(sizes):
+    random.seed(0)
+    client = Client()
+    print('{:>8} {:>8} {:>14} {:>14}'.format('kind', 'rows', 'bulk rows/s', 'per-row rows/s'))
+    for name, url, model, serializer_class, payload_factory in (
+            ('couriers', reverse('import_couriers'), CourierModel, CourierSerializer, couriers_payload),
+            ('orders', reverse('import_orders'), OrderModel, OrderSerializer, orders_payload)):
+        for size in sizes:
+            payload = payload_factory(size)
+            body = json.dumps({'data': payload})
+            results = {}
+            with timer(results, 'bulk'):
+                response = client.post(url, data=body, content_type='application/json')
+            assert response.status_code == 201, response.content
+            model.objects.all().delete()
+            with timer(results, 'per_row'):
+                per_row_import(serializer_class, payload)
+            model.objects.all().delete()
+            print('{:>8} {:>8} {:>14.0f} {:>14.0f}'.format(name, size, size / results['bulk'],
+                                                           size / results['per_row']))
+
+
+if __name__ == '__main__':
+    with test_database():
+        main([int(size) for size in sys.argv[1:]] or [1000, 10000, 100000])
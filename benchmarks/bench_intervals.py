@@ -0,0 +1,42 @@
+"""
+Parsing and formatting of "HH:MM-HH:MM" intervals: delivery_service.intervals against datetime.strptime/strftime.
+
+    python -m benchmarks.bench_intervals [orders]
+"""
+import random
+import sys
+import timeit
+from datetime import datetime
+
+from benchmarks import setup
+
+setup()
+
+from delivery_service.intervals import parse_intervals, format_intervals  # noqa: E402
+
+
+def strptime_parse(values):
+    return [[datetime.strptime(x, '%H:%M').time() for x in value.split('-')] for value in values]
+
+
+def strftime_format(time_ranges):
+    return ['-'.join(x.strftime('%H:%M') for x in time_range) for time_range in time_ranges]
+
+
+def main(orders):
+    random.seed(0)
+    pool = ['{:02d}:{:02d}-{:02d}:{:02d}'.format(hour, minute, hour + length, minute)
+            for hour in range(6, 18) for minute in range(0, 60, 5) for length in (1, 2, 3)]
+    payload = [random.sample(pool, 2) for _ in range(orders)]
+    parsed = [parse_intervals(values) for values in payload]
+    print('{} orders, {} distinct intervals'.format(orders, len(pool)))
+    for name, function, data in (('strptime parse', strptime_parse, payload),
+                                 ('codec parse', parse_intervals, payload),
+                                 ('strftime format', strftime_format, parsed),
+                                 ('codec format', format_intervals, parsed)):
+        seconds = min(timeit.repeat(lambda: [function(item) for item in data], number=1, repeat=5))
+        print('{:>16}: {:8.1f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
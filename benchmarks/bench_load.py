@@ -0,0 +1,78 @@
+"""
+Rows/sec of loading orders with `manage.py load_orders` (CSV and NDJSON) against POST /orders in batches of 10000,
+with the seconds load_orders spends reading and validating, in COPY and in the merge.
+
+    python -m benchmarks.bench_load [orders ...]
+"""
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from io import StringIO
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.generator import Generator, batches  # noqa: E402
+from delivery_service.models import DeliveryIntervalModel, OrderModel  # noqa: E402
+
+POST_BATCH = 10000
+
+
+def write_files(directory, size):
+    csv_path, ndjson_path = os.path.join(directory, 'orders.csv'), os.path.join(directory, 'orders.ndjson')
+    with open(csv_path, 'w', newline='') as csv_file, open(ndjson_path, 'w') as ndjson_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['order_id', 'weight', 'region', 'delivery_hours'])
+        for order in Generator().orders(size):
+            writer.writerow([order['order_id'], order['weight'], order['region'], ' '.join(order['delivery_hours'])])
+            ndjson_file.write(json.dumps(order) + '\n')
+    return csv_path, ndjson_path
+
+
+def clear():
+    DeliveryIntervalModel.objects.all().delete()
+    OrderModel.objects.all().delete()
+
+
+def post_orders(size):
+    client = Client()
+    for batch in batches(Generator().orders(size), POST_BATCH):
+        response = client.post(reverse('import_orders'), data=json.dumps({'data': batch}),
+                               content_type='application/json')
+        assert response.status_code == 201, response.content[:1000]
+
+
+def load_orders(path):
+    # the phases from the last line of the command output: "... rows/s: validation 1.0 s, COPY 1.2 s, merge 2.9 s"
+    output = StringIO()
+    call_command('load_orders', path, stdout=output)
+    return output.getvalue().splitlines()[-1].split(': ', 1)[1]
+
+
+def main(sizes):
+    print('{:>10} {:>14} {:>10} {:>10}  {}'.format('orders', 'method', 'seconds', 'rows/s', 'phases'))
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path, ndjson_path = write_files(directory, size)
+            for name, run in (('POST /orders', lambda: post_orders(size)),
+                              ('load csv', lambda: load_orders(csv_path)),
+                              ('load ndjson', lambda: load_orders(ndjson_path))):
+                start = time.perf_counter()
+                phases = run() or ''
+                elapsed = time.perf_counter() - start
+                assert OrderModel.objects.count() == size
+                clear()
+                print('{:>10} {:>14} {:>10.1f} {:>10.0f}  {}'.format(size, name, elapsed, size / elapsed, phases))
+
+
+if __name__ == '__main__':
+    with test_database(), override_settings(DEBUG=False):
+        main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
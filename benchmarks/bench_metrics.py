@@ -0,0 +1,64 @@
+"""
+Overhead of delivery_service.metrics: latency of GET /couriers/<id> and POST /orders/assign with METRICS_ENABLED
+on and off.
+
+    python -m benchmarks.bench_metrics [requests]
+"""
+import json
+import random
+import statistics
+import sys
+import time
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+COURIERS = 100
+
+
+def get_courier(client):
+    return client.get(reverse('modify_courier', args=[random.randint(1, COURIERS)]))
+
+
+def assign(client):
+    return client.post(reverse('assign_orders'), data=json.dumps({'courier_id': random.randint(1, COURIERS)}),
+                       content_type='application/json')
+
+
+def latencies(request, requests):
+    client = Client()
+    result = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = request(client)
+        result.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return sorted(result)
+
+
+def main(requests):
+    random.seed(0)
+    client = Client()
+    client.post(reverse('import_couriers'), content_type='application/json', data=json.dumps({'data': [
+        {'courier_id': courier_id, 'courier_type': 'foot', 'regions': [1, 2, 3],
+         'working_hours': ['09:00-13:00', '14:00-18:00']} for courier_id in range(1, COURIERS + 1)]}))
+    client.post(reverse('import_orders'), content_type='application/json', data=json.dumps({'data': [
+        {'order_id': order_id, 'weight': 0.5, 'region': order_id % 3 + 1, 'delivery_hours': ['10:00-12:00']}
+        for order_id in range(1, 10001)]}))
+    print('{:>8} {:>8} {:>10} {:>10} {:>10}'.format('', 'metrics', 'mean ms', 'p50 ms', 'p99 ms'))
+    for name, request in (('get', get_courier), ('assign', assign)):
+        for enabled in (False, True, False, True):
+            with override_settings(METRICS_ENABLED=enabled, COURIER_CACHE_TIMEOUT=0):
+                result = latencies(request, requests)
+            print('{:>8} {:>8} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+                name, 'on' if enabled else 'off', statistics.mean(result) * 1000, result[len(result) // 2] * 1000,
+                result[int(len(result) * 0.99)] * 1000))
+
+
+if __name__ == '__main__':
+    with test_database():
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
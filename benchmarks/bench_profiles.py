@@ -0,0 +1,99 @@
+"""
+Cost of the default settings profile against the API-only one (API_ONLY=1): cold start of a worker process
+(interpreter, Django setup, WSGI application and the first GET /couriers/<id>), imported modules and peak memory, and
+the latency of GET /couriers/<id> requests, where the two profiles differ only in the middleware stack.
+
+    python -m benchmarks.bench_profiles [starts] [requests]
+
+Every start and every latency run is a fresh process, as settings are read once per process.
+"""
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks import BASE_DIR
+
+COURIERS = 100
+
+
+def get_courier(application, courier_id):
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/couriers/{}'.format(courier_id), 'QUERY_STRING': '',
+               'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'wsgi.input': io.BytesIO(),
+               'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr}
+    statuses = []
+    body = b''.join(application(environ, lambda status, headers: statuses.append(status)))
+    assert statuses == ['200 OK'], (statuses, body)
+
+
+def child(requests):
+    sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_store.settings')
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+    get_courier(application, 1)
+    print(json.dumps({'modules': len(sys.modules),
+                      'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}), flush=True)
+    for courier_id in range(1, COURIERS + 1):
+        get_courier(application, courier_id)
+    random.seed(0)
+    timings = []
+    for _ in range(requests):
+        courier_id = random.randint(1, COURIERS)
+        start = time.perf_counter()
+        get_courier(application, courier_id)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(json.dumps({'mean': sum(timings) / len(timings) if timings else 0,
+                      'p50': timings[len(timings) // 2] if timings else 0}), flush=True)
+
+
+def run(api_only, database, requests):
+    env = dict(os.environ, API_ONLY=str(api_only), DEBUG='0', SQL_DATABASE=database, SQL_CONN_MAX_AGE='60',
+               PYTHONWARNINGS='ignore')
+    env.pop('DJANGO_SETTINGS_MODULE', None)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.bench_profiles', '--child', str(requests)],
+                               cwd=BASE_DIR, env=env, stdout=subprocess.PIPE, text=True)
+    started = json.loads(process.stdout.readline())
+    started['start'] = time.perf_counter() - start
+    started.update(json.loads(process.stdout.readline()))
+    assert process.wait() == 0
+    return started
+
+
+def main(starts, requests):
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    Client().post(reverse('import_couriers'), content_type='application/json', data=json.dumps({'data': [
+        {'courier_id': courier_id, 'courier_type': 'foot', 'regions': [1, 2, 3], 'working_hours': ['09:00-18:00']}
+        for courier_id in range(1, COURIERS + 1)]}))
+    database = connection.settings_dict['NAME']
+    results = {0: [], 1: []}
+    for _ in range(starts):
+        for api_only in results:
+            results[api_only].append(run(api_only, database, 0))
+    print('{:>10} {:>14} {:>10} {:>10} {:>16} {:>16}'.format('profile', 'start p50 ms', 'modules', 'rss MB',
+                                                             'request mean us', 'request p50 us'))
+    for api_only, runs in results.items():
+        latency = run(api_only, database, requests)
+        start = sorted(result['start'] for result in runs)[len(runs) // 2]
+        print('{:>10} {:>14.1f} {:>10} {:>10.1f} {:>16.1f} {:>16.1f}'.format(
+            'api-only' if api_only else 'default', start * 1000, runs[0]['modules'], runs[0]['rss'],
+            latency['mean'] * 1e6, latency['p50'] * 1e6))
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        child(int(sys.argv[2]))
+    else:
+        from benchmarks import setup, test_database
+        setup()
+        with test_database():
+            main(*[int(arg) for arg in sys.argv[1:]] or [20, 20000])
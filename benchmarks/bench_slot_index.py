@@ -0,0 +1,76 @@
+"""
+Candidate orders of a courier from the SQL interval overlap query of POST /orders/assign against the in-process
+bitmap index (delivery_service.slots) on a table of unassigned orders.
+
+    python -m benchmarks.bench_slot_index [orders] [couriers]
+
+Orders are loaded with `manage.py load_orders`; the candidates of every courier are checked to be the same.
+"""
+import sys
+import tempfile
+import time
+from io import StringIO
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from benchmarks.bench_load import write_files  # noqa: E402
+from benchmarks.generator import Generator  # noqa: E402
+from benchmarks.servers import percentile  # noqa: E402
+from delivery_service import slots  # noqa: E402
+from delivery_service.assignment import order_candidates, weight_units  # noqa: E402
+from delivery_service.intervals import parse_intervals  # noqa: E402
+from delivery_service.models import OrderModel  # noqa: E402
+from delivery_service.utils import courier_capacity_and_salary_coefficient, time_overlap  # noqa: E402
+
+
+def query_candidates(regions, working_hours, capacity):
+    query_set = OrderModel.objects.filter(assign_time=None, region__in=regions, weight__lte=capacity / 100)
+    return order_candidates(time_overlap(query_set, working_hours))
+
+
+def main(orders, couriers):
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        call_command('load_orders', write_files(directory, orders)[0], stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM ANALYZE')
+        print('loaded {} orders in {:.1f} s'.format(orders, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    index = slots.SlotIndex(slots.unassigned_orders())
+    size = sum(getattr(group, name).nbytes for group in index.groups.values() for name in slots.SlotGroup.arrays)
+    print('built the index in {:.1f} s, {:.0f} MB of arrays'.format(time.perf_counter() - start, size / 2 ** 20))
+
+    generator = Generator(1)
+    timings = {'sql': [], 'index': []}
+    found = 0
+    for courier in generator.couriers(couriers):
+        regions, working_hours = courier['regions'], parse_intervals(courier['working_hours'])
+        capacity = weight_units(courier_capacity_and_salary_coefficient(courier['courier_type'])['capacity'])
+        start = time.perf_counter()
+        expected = query_candidates(regions, working_hours, capacity)
+        timings['sql'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        result = index.candidates(regions, working_hours, capacity)
+        timings['index'].append(time.perf_counter() - start)
+        assert sorted(result) == sorted(expected), courier
+        found += len(result)
+
+    print('{} couriers, {:.0f} candidates on average'.format(couriers, found / couriers))
+    print('{:>8} {:>10} {:>10}'.format('', 'p50 ms', 'p99 ms'))
+    for name, values in timings.items():
+        values.sort()
+        print('{:>8} {:>10.2f} {:>10.2f}'.format(name, percentile(values, 0.5), percentile(values, 0.99)))
+
+
+if __name__ == '__main__':
+    if slots.numpy is None:
+        sys.exit('NumPy is not installed')
+    with test_database(), override_settings(DEBUG=False):
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000, int(sys.argv[2]) if len(sys.argv) > 2 else 200)
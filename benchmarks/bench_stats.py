@@ -0,0 +1,89 @@
+"""
+Latency of GET /stats and GET /stats/regions, served from the aggregate tables, as the history of completed orders
+grows, against computing the same figures from the orders on every request.
+
+    python -m benchmarks.bench_stats [completed orders ...]
+
+The history is written straight into the archive table and the aggregates are filled as by migration 0008.
+"""
+import importlib
+import sys
+import time
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.apps import apps  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Q, Sum  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from benchmarks.servers import percentile  # noqa: E402
+from delivery_service.models import ArchivedOrderModel, CourierModel, CourierTypeStatsModel, OrderModel, \
+    RegionHourStatsModel, RegionStatsModel  # noqa: E402
+
+fill_stats = importlib.import_module('delivery_service.migrations.0008_stats').fill_stats
+REGIONS = 100
+REPEAT = 50
+
+
+def write_history(size):
+    for courier_id, courier_type in enumerate(('foot', 'bike', 'car'), 1):
+        CourierModel.objects.get_or_create(courier_id=courier_id, defaults={
+            'courier_type': courier_type, 'regions': [1], 'working_hours': []})
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {} (order_id, weight, region, delivery_hours, courier_id, courier_salary_coefficient, '
+            'assign_time, complete_time, delivery_time) '
+            'SELECT n, 1, 1 + mod(n, %s), %s, 1 + mod(n, 3), 2, now() - (n + 30) * interval \'1 minute\', '
+            'now() - n * interval \'1 minute\', 1800 FROM generate_series(1, %s) AS n'.format(
+                ArchivedOrderModel._meta.db_table), [REGIONS, [], size])
+        cursor.execute('VACUUM ANALYZE')
+
+
+def from_history():
+    # what the endpoints would compute without the aggregate tables
+    figures = {}
+    for model in (OrderModel, ArchivedOrderModel):
+        figures[model] = (list(model.objects.order_by().values('region').annotate(
+            completed_orders=Count('order_id', filter=Q(complete_time__isnull=False)),
+            delivery_time_sum=Sum('delivery_time'))),
+                          model.objects.exclude(courier=None).aggregate(Sum('courier_salary_coefficient')))
+    return figures
+
+
+def measure(run):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return percentile(timings, 0.5)
+
+
+def main(sizes):
+    client = Client()
+    print('{:>10} {:>12} {:>14} {:>16} {:>14}'.format('orders', 'fill s', 'stats p50 ms', 'regions p50 ms',
+                                                       'history p50 ms'))
+    for size in sizes:
+        ArchivedOrderModel.objects.all().delete()
+        for model in (RegionStatsModel, RegionHourStatsModel, CourierTypeStatsModel):
+            model.objects.all().delete()
+        write_history(size)
+        start = time.perf_counter()
+        fill_stats(apps, None)
+        fill = time.perf_counter() - start
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        assert client.get(reverse('stats')).json()['completed_orders'] == size
+        print('{:>10} {:>12.1f} {:>14.2f} {:>16.2f} {:>14.2f}'.format(
+            size, fill, measure(lambda: client.get(reverse('stats'))),
+            measure(lambda: client.get(reverse('region_stats'))), measure(from_history)))
+
+
+if __name__ == '__main__':
+    with test_database(), override_settings(DEBUG=False):
+        main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -0,0 +1,57 @@
+"""
+Peak memory and time of importing orders through POST /orders and through POST /orders/stream.
+
+    python -m benchmarks.bench_stream_import [orders ...]
+
+The request and its body are built before measuring, so the peak is what the view allocates on top of them. POST /orders
+refuses bodies over DATA_UPLOAD_MAX_MEMORY_SIZE (2.5 MB), so the limit is lifted here to compare both on large uploads,
+and DEBUG is off so that Django does not keep the SQL of every query.
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.test import RequestFactory, override_settings  # noqa: E402
+from django.urls import resolve, reverse  # noqa: E402
+
+from benchmarks.generator import Generator  # noqa: E402
+from delivery_service.models import DeliveryIntervalModel, OrderModel  # noqa: E402
+
+
+def measure(url, body, content_type):
+    request = RequestFactory().post(url, data=body, content_type=content_type)
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = resolve(url).func(request)
+    last = b''.join(response.streaming_content)[-1000:] if response.streaming else response.content[-1000:]
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert response.status_code in (200, 201), last
+    DeliveryIntervalModel.objects.all().delete()
+    OrderModel.objects.all().delete()
+    return elapsed, peak
+
+
+def main(sizes):
+    print('{:>10} {:>10} {:>10} {:>10} {:>10}'.format('orders', 'endpoint', 'body MB', 'seconds', 'peak MB'))
+    for size in sizes:
+        orders = list(Generator().orders(size))
+        for name, url, body, content_type in (
+                ('json', reverse('import_orders'), json.dumps({'data': orders}).encode(), 'application/json'),
+                ('stream', reverse('stream_import_orders'),
+                 ''.join(json.dumps(order) + '\n' for order in orders).encode(), 'application/x-ndjson')):
+            elapsed, peak = measure(url, body, content_type)
+            print('{:>10} {:>10} {:>10.1f} {:>10.1f} {:>10.1f}'.format(size, name, len(body) / 2 ** 20, elapsed,
+                                                                     peak / 2 ** 20))
+        del orders
+
+
+if __name__ == '__main__':
+    with test_database(), override_settings(DEBUG=False, DATA_UPLOAD_MAX_MEMORY_SIZE=None):
+        main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
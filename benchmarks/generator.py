@@ -0,0 +1,78 @@
+"""
+Seeded synthetic couriers and orders for benchmarks.
+
+Region popularity follows a Zipf-like law, order weights are log-normal (most parcels are light, a few approach
+the 50 kg limit), couriers work one or two shifts and orders have one or two delivery windows during the day.
+"""
+import itertools
+import math
+import random
+
+COURIER_TYPES = ('foot', 'bike', 'car')
+COURIER_TYPE_WEIGHTS = (0.4, 0.35, 0.25)
+
+
+def hhmm(minutes):
+    return '{:02d}:{:02d}'.format(minutes // 60, minutes % 60)
+
+
+class Generator:
+    def __init__(self, seed=0, regions=100):
+        self.random = random.Random(seed)
+        self.regions = list(range(1, regions + 1))
+        self.region_weights = list(itertools.accumulate(1 / rank ** 0.8 for rank in self.regions))
+
+    def region(self):
+        return self.random.choices(self.regions, cum_weights=self.region_weights)[0]
+
+    def courier_regions(self):
+        regions = set()
+        for _ in range(self.random.randint(1, 5)):
+            regions.add(self.region())
+        return sorted(regions)
+
+    def windows(self, count, earliest, latest, shortest, longest):
+        # non-overlapping windows of whole half hours between earliest and latest minute of the day
+        result = []
+        start = earliest
+        for _ in range(count):
+            start = start + self.random.randrange(0, 4) * 30
+            end = min(start + self.random.randint(shortest, longest) * 30, latest)
+            if end <= start:
+                break
+            result.append('{}-{}'.format(hhmm(start), hhmm(end)))
+            start = end + 30
+        return result
+
+    def working_hours(self):
+        return self.windows(self.random.choice((1, 1, 2)), self.random.randint(14, 28) * 30, 23 * 60 + 30, 6, 18)
+
+    def delivery_hours(self):
+        return self.windows(self.random.choice((1, 1, 1, 2)), self.random.randint(16, 38) * 30, 23 * 60 + 30, 2, 8)
+
+    def weight(self):
+        return min(max(round(math.exp(self.random.gauss(0.5, 0.9)), 2), 0.01), 50)
+
+    def courier(self, courier_id):
+        return {'courier_id': courier_id,
+                'courier_type': self.random.choices(COURIER_TYPES, weights=COURIER_TYPE_WEIGHTS)[0],
+                'regions': self.courier_regions(), 'working_hours': self.working_hours()}
+
+    def order(self, order_id):
+        return {'order_id': order_id, 'weight': self.weight(), 'region': self.region(),
+                'delivery_hours': self.delivery_hours()}
+
+    def couriers(self, count, first_id=1):
+        return (self.courier(courier_id) for courier_id in range(first_id, first_id + count))
+
+    def orders(self, count, first_id=1):
+        return (self.order(order_id) for order_id in range(first_id, first_id + count))
+
+
+def batches(items, size):
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,60 @@
+"""
+Throughput and latency of concurrent requests served by the synchronous views over WSGI against
+delivery_service.async_views over ASGI (online_store/asgi.py), both run by uvicorn. The read mix is mostly
+GET /couriers/<id>, which ASGI serves through asyncpg; the write mix assigns orders and completes one of them, which
+ASGI runs on its pool of ASYNC_DB_THREADS threads.
+
+    python -m benchmarks.load_asgi [concurrency] [seconds] [workers]
+"""
+import datetime
+import json
+import random
+import sys
+
+from benchmarks import setup, test_database
+
+setup()
+
+from benchmarks.servers import call, load, percentile, seed, serve  # noqa: E402
+
+COURIERS = 1000
+ORDERS = 20000
+SERVERS = (('wsgi', 'online_store.wsgi:application', ['--interface', 'wsgi'], '0'),
+           ('asgi', 'online_store.asgi:application', [], '1'))
+
+
+def read(client):
+    if random.random() < 0.8:
+        call(client, 'GET', '/couriers/{}'.format(random.randint(1, COURIERS)))
+    else:
+        call(client, 'POST', '/orders/assign', {'courier_id': random.randint(1, COURIERS)})
+
+
+def write(client):
+    courier_id = random.randint(1, COURIERS)
+    orders = json.loads(call(client, 'POST', '/orders/assign', {'courier_id': courier_id}))['orders']
+    if orders:
+        complete_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=1)
+        # a client that drew the same courier may have completed the order first
+        call(client, 'POST', '/orders/complete', {'courier_id': courier_id, 'order_id': orders[0]['id'],
+                                                  'complete_time': complete_time.isoformat()}, statuses=(200, 400))
+
+
+def main(concurrency, seconds, workers):
+    seed(COURIERS, ORDERS)
+    print('{:>5} {:>5} {:>10} {:>10} {:>10} {:>12}'.format('', 'mix', 'req/s', 'p50 ms', 'p99 ms', 'connections'))
+    port = 8301
+    for mix in (read, write):
+        for name, application, options, async_views in SERVERS:
+            with serve(['uvicorn', application, '--port', str(port), '--workers', str(workers), '--no-access-log']
+                       + options, port, ASYNC_VIEWS=async_views):
+                result, connections = load(port, concurrency, seconds, mix)
+            port += 1
+            print('{:>5} {:>5} {:>10.0f} {:>10.2f} {:>10.2f} {:>12}'.format(
+                name, mix.__name__, len(result) / seconds, percentile(result, 0.5), percentile(result, 0.99),
+                connections))
+
+
+if __name__ == '__main__':
+    with test_database():
+        main(*[int(arg) for arg in sys.argv[1:4]] + [64, 10, 2][len(sys.argv[1:4]):])
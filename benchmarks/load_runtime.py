@@ -0,0 +1,43 @@
+"""
+Requests per second and database connections of GET /couriers/<id> under `manage.py runserver` with a connection
+per request against the production profile: gunicorn.conf.py with preloading and persistent connections.
+
+    python -m benchmarks.load_runtime [concurrency] [seconds] [workers]
+"""
+import random
+import sys
+
+from benchmarks import setup, test_database
+
+setup()
+
+from benchmarks.servers import call, load, percentile, seed, serve, sessions  # noqa: E402
+
+COURIERS = 1000
+
+
+def request(client):
+    call(client, 'GET', '/couriers/{}'.format(random.randint(1, COURIERS)))
+
+
+def main(concurrency, seconds, workers):
+    seed(COURIERS, 0)
+    servers = (
+        ('runserver', ['manage', 'runserver', '--noreload', '127.0.0.1:8311'], 8311, {}),
+        ('gunicorn', ['gunicorn', '-c', 'gunicorn.conf.py', 'online_store.wsgi'], 8312,
+         {'GUNICORN_BIND': '127.0.0.1:8312', 'GUNICORN_WORKERS': str(workers), 'SQL_CONN_MAX_AGE': '60'}))
+    print('{:>9} {:>10} {:>10} {:>10} {:>12} {:>16}'.format('', 'req/s', 'p50 ms', 'p99 ms', 'connections',
+                                                          'connects/request'))
+    for name, command, port, env in servers:
+        opened = sessions()
+        with serve(command, port, **env):
+            result, connections = load(port, concurrency, seconds, request)
+        opened = None if opened is None else (sessions() - opened) / len(result)
+        print('{:>9} {:>10.0f} {:>10.2f} {:>10.2f} {:>12} {:>16}'.format(
+            name, len(result) / seconds, percentile(result, 0.5), percentile(result, 0.99), connections,
+            '-' if opened is None else '{:.3f}'.format(opened)))
+
+
+if __name__ == '__main__':
+    with test_database():
+        main(*[int(arg) for arg in sys.argv[1:4]] + [32, 10, 2][len(sys.argv[1:4]):])
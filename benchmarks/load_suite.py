@@ -0,0 +1,290 @@
+"""
+Load test of all endpoints on synthetic data (benchmarks.generator): seeds couriers and orders, then runs a mix of
+import, assign, complete, patch and get requests from concurrent clients and reports throughput, p50/p95/p99
+latency and SQL queries per request for each endpoint.
+
+    python -m benchmarks.load_suite --couriers 1000 --orders 100000 --mix get=40,assign=20,complete=20,patch=10,import=10
+    python -m benchmarks.load_suite --output baseline.json
+    python -m benchmarks.load_suite --compare baseline.json --tolerance 0.2
+
+Requests go through the Django test client in this process, so SQL queries are counted per request; with --http
+they are sent to gunicorn (gunicorn.conf.py) started against the same test database instead.
+"""
+import argparse
+import datetime
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks import setup, test_database
+
+setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from delivery_service.models import OrderModel  # noqa: E402
+
+from benchmarks.generator import Generator, batches  # noqa: E402
+from benchmarks.servers import percentile, serve  # noqa: E402
+
+OPERATIONS = ('import', 'assign', 'complete', 'patch', 'get')
+HTTP_PORT = 8321
+
+
+class InProcess:
+    def __init__(self):
+        self.local = threading.local()
+
+    def __call__(self, method, url, data=None):
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client()
+        kwargs = {} if data is None else {'data': json.dumps(data), 'content_type': 'application/json'}
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.local.client, method.lower())(url, **kwargs)
+        elapsed = time.perf_counter() - start
+        return response.status_code, json.loads(response.content), len(queries), elapsed
+
+
+class Http:
+    def __init__(self, port):
+        import http.client
+        self.connect = lambda: http.client.HTTPConnection('127.0.0.1', port)
+        self.local = threading.local()
+
+    def __call__(self, method, url, data=None):
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.connect()
+        start = time.perf_counter()
+        if data is None:
+            self.local.client.request(method, url)
+        else:
+            self.local.client.request(method, url, body=json.dumps(data),
+                                      headers={'Content-Type': 'application/json'})
+        response = self.local.client.getresponse()
+        content = json.loads(response.read())
+        return response.status, content, None, time.perf_counter() - start
+
+
+class Workload:
+    def __init__(self, call, generator, couriers, orders, import_batch):
+        self.call = call
+        self.generator = generator
+        self.couriers = couriers
+        self.next_order_id = orders + 1
+        self.import_batch = import_batch
+        self.open_orders = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def seed(self, orders, batch_size):
+        for batch in batches(self.generator.couriers(self.couriers), batch_size):
+            self.expect(201, *self.call('POST', reverse('import_couriers'), {'data': batch}))
+        for batch in batches(self.generator.orders(orders), batch_size):
+            self.expect(201, *self.call('POST', reverse('import_orders'), {'data': batch}))
+
+    @staticmethod
+    def expect(status, status_code, content, queries, elapsed):
+        if status_code != status:
+            raise RuntimeError('HTTP {}: {}'.format(status_code, content))
+
+    def courier_id(self):
+        with self.lock:
+            return self.generator.random.randint(1, self.couriers)
+
+    def run(self, operation):
+        return getattr(self, 'do_' + operation)()
+
+    def do_import(self):
+        with self.lock:
+            first_id = self.next_order_id
+            self.next_order_id += self.import_batch
+            batch = list(self.generator.orders(self.import_batch, first_id))
+        return 201, self.call('POST', reverse('import_orders'), {'data': batch})
+
+    def do_assign(self):
+        courier_id = self.courier_id()
+        result = self.call('POST', reverse('assign_orders'), {'courier_id': courier_id})
+        if result[0] == 200:
+            with self.lock:
+                known = set(self.open_orders[courier_id])
+                self.open_orders[courier_id].extend(order['id'] for order in result[1]['orders']
+                                                    if order['id'] not in known)
+        return 200, result
+
+    def do_complete(self):
+        with self.lock:
+            couriers = [courier_id for courier_id, orders in self.open_orders.items() if orders]
+            if not couriers:
+                return None
+            courier_id = self.generator.random.choice(couriers)
+            order_id = self.open_orders[courier_id].pop()
+        complete_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=1)
+        return 200, self.call('POST', reverse('complete_order'), {
+            'courier_id': courier_id, 'order_id': order_id, 'complete_time': complete_time.isoformat()})
+
+    def do_patch(self):
+        courier_id = self.courier_id()
+        with self.lock:
+            change = self.generator.random.choice((
+                {'working_hours': self.generator.working_hours()}, {'regions': self.generator.courier_regions()}))
+        result = self.call('PATCH', reverse('modify_courier', args=[courier_id]), change)
+        if result[0] == 200:
+            # the response does not list the orders taken away from the courier
+            open_orders = list(OrderModel.objects.filter(courier_id=courier_id, complete_time=None)
+                               .values_list('order_id', flat=True))
+            with self.lock:
+                self.open_orders[courier_id] = [order_id for order_id in self.open_orders[courier_id]
+                                                if order_id in open_orders]
+        return 200, result
+
+    def do_get(self):
+        return 200, self.call('GET', reverse('modify_courier', args=[self.courier_id()]))
+
+
+def drive(workload, mix, concurrency, requests, seed):
+    operations, weights = zip(*mix.items())
+    plan = random.Random(seed).choices(operations, weights=weights, k=requests)
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    position = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            work()
+        finally:
+            connection.close()
+
+    def work():
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                return
+            outcome = workload.run(plan[index])
+            if outcome is None:
+                continue
+            expected, (status_code, content, queries, elapsed) = outcome
+            with lock:
+                if status_code == expected:
+                    samples[plan[index]].append((elapsed, queries))
+                else:
+                    errors[plan[index]] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, errors, time.perf_counter() - start
+
+
+def summarize(samples, errors, elapsed):
+    report = {}
+    for operation in OPERATIONS + ('all',):
+        if operation == 'all':
+            measured = [sample for values in samples.values() for sample in values]
+            failed = sum(errors.values())
+        else:
+            measured, failed = samples.get(operation, []), errors.get(operation, 0)
+        if not measured:
+            continue
+        latencies = sorted(latency for latency, _ in measured)
+        queries = [count for _, count in measured if count is not None]
+        report[operation] = {
+            'requests': len(measured), 'errors': failed, 'rps': len(measured) / elapsed,
+            'p50_ms': percentile(latencies, 0.5), 'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'queries': sum(queries) / len(queries) if queries else None}
+    return report
+
+
+def print_report(report, baseline=None):
+    print('{:>9} {:>9} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9}{}'.format(
+        '', 'requests', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries',
+        ' {:>11}'.format('p95 change') if baseline else ''))
+    for operation, row in report.items():
+        change = ''
+        if baseline and operation in baseline:
+            change = ' {:>+10.0%}'.format(row['p95_ms'] / baseline[operation]['p95_ms'] - 1)
+        print('{:>9} {:>9} {:>7} {:>9.0f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9}{}'.format(
+            operation, row['requests'], row['errors'], row['rps'], row['p50_ms'], row['p95_ms'], row['p99_ms'],
+            '-' if row['queries'] is None else '{:.1f}'.format(row['queries']), change))
+
+
+def regressions(report, baseline, tolerance):
+    return [operation for operation, row in report.items() if operation in baseline and (
+        row['p95_ms'] > baseline[operation]['p95_ms'] * (1 + tolerance) or
+        row['queries'] is not None and baseline[operation]['queries'] is not None and
+        row['queries'] > baseline[operation]['queries'])]
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        operation, weight = item.split('=')
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError('unknown operation {!r}, expected one of {}'.format(
+                operation, ', '.join(OPERATIONS)))
+        mix[operation] = float(weight)
+    return mix
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--couriers', type=int, default=1000)
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--regions', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('get=40,assign=20,complete=20,patch=10,import=10'))
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--import-batch', type=int, default=100, help='orders per POST /orders in the mix')
+    parser.add_argument('--seed-batch', type=int, default=10000, help='couriers or orders per request when seeding')
+    parser.add_argument('--http', action='store_true', help='send requests to gunicorn instead of the test client')
+    parser.add_argument('--output', help='write the report to this JSON file')
+    parser.add_argument('--compare', help='JSON report to compare with, exits with 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative p95 growth for --compare')
+    args = parser.parse_args(argv)
+
+    with test_database():
+        workload = Workload(InProcess(), Generator(args.seed, args.regions), args.couriers, args.orders,
+                            args.import_batch)
+        start = time.perf_counter()
+        workload.seed(args.orders, args.seed_batch)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        print('seeded {} couriers and {} orders in {:.1f} s'.format(args.couriers, args.orders,
+                                                                  time.perf_counter() - start))
+        if args.http:
+            with serve(['gunicorn', '-c', 'gunicorn.conf.py', 'online_store.wsgi'], HTTP_PORT,
+                       GUNICORN_BIND='127.0.0.1:{}'.format(HTTP_PORT), SQL_CONN_MAX_AGE='60'):
+                workload.call = Http(HTTP_PORT)
+                report = summarize(*drive(workload, args.mix, args.concurrency, args.requests, args.seed))
+        else:
+            report = summarize(*drive(workload, args.mix, args.concurrency, args.requests, args.seed))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if baseline:
+        failed = regressions(report, baseline, args.tolerance)
+        if failed:
+            print('regressions: {}'.format(', '.join(failed)))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,115 @@
+"""
+Helpers for benchmarks that run the application in a separate server process against the test database.
+"""
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from benchmarks import BASE_DIR
+
+
+def seed(couriers, orders):
+    random.seed(0)
+    client = Client()
+    client.post(reverse('import_couriers'), content_type='application/json', data=json.dumps({'data': [
+        {'courier_id': courier_id, 'courier_type': random.choice(['foot', 'bike', 'car']),
+         'regions': random.sample(range(1, 21), 3), 'working_hours': ['09:00-13:00', '14:00-18:00']}
+        for courier_id in range(1, couriers + 1)]}))
+    client.post(reverse('import_orders'), content_type='application/json', data=json.dumps({'data': [
+        {'order_id': order_id, 'weight': round(random.uniform(0.01, 10), 2), 'region': random.randint(1, 20),
+         'delivery_hours': ['10:00-12:00']} for order_id in range(1, orders + 1)]}))
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+@contextmanager
+def serve(command, port, **env):
+    env = dict(os.environ, SQL_DATABASE=settings.DATABASES['default']['NAME'], COURIER_CACHE_TIMEOUT='0', **env)
+    server = subprocess.Popen([sys.executable, '-m'] + command, cwd=BASE_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(300):
+            try:
+                client = http.client.HTTPConnection('127.0.0.1', port)
+                client.request('GET', '/couriers/1')
+                client.getresponse().read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError('server on port {} did not start'.format(port))
+        yield
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def server_connections():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM pg_stat_activity WHERE datname = %s AND pid <> pg_backend_pid()',
+                       [settings.DATABASES['default']['NAME']])
+        return cursor.fetchone()[0]
+
+
+def sessions():
+    # connections opened to the test database so far, pg_stat_database counts them since Postgres 14
+    if connection.pg_version < 140000:
+        return None
+    time.sleep(1)  # backends report their statistics with a delay
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT sessions FROM pg_stat_database WHERE datname = %s',
+                       [settings.DATABASES['default']['NAME']])
+        return cursor.fetchone()[0]
+
+
+def load(port, concurrency, seconds, request):
+    """
+    Runs request(client) from concurrency keep-alive clients for the given number of seconds,
+    returns sorted latencies and the largest number of server connections to the database seen meanwhile.
+    """
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        client = http.client.HTTPConnection('127.0.0.1', port)
+        result = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            request(client)
+            result.append(time.perf_counter() - start)
+        latencies.extend(result)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    connections = 0
+    while any(thread.is_alive() for thread in threads):
+        connections = max(connections, server_connections())
+        time.sleep(0.05)
+    return sorted(latencies), connections
+
+
+def call(client, method, url, data=None, statuses=(200,)):
+    if data is None:
+        client.request(method, url)
+    else:
+        client.request(method, url, body=json.dumps(data), headers={'Content-Type': 'application/json'})
+    response = client.getresponse()
+    body = response.read()
+    assert response.status in statuses, response.status
+    return body
+
+
+def percentile(latencies, share):
+    return latencies[min(int(len(latencies) * share), len(latencies) - 1)] * 1000
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished, request_started
 
 
 class DeliveryServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'delivery_service'
+
+    def ready(self):
+        from .utils import check_connections, release_connections
+        request_started.connect(check_connections)
+        request_finished.connect(release_connections)
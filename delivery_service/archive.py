@@ -0,0 +1,37 @@
+from django.db import connection, transaction
+
+from .models import ArchivedOrderModel, DeliveryIntervalModel, OrderModel
+
+ARCHIVED_COLUMNS = ', '.join(field.column for field in ArchivedOrderModel._meta.concrete_fields)
+
+
+def archive_batch(completed_before, batch_size):
+    """
+    Moves up to batch_size orders completed before completed_before to ArchivedOrderModel in one transaction,
+    returns the number of moved orders. Rows locked by a running request are left for the next batch.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'WITH batch AS ('
+            '    SELECT order_id FROM {orders} WHERE complete_time IS NOT NULL AND complete_time < %s'
+            '    ORDER BY complete_time LIMIT %s FOR UPDATE SKIP LOCKED'
+            '), intervals AS ('
+            '    DELETE FROM {intervals} WHERE order_id IN (SELECT order_id FROM batch)'
+            '), moved AS ('
+            '    DELETE FROM {orders} WHERE order_id IN (SELECT order_id FROM batch) RETURNING {columns}'
+            ') INSERT INTO {archive} ({columns}) SELECT {columns} FROM moved'.format(
+                orders=OrderModel._meta.db_table, intervals=DeliveryIntervalModel._meta.db_table,
+                archive=ArchivedOrderModel._meta.db_table, columns=ARCHIVED_COLUMNS),
+            [completed_before, batch_size])
+        return cursor.rowcount
+
+
+def archive_orders(completed_before, batch_size, pause=None):
+    moved = 0
+    while True:
+        batch = archive_batch(completed_before, batch_size)
+        moved += batch
+        if batch < batch_size:
+            return moved
+        if pause:
+            pause()
@@ -0,0 +1,134 @@
+import time
+from bisect import bisect_right
+from collections import namedtuple
+
+from django.conf import settings
+
+from .intervals import time_to_minutes
+
+# weight is in hundredths of a kilogram so that capacities can be packed exactly
+Candidate = namedtuple('Candidate', ('order_id', 'weight', 'deadline'))
+
+
+def weight_units(weight):
+    return int(round(weight * 100))
+
+
+def order_candidate(order_id, weight, delivery_hours):
+    # the deadline is the end of the earliest delivery interval
+    return Candidate(order_id, weight_units(weight),
+                     min((time_to_minutes(time_range[-1]) for time_range in delivery_hours), default=0))
+
+
+def order_candidates(query_set):
+    return [order_candidate(*row) for row in query_set.values_list('order_id', 'weight', 'delivery_hours')]
+
+
+def smallest_first(candidates, capacity):
+    chosen = []
+    for candidate in sorted(candidates, key=lambda candidate: candidate.weight):
+        if candidate.weight > capacity:
+            break
+        chosen.append(candidate)
+        capacity -= candidate.weight
+    return chosen
+
+
+def greedy(candidates, capacity):
+    chosen = []
+    for candidate in sorted(candidates, key=lambda candidate: (candidate.deadline, candidate.weight)):
+        if candidate.weight <= capacity:
+            chosen.append(candidate)
+            capacity -= candidate.weight
+    return chosen
+
+
+def knapsack(candidates, capacity):
+    # the lightest orders are enough to reach the maximum count; the DP then maximizes the packed weight of that
+    # many orders over at most ASSIGNMENT_KNAPSACK_MAX_ITEMS of them around the end of the lightest prefix, the
+    # lighter orders before that window are kept as they are. A DP that takes longer than ASSIGNMENT_TIME_BUDGET
+    # falls back to the lightest prefix, which has the same count
+    deadline = time.perf_counter() + settings.ASSIGNMENT_TIME_BUDGET
+    candidates = sorted(candidates, key=lambda candidate: candidate.weight)
+    lightest = smallest_first(candidates, capacity)
+    count = len(lightest)
+    if not count:
+        return []
+    start = max(0, min(count - settings.ASSIGNMENT_KNAPSACK_MAX_ITEMS // 2,
+                       len(candidates) - settings.ASSIGNMENT_KNAPSACK_MAX_ITEMS))
+    fixed = candidates[:start]
+    candidates = candidates[start:start + settings.ASSIGNMENT_KNAPSACK_MAX_ITEMS]
+    capacity -= sum(candidate.weight for candidate in fixed)
+    count -= start
+    mask = (1 << (capacity + 1)) - 1
+    reachable = [1] + [0] * count  # bit s of reachable[j] is set when j orders can weigh exactly s
+    # the bits each order makes reachable first, enough to trace the chosen orders back
+    added = []
+    for candidate in candidates:
+        if time.perf_counter() > deadline:
+            return lightest
+        new = [0] * (count + 1)
+        for taken in range(count, 0, -1):
+            new[taken] = (reachable[taken - 1] << candidate.weight) & mask & ~reachable[taken]
+            reachable[taken] |= new[taken]
+        added.append(new)
+    total = reachable[count].bit_length() - 1
+    chosen = []
+    for candidate, new in zip(reversed(candidates), reversed(added)):
+        if count and (new[count] >> total) & 1:
+            chosen.append(candidate)
+            total -= candidate.weight
+            count -= 1
+    return fixed + chosen
+
+
+def budgeted(candidates, capacity):
+    deadline = time.perf_counter() + settings.ASSIGNMENT_TIME_BUDGET
+    chosen = smallest_first(candidates, capacity)
+    chosen_ids = {candidate.order_id for candidate in chosen}
+    rest = sorted((candidate for candidate in candidates if candidate.order_id not in chosen_ids),
+                  key=lambda candidate: candidate.weight)
+    rest_weights = [candidate.weight for candidate in rest]
+    slack = capacity - sum(candidate.weight for candidate in chosen)
+    improved = True
+    while improved and slack and rest and time.perf_counter() < deadline:
+        improved = False
+        for index, candidate in enumerate(chosen):
+            position = bisect_right(rest_weights, candidate.weight + slack) - 1
+            if position < 0 or rest_weights[position] <= candidate.weight:
+                continue
+            replacement = rest.pop(position)
+            rest_weights.pop(position)
+            slack -= replacement.weight - candidate.weight
+            chosen[index] = replacement
+            position = bisect_right(rest_weights, candidate.weight)
+            rest.insert(position, candidate)
+            rest_weights.insert(position, candidate.weight)
+            improved = True
+            if not slack or time.perf_counter() >= deadline:
+                break
+    return chosen
+
+
+def match_orders(graph, capacities):
+    # Orders with the fewest suitable couriers go first, lighter ones first among equals;
+    # each goes to the suitable courier with the most capacity left.
+    capacities = dict(capacities)
+    matching = {courier_id: [] for courier_id in capacities}
+    for candidate, courier_ids in sorted(graph, key=lambda edge: (len(edge[1]), edge[0].weight)):
+        courier_id = max(courier_ids, key=capacities.get)
+        if candidate.weight <= capacities[courier_id]:
+            matching[courier_id].append(candidate)
+            capacities[courier_id] -= candidate.weight
+    return matching
+
+
+ENGINES = {
+    'greedy': greedy,
+    'knapsack': knapsack,
+    'budgeted': budgeted,
+}
+
+
+def select_orders(candidates, capacity):
+    return ENGINES[settings.ASSIGNMENT_ENGINE](candidates, capacity)
@@ -0,0 +1,166 @@
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import Http404
+from rest_framework import status
+
+from . import cache as courier_cache, views
+from .codec import get_serializer, json_response
+from .metrics import measure
+from .models import CourierModel
+from .utils import check_connections, release_connections
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+# Django 3.2 has no async ORM: writes and validation still go through the class-based views, but on a bounded pool
+# of threads with their own connections, so the event loop never waits for Postgres and the number of connections
+# is ASYNC_DB_THREADS per process instead of one per request
+database_threads = ThreadPoolExecutor(settings.ASYNC_DB_THREADS, thread_name_prefix='delivery_service')
+# asyncpg pools are bound to the event loop that created them
+pools = weakref.WeakKeyDictionary()
+
+
+def in_thread(function):
+    def run(*args, **kwargs):
+        close_old_connections()
+        check_connections()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            close_old_connections()
+            release_connections()
+    return sync_to_async(run, thread_sensitive=False, executor=database_threads)
+
+
+async def stream_content(parts):
+    # the body of a streaming response is produced by the view, so each part is read on the database threads too
+    next_part = in_thread(next)
+    while True:
+        part = await next_part(parts, None)
+        if part is None:
+            break
+        yield part
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django 3.2 iterates a streaming response on the event loop, where the import views producing it can not use the
+    database: the body is read part by part on the database threads and sent as it arrives.
+    """
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        parts = stream_content(iter(response))
+        response.streaming_content = ()
+
+        async def send_parts(message):
+            # the parts go before the closing message that follows the emptied body
+            if message['type'] == 'http.response.body' and not message.get('more_body'):
+                async for part in parts:
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send(message)
+        await super().send_response(response, send_parts)
+
+
+class AsyncView:
+    def __init__(self, view_class):
+        self.view_class = view_class
+
+    def as_view(self):
+        sync_view = in_thread(self.view_class.as_view())
+
+        async def view(request, *args, **kwargs):
+            return await sync_view(request, *args, **kwargs)
+        view.view_class = self.view_class
+        return view
+
+
+async def pool():
+    loop = asyncio.get_running_loop()
+    if loop not in pools:
+        database = settings.DATABASES['default']
+        # the task is stored before the first await so that concurrent first requests share one pool
+        pools[loop] = asyncio.ensure_future(asyncpg.create_pool(
+            host=database['HOST'] or None, port=database['PORT'] or None, user=database['USER'] or None,
+            password=database['PASSWORD'] or None, database=database['NAME'],
+            min_size=1, max_size=settings.ASYNC_DB_POOL_SIZE,
+            # a transaction-mode pooler does not keep prepared statements between transactions
+            statement_cache_size=0 if database['DISABLE_SERVER_SIDE_CURSORS'] else 100))
+    task = pools[loop]
+    try:
+        return await task
+    except Exception:
+        # a pool that could not connect is created again by the next request
+        if pools.get(loop) is task:
+            pools.pop(loop, None)
+        raise
+
+
+async def close_pool():
+    loop = asyncio.get_running_loop()
+    if loop in pools:
+        await (await pools.pop(loop)).close()
+
+
+async def fetch_courier(courier_id):
+    fields = [field.column for field in CourierModel._meta.concrete_fields]
+    async with (await pool()).acquire() as connection:
+        with measure('sql'):
+            row = await connection.fetchrow('SELECT {} FROM {} WHERE courier_id = $1'.format(
+                ', '.join(fields), CourierModel._meta.db_table), courier_id)
+    if row is None:
+        raise Http404('No CourierModel matches the given query.')
+    return CourierModel(**dict(row))
+
+
+async def cache_call(method, *args):
+    # Django 3.2 caches are synchronous: the default locmem cache is called inline, a network backend from a thread
+    if settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+        return method(*args)
+    return await sync_to_async(method)(*args)
+
+
+async def cached_courier(courier_id):
+    if not courier_cache.enabled():
+        return dict(get_serializer('courier')(await fetch_courier(courier_id)).data)
+    representation, generation = await cache_call(courier_cache.lookup_courier, courier_id)
+    if representation is None:
+        representation = dict(get_serializer('courier')(await fetch_courier(courier_id)).data)
+        await cache_call(courier_cache.store_courier, courier_id, generation, representation)
+    return representation
+
+
+class AsyncCourierView(AsyncView):
+    def as_view(self):
+        sync_view = super().as_view()
+
+        async def view(request, courier_id):
+            if request.method != 'GET' or asyncpg is None:
+                return await sync_view(request, courier_id=courier_id)
+            return json_response(await cached_courier(courier_id), status=status.HTTP_200_OK)
+        view.view_class = self.view_class
+        return view
+
+
+CouriersView = AsyncView(views.CouriersView)
+CourierView = AsyncCourierView(views.CourierView)
+OrdersView = AsyncView(views.OrdersView)
+CouriersStreamView = AsyncView(views.CouriersStreamView)
+OrdersStreamView = AsyncView(views.OrdersStreamView)
+AssignOrdersView = AsyncView(views.AssignOrdersView)
+BatchAssignOrdersView = AsyncView(views.BatchAssignOrdersView)
+OrderCompleteView = AsyncView(views.OrderCompleteView)
+BatchOrderCompleteView = AsyncView(views.BatchOrderCompleteView)
+StatsView = AsyncView(views.StatsView)
+RegionStatsView = AsyncView(views.RegionStatsView)
+CourierTypeStatsView = AsyncView(views.CourierTypeStatsView)
+MetricsView = AsyncView(views.MetricsView)
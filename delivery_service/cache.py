@@ -0,0 +1,70 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+
+lookups = metrics.Counter('delivery_courier_cache_lookups_total', 'GET /couriers/<id> cache lookups by result.',
+                          ('result',))
+metrics.registry.append(lookups)
+
+
+def courier_key(courier_id):
+    return 'courier:{}'.format(courier_id)
+
+
+def generation_key(courier_id):
+    return 'courier:{}:generation'.format(courier_id)
+
+
+def enabled():
+    return bool(settings.COURIER_CACHE_TIMEOUT)
+
+
+def start_generation(courier_id):
+    # generations are random, so an entry never matches a generation key that was evicted and created again
+    cache.add(generation_key(courier_id), uuid.uuid4().hex, None)
+    return cache.get(generation_key(courier_id))
+
+
+def lookup_courier(courier_id):
+    """
+    Returns the cached representation and None if it was rendered in the current generation of the courier, else
+    None and the generation to store a new rendering under with store_courier().
+    """
+    values = cache.get_many([courier_key(courier_id), generation_key(courier_id)])
+    entry = values.get(courier_key(courier_id))
+    generation = values.get(generation_key(courier_id))
+    if entry is not None and generation is not None and entry[0] == generation:
+        lookups.inc(('hit',))
+        return entry[1], None
+    lookups.inc(('miss',))
+    # the generation is read before the row, so a row read before a later invalidation is stored under a generation
+    # that is already gone
+    return None, generation or start_generation(courier_id)
+
+
+def store_courier(courier_id, generation, representation):
+    cache.set(courier_key(courier_id), (generation, representation), settings.COURIER_CACHE_TIMEOUT)
+
+
+def cached_courier(courier_id, render):
+    if not enabled():
+        return render()
+    representation, generation = lookup_courier(courier_id)
+    if representation is None:
+        representation = render()
+        store_courier(courier_id, generation, representation)
+    return representation
+
+
+def invalidate_courier(courier_id):
+    """
+    Starts a new generation of the courier now and again after the transaction commits. Once the change is
+    committed, no request reads a representation rendered before it, even one cached by a GET that read the row
+    while the transaction was open; processes that do not share the cache backend keep their own copies.
+    """
+    cache.set(generation_key(courier_id), uuid.uuid4().hex, None)
+    transaction.on_commit(lambda: cache.set(generation_key(courier_id), uuid.uuid4().hex, None))
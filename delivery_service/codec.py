@@ -0,0 +1,373 @@
+import json
+import re
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import empty
+from rest_framework.parsers import JSONParser
+from rest_framework.settings import api_settings
+
+from .intervals import format_intervals, parse_intervals
+from .metrics import measure, timed_serializer
+from .models import CourierModel, OrderModel, TYPE_CHOICES, DeliveryIntervalModel
+from .serializers import CourierSerializer, OrderSerializer, OrderAssignSerializer, OrderCompleteSerializer
+from .utils import bulk_insert, insert_intervals, taken_positions
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Validators below accept and reject exactly what the DRF fields of the serializers in serializers.py do.
+MAX_STRING_LENGTH = 1000
+RE_DECIMAL = re.compile(r'\.0*\s*$')
+
+
+class Invalid(Exception):
+    pass
+
+
+def integer_field(min_value=None):
+    def validate(value):
+        if type(value) is not int:
+            if value is None or isinstance(value, str) and len(value) > MAX_STRING_LENGTH:
+                raise Invalid
+            try:
+                value = int(RE_DECIMAL.sub('', str(value)))
+            except (ValueError, TypeError):
+                raise Invalid
+        if min_value is not None and value < min_value:
+            raise Invalid
+        return value
+    return validate
+
+
+def float_field(value):
+    if value is None or isinstance(value, str) and len(value) > MAX_STRING_LENGTH:
+        raise Invalid
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise Invalid
+
+
+def choice_field(choices):
+    choices = {str(key): key for key, _ in choices}
+
+    def validate(value):
+        try:
+            return choices[str(value)]
+        except KeyError:
+            raise Invalid
+    return validate
+
+
+def list_field(child=None, allow_empty=True):
+    def validate(value):
+        if value is None or isinstance(value, (str, Mapping)) or not hasattr(value, '__iter__'):
+            raise Invalid
+        if not allow_empty and len(value) == 0:
+            raise Invalid
+        return list(value) if child is None else [child(item) for item in value]
+    return validate
+
+
+def intervals_field(value):
+    value = list_field()(value)
+    try:
+        return parse_intervals(value)
+    except ValueError:
+        raise Invalid
+
+
+def weight_field(value):
+    value = float_field(value)
+    if value < 0.01 or value > 50:
+        raise Invalid
+    return round(value, 2)
+
+
+def datetime_field(value):
+    try:
+        parsed = parse_datetime(value)
+    except (ValueError, TypeError):
+        raise Invalid
+    if parsed is None:
+        raise Invalid
+    field_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+    try:
+        # near the bounds of datetime the conversion leaves its range, DRF reports it as an invalid value too
+        if field_timezone is None:
+            return timezone.make_naive(parsed, timezone.utc) if timezone.is_aware(parsed) else parsed
+        if timezone.is_aware(parsed):
+            return parsed.astimezone(field_timezone)
+        return timezone.make_aware(parsed, field_timezone)
+    except (OverflowError, ValueError):
+        raise Invalid
+
+
+def record(fields):
+    known = frozenset(fields)
+    fields = tuple(fields.items())
+
+    def validate(data, partial=False):
+        if not isinstance(data, Mapping):
+            raise Invalid
+        if not known.issuperset(data):
+            raise Invalid
+        validated = {}
+        for name, validate_field in fields:
+            if name in data:
+                validated[name] = validate_field(data[name])
+            elif not partial:
+                raise Invalid
+        return validated
+    return validate
+
+
+class FastSerializer:
+    validate = None
+    model = None
+
+    def __new__(cls, *args, many=False, **kwargs):
+        if many:
+            return FastListSerializer(cls(), *args, **kwargs)
+        return super().__new__(cls)
+
+    def __init__(self, instance=None, data=empty, partial=False):
+        self.instance = instance
+        self.partial = partial
+        if data is not empty:
+            self.initial_data = data
+
+    def is_valid(self):
+        try:
+            self.validated_data = self.validate(self.initial_data, self.partial)
+            self.errors = {}
+        except Invalid:
+            self.validated_data = {}
+            self.errors = {api_settings.NON_FIELD_ERRORS_KEY: ['Invalid data.']}
+        return not self.errors
+
+    def create(self, validated_data):
+        return self.model.objects.create(**validated_data)
+
+    def update(self, instance, validated_data):
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+    def save(self):
+        if self.instance is None:
+            self.instance = self.create(self.validated_data)
+        else:
+            self.instance = self.update(self.instance, self.validated_data)
+        return self.instance
+
+
+class FastListSerializer:
+    def __init__(self, child, instance=None, data=empty):
+        self.child = child
+        self.instance = instance
+        if data is not empty:
+            self.initial_data = data
+
+    def is_valid(self):
+        if not isinstance(self.initial_data, list):
+            self.validated_data = []
+            self.errors = {api_settings.NON_FIELD_ERRORS_KEY: ['Expected a list of items.']}
+            return False
+        validated = []
+        errors = []
+        for item in self.initial_data:
+            try:
+                validated.append(self.child.validate(item))
+                errors.append({})
+            except Invalid:
+                validated.append(None)
+                errors.append({api_settings.NON_FIELD_ERRORS_KEY: ['Invalid data.']})
+        id_field_name = self.child.model._meta.pk.name
+        for position in taken_positions(self.child.model, [None if item is None else item[id_field_name]
+                                                           for item in validated]):
+            errors[position] = {id_field_name: ['This field must be unique.']}
+        if any(errors):
+            self.validated_data = []
+            self.errors = errors
+        else:
+            self.validated_data = validated
+            self.errors = []
+        return not self.errors
+
+    def save(self):
+        with transaction.atomic():
+            self.instance = bulk_insert(self.child.model, self.validated_data)
+            # only orders keep their hours as a table of intervals
+            if hasattr(self.child, 'insert_intervals'):
+                self.child.insert_intervals(self.instance)
+        return self.instance
+
+
+COURIER_FIELDS = {
+    'courier_id': integer_field(min_value=1),
+    'courier_type': choice_field(TYPE_CHOICES),
+    'regions': list_field(integer_field(min_value=1)),
+    'working_hours': intervals_field,
+}
+ORDER_FIELDS = {
+    'order_id': integer_field(min_value=1),
+    'weight': weight_field,
+    'region': integer_field(min_value=1),
+    'delivery_hours': intervals_field,
+}
+COMPLETE_FIELDS = {
+    'courier_id': integer_field(min_value=1),
+    'order_id': integer_field(min_value=1),
+    'complete_time': datetime_field,
+}
+
+
+class FastCourierSerializer(FastSerializer):
+    model = CourierModel
+    validate = staticmethod(record(COURIER_FIELDS))
+
+    @property
+    def data(self):
+        courier = self.instance
+        representation = {
+            'courier_id': courier.courier_id,
+            'courier_type': courier.courier_type,
+            'regions': list(courier.regions),
+            'working_hours': format_intervals(courier.working_hours),
+        }
+        if courier.rating is not None:
+            representation['rating'] = courier.rating
+        if courier.earnings is not None:
+            representation['earnings'] = courier.earnings
+        return representation
+
+    def update(self, instance, validated_data):
+        if 'courier_id' in validated_data:
+            raise ValidationError({
+                'courier_id': 'You must not change this field.',
+            })
+        return super().update(instance, validated_data)
+
+
+class FastOrderSerializer(FastSerializer):
+    model = OrderModel
+    validate = staticmethod(record(ORDER_FIELDS))
+
+    def insert_intervals(self, orders):
+        insert_intervals(orders, DeliveryIntervalModel, 'order', 'delivery_hours')
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            order = super().create(validated_data)
+            self.insert_intervals([order])
+        return order
+
+
+class FastOrderAssignSerializer(FastSerializer):
+    validate = staticmethod(record({
+        'courier_id': integer_field(min_value=1),
+    }))
+
+
+class FastOrderCompleteSerializer(FastSerializer):
+    validate = staticmethod(record(COMPLETE_FIELDS))
+
+
+SERIALIZERS = {
+    'drf': {
+        'courier': CourierSerializer,
+        'order': OrderSerializer,
+        'assign': OrderAssignSerializer,
+        'complete': OrderCompleteSerializer,
+    },
+    'fast': {
+        'courier': FastCourierSerializer,
+        'order': FastOrderSerializer,
+        'assign': FastOrderAssignSerializer,
+        'complete': FastOrderCompleteSerializer,
+    },
+}
+
+
+def get_serializer(name):
+    if settings.METRICS_ENABLED:
+        return timed_serializer(SERIALIZERS[settings.SERIALIZER_CODEC][name])
+    return SERIALIZERS[settings.SERIALIZER_CODEC][name]
+
+
+def reject_constant(value):
+    raise ValueError('Out of range float values are not permitted: {}'.format(value))
+
+
+def parse(request):
+    with measure('serializer'):
+        return decode(request)
+
+
+def decode(request):
+    if settings.SERIALIZER_CODEC == 'drf':
+        return JSONParser().parse(request)
+    return loads(request.body)
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data, parse_constant=reject_constant)
+
+
+def encoder_default(value):
+    return DjangoJSONEncoder().default(value)
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=encoder_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+def body_lines(request):
+    """
+    Lines of the request body read as it arrives; a line longer than STREAM_IMPORT_MAX_LINE_LENGTH is replaced
+    with None.
+    """
+    # a chunked upload has no Content-Length and Django then gives an empty stream; the WSGI server's input
+    # ends by itself when it sets wsgi.input_terminated
+    stream = request
+    if 'CONTENT_LENGTH' not in request.META and request.META.get('wsgi.input_terminated'):
+        stream = request.META['wsgi.input']
+    limit = settings.STREAM_IMPORT_MAX_LINE_LENGTH
+    skipping = False
+    while True:
+        line = stream.readline(limit)
+        if not line:
+            return
+        if skipping:
+            skipping = not line.endswith(b'\n')
+        elif len(line) >= limit and not line.endswith(b'\n'):
+            skipping = True
+            yield None
+        else:
+            yield line
+
+
+def json_response(data, status):
+    with measure('serializer'):
+        return encode(data, status)
+
+
+def encode(data, status):
+    if settings.SERIALIZER_CODEC == 'drf' or orjson is None:
+        return JsonResponse(data, status=status)
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
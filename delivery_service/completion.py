@@ -0,0 +1,79 @@
+from django.db import connection
+
+from . import outbox, stats
+from .models import CourierModel, CourierRegionStatsModel, DeliveryBatchModel, OrderModel
+
+NOT_OPEN = 'The order is not assigned to the courier or is already completed.'
+
+
+def payment_for_order(order_object):
+    return 500 * order_object.courier_salary_coefficient
+
+
+def execute(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def complete_orders(items):
+    """
+    Completes the orders of the validated (courier_id, order_id, complete_time) items in a transaction opened by
+    the caller and returns the positions of the items whose order is not open for the courier. The items are
+    applied in complete_time order: the delivery time of an order counts from the previous completion of the
+    courier in its region, or from its assign time for the first one. Every table is written by one statement
+    whatever the number of items. Earnings and ratings of the couriers are left to the outbox worker.
+    """
+    # completions of one courier are applied one at a time so region stats stay consistent; couriers are locked
+    # before their orders, in the same order as PATCH /couriers/<id> and /orders/assign, so they cannot deadlock
+    courier_types = dict(CourierModel.objects.select_for_update().filter(
+        courier_id__in={item['courier_id'] for item in items}).order_by('courier_id')
+                         .values_list('courier_id', 'courier_type'))
+    orders = {order.order_id: order for order in OrderModel.objects.select_for_update().filter(
+        order_id__in=[item['order_id'] for item in items], complete_time=None).order_by('order_id')}
+    rejected = []
+    accepted = []
+    for position, item in enumerate(items):
+        order_object = orders.pop(item['order_id'], None)
+        if order_object is None or order_object.courier_id != item['courier_id']:
+            rejected.append(position)
+        else:
+            order_object.complete_time = item['complete_time']
+            accepted.append(order_object)
+    if not accepted:
+        return rejected
+    accepted.sort(key=lambda order_object: order_object.complete_time)
+    courier_ids = sorted({order_object.courier_id for order_object in accepted})
+
+    last_complete_times = {(courier_id, region): last_complete_time for courier_id, region, last_complete_time in
+                           CourierRegionStatsModel.objects.filter(
+                               courier_id__in=courier_ids, region__in={order.region for order in accepted})
+                           .values_list('courier_id', 'region', 'last_complete_time')}
+    for order_object in accepted:
+        key = (order_object.courier_id, order_object.region)
+        previous_time = last_complete_times.get(key) or order_object.assign_time
+        order_object.delivery_time = int((order_object.complete_time - previous_time).total_seconds())
+        last_complete_times[key] = order_object.complete_time
+
+    execute('UPDATE {table} SET complete_time = completed.complete_time, delivery_time = completed.delivery_time '
+            'FROM unnest(%s::integer[], %s::timestamptz[], %s::integer[]) '
+            'AS completed (order_id, complete_time, delivery_time) '
+            'WHERE {table}.order_id = completed.order_id'.format(table=OrderModel._meta.db_table),
+            [[order.order_id for order in accepted], [order.complete_time for order in accepted],
+             [order.delivery_time for order in accepted]])
+    rows, params = stats.values([
+        key + (completed, delivery_time_sum, last_complete_times[key])
+        for key, (completed, delivery_time_sum) in stats.totals(
+            ((order.courier_id, order.region), 1, order.delivery_time) for order in accepted)])
+    execute(stats.upsert(CourierRegionStatsModel, ('courier_id', 'region'),
+                         ('completed_orders', 'delivery_time_sum'), rows, replaced=('last_complete_time',)), params)
+    batches = stats.totals((order.batch_id, 1) for order in accepted if order.batch_id is not None)
+    if batches:
+        execute('UPDATE {table} SET open_orders = {table}.open_orders - delivered.count '
+                'FROM unnest(%s::bigint[], %s::integer[]) AS delivered (id, count) '
+                'WHERE {table}.id = delivered.id'.format(table=DeliveryBatchModel._meta.db_table),
+                [[batch_id for batch_id, _ in batches], [count for _, (count,) in batches]])
+
+    outbox.add_events([(order.courier_id, order.order_id, payment_for_order(order)) for order in accepted])
+    stats.record_completed([(order.region, order.complete_time, order.delivery_time,
+                             courier_types[order.courier_id], payment_for_order(order)) for order in accepted])
+    return rejected
@@ -0,0 +1,93 @@
+import functools
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+
+from .models import IdempotencyKeyModel
+
+HEADER = 'Idempotency-Key'
+KEYS_TABLE = IdempotencyKeyModel._meta.db_table
+
+
+def expired_before():
+    return timezone.now() - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def claim_key(key, path, request_hash):
+    """
+    Inserts the row of the key, or takes over an expired one, and returns True; returns False when a live row
+    exists. A concurrent request with the same key waits on the unique index until the first one commits or
+    rolls back, so duplicates sent at the same time run the view once.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {table} (key, path, request_hash, created) VALUES (%s, %s, %s, %s) '
+            'ON CONFLICT (key, path) DO UPDATE SET request_hash = EXCLUDED.request_hash, created = EXCLUDED.created, '
+            'status = NULL, content_type = NULL, response = NULL WHERE {table}.created < %s RETURNING id'.format(
+                table=KEYS_TABLE),
+            [key, path, request_hash, timezone.now(), expired_before()])
+        return cursor.fetchone() is not None
+
+
+def replay(key, path, request_hash):
+    stored = IdempotencyKeyModel.objects.get(key=key, path=path)
+    if stored.request_hash != request_hash:
+        return HttpResponse(status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    response = HttpResponse(bytes(stored.response), status=stored.status, content_type=stored.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(method):
+    """
+    Stores the response of a view method called with an Idempotency-Key header in the transaction of the call and
+    returns it for later requests with the same key and path for IDEMPOTENCY_KEY_TTL hours, without running the
+    view again. A key reused with another body gets 422. Server errors and responses larger than
+    IDEMPOTENCY_MAX_RESPONSE_SIZE are not stored, so their retries run again.
+    """
+    @functools.wraps(method)
+    def view(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return method(self, request, *args, **kwargs)
+        if not key or len(key) > IdempotencyKeyModel._meta.get_field('key').max_length:
+            return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+        request_hash = hashlib.sha256(request.body).hexdigest()
+        with transaction.atomic():
+            if not claim_key(key, request.path, request_hash):
+                return replay(key, request.path, request_hash)
+            response = method(self, request, *args, **kwargs)
+            stored = IdempotencyKeyModel.objects.filter(key=key, path=request.path)
+            if response.status_code >= 500 or response.streaming or \
+                    len(response.content) > settings.IDEMPOTENCY_MAX_RESPONSE_SIZE:
+                stored.delete()
+            else:
+                stored.update(status=response.status_code, content_type=response['Content-Type'],
+                              response=response.content)
+        return response
+    return view
+
+
+def purge_batch(created_before, batch_size):
+    with transaction.atomic(), connection.cursor() as cursor:
+        # materialized so that the batch is not rescanned past the rows this statement already deleted
+        cursor.execute(
+            'WITH batch AS MATERIALIZED ('
+            '    SELECT id FROM {table} WHERE created < %s ORDER BY created LIMIT %s FOR UPDATE SKIP LOCKED'
+            ') DELETE FROM {table} USING batch WHERE {table}.id = batch.id'.format(table=KEYS_TABLE),
+            [created_before, batch_size])
+        return cursor.rowcount
+
+
+def purge_keys(created_before, batch_size):
+    purged = 0
+    while True:
+        batch = purge_batch(created_before, batch_size)
+        purged += batch
+        if batch < batch_size:
+            return purged
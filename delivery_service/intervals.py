@@ -0,0 +1,60 @@
+import re
+from datetime import time
+from functools import lru_cache
+
+# same inputs as datetime.strptime(x, '%H:%M') on both sides of the dash
+INTERVAL_RE = re.compile(r'(2[0-3]|[01]?\d):([0-5]?\d)-(2[0-3]|[01]?\d):([0-5]?\d)')
+CACHE_SIZE = 4096
+
+
+def time_to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+@lru_cache(maxsize=24 * 60)
+def minutes_to_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_interval(value):
+    match = INTERVAL_RE.fullmatch(value)
+    if match is None:
+        raise ValueError('Invalid interval: {}'.format(value))
+    start_hour, start_minute, end_hour, end_minute = match.groups()
+    return int(start_hour) * 60 + int(start_minute), int(end_hour) * 60 + int(end_minute)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def format_interval(start, end):
+    return '{:02d}:{:02d}-{:02d}:{:02d}'.format(start // 60, start % 60, end // 60, end % 60)
+
+
+def minute_intervals(time_ranges):
+    # closed (start, end) minute-of-day pairs; an interval running past midnight is split in two
+    intervals = []
+    for time_range in time_ranges:
+        start, end = time_to_minutes(time_range[0]), time_to_minutes(time_range[-1])
+        if start <= end:
+            intervals.append((start, end))
+        else:
+            intervals += [(start, 24 * 60 - 1), (0, end)]
+    return intervals
+
+
+def overlaps(intervals, other_intervals):
+    return any(start <= other_end and other_start <= end
+               for start, end in intervals for other_start, other_end in other_intervals)
+
+
+def parse_intervals(values):
+    try:
+        minutes = [parse_interval(value) for value in values]
+    except TypeError:
+        raise ValueError('Intervals must be strings')
+    return [[minutes_to_time(start), minutes_to_time(end)] for start, end in minutes]
+
+
+def format_intervals(time_ranges):
+    return [format_interval(time_to_minutes(time_range[0]), time_to_minutes(time_range[-1]))
+            for time_range in time_ranges]
@@ -0,0 +1,231 @@
+import csv
+import io
+import itertools
+import time
+from collections.abc import Mapping
+
+from django.db import connection, transaction
+from rest_framework.settings import api_settings
+
+from .codec import COURIER_FIELDS, ORDER_FIELDS, Invalid, loads
+from . import stats
+from .intervals import minute_intervals
+from .models import CourierModel, DeliveryIntervalModel, OrderModel
+from .utils import ARCHIVES
+
+INVALID_JSON = object()
+UNSEEN = object()
+
+
+def ndjson_rows(file, list_fields):
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, loads(line)
+        except ValueError:
+            yield number, INVALID_JSON
+
+
+def csv_rows(file, list_fields):
+    # a list field holds its items separated by spaces: "1 12 22", "09:00-12:00 16:00-21:30"
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, {name: value.split() if name in list_fields and isinstance(value, str) else value
+                                for name, value in row.items()}
+
+
+READERS = {'csv': csv_rows, 'ndjson': ndjson_rows}
+
+
+def column_key(value):
+    # the values a validator result is reused for: strings, integers and lists of them, which repeat across rows
+    # (regions, courier types, hours); booleans and floats are left out, as True == 1 == 1.0
+    if type(value) is str or type(value) is int:
+        return value
+    if type(value) is list and all(type(item) is str or type(item) is int for item in value):
+        return tuple(value)
+    return None
+
+
+def validate_rows(fields, rows):
+    """
+    Runs the field validators of delivery_service.codec, which accept what the API serializers accept, over the
+    rows column by column, each value that repeats in a column once, and returns the validated row and the errors
+    of each field for every row.
+    """
+    results = []
+    mappings = []
+    names = fields.keys()
+    for data in rows:
+        if data is INVALID_JSON:
+            results.append((None, {api_settings.NON_FIELD_ERRORS_KEY: ['Invalid JSON.']}))
+        elif not isinstance(data, Mapping):
+            results.append((None, {api_settings.NON_FIELD_ERRORS_KEY: ['Invalid data.']}))
+        else:
+            errors = {}
+            unknown = data.keys() - names
+            if unknown:
+                errors[api_settings.NON_FIELD_ERRORS_KEY] = ['Unknown field: {}'.format(name) for name in unknown]
+            results.append(({}, errors))
+            mappings.append((data, results[-1]))
+    for name, validate in fields.items():
+        column = {}
+        for data, (validated, errors) in mappings:
+            if name not in data:
+                errors[name] = ['This field is required.']
+                continue
+            key = column_key(data[name])
+            value = column.get(key, UNSEEN) if key is not None else UNSEEN
+            if value is UNSEEN:
+                try:
+                    value = validate(data[name])
+                except Invalid:
+                    value = Invalid
+                if key is not None:
+                    column[key] = value
+            if value is Invalid:
+                errors[name] = ['Invalid value.']
+            else:
+                validated[name] = value
+    return results
+
+
+def validate_row(fields, data):
+    return validate_rows(fields, [data])[0]
+
+
+def copy_value(value):
+    # COPY text format; validated values never contain tabs, newlines or backslashes
+    if isinstance(value, list):
+        return '{' + ','.join(copy_value(item) for item in value) + '}'
+    return str(value)
+
+
+class Loader:
+    """
+    Loads couriers or orders from a file: each batch of valid rows is written to a temporary staging table with
+    COPY and merged into the live tables by a single statement in its own transaction. Invalid rows and rows whose
+    id is already taken, archived or repeated in the file are passed to reject(line, id, errors).
+    """
+    object_name = None
+    model = None
+    fields = None
+    # fields that a CSV file lists separated by spaces
+    list_fields = ()
+    # the table of minute ranges of the hours_field of each row, if the model keeps one
+    interval_model = None
+    owner_field = None
+    hours_field = None
+
+    def __init__(self, reject, batch_size):
+        self.reject = reject
+        self.batch_size = batch_size
+        self.loaded = self.rejected = 0
+        self.timings = {'validation': 0.0, 'copy': 0.0, 'merge': 0.0}
+
+    def load(self, file, file_format, progress=None):
+        rows = READERS[file_format](file, self.list_fields)
+        id_field_name = self.model._meta.pk.name
+        while True:
+            start = time.perf_counter()
+            chunk = list(itertools.islice(rows, self.batch_size))
+            if not chunk:
+                return
+            batch = []
+            results = validate_rows(self.fields, [data for _, data in chunk])
+            for (line, data), (validated, errors) in zip(chunk, results):
+                if errors:
+                    self.reject(line, data.get(id_field_name) if isinstance(data, Mapping) else None, errors)
+                    self.rejected += 1
+                else:
+                    batch.append((line, validated))
+            self.timings['validation'] += time.perf_counter() - start
+            if batch:
+                self.load_batch(batch)
+            if progress:
+                progress(self)
+
+    def load_batch(self, batch):
+        meta = self.model._meta
+        pk = meta.pk.column
+        columns = [meta.get_field(name).column for name in self.fields]
+        # model defaults of the columns a file does not fill, e.g. the courier's earnings
+        defaults = [field for field in meta.concrete_fields if field.name not in self.fields and not field.null]
+        with transaction.atomic(), connection.cursor() as cursor:
+            start = time.perf_counter()
+            # dropped at the end rather than ON COMMIT, the batch may run inside an outer transaction
+            cursor.execute('CREATE TEMPORARY TABLE load_staging AS '
+                           'SELECT 0 AS line, {} FROM {} WITH NO DATA'.format(', '.join(columns), meta.db_table))
+            cursor.copy_expert('COPY load_staging (line, {}) FROM STDIN'.format(', '.join(columns)),
+                               io.StringIO(''.join(
+                                   '{}\t{}\n'.format(line, '\t'.join(copy_value(row[name]) for name in self.fields))
+                                   for line, row in batch)))
+            intervals = ''
+            if self.interval_model:
+                cursor.execute('CREATE TEMPORARY TABLE load_intervals (line integer, minutes int4range)')
+                cursor.copy_expert('COPY load_intervals (line, minutes) FROM STDIN', io.StringIO(''.join(
+                    '{}\t[{},{}]\n'.format(line, interval_start, interval_end) for line, row in batch
+                    for interval_start, interval_end in minute_intervals(row[self.hours_field]))))
+                intervals = (
+                    ', intervals AS ('
+                    '    INSERT INTO {intervals} ({owner}, minutes)'
+                    '    SELECT loaded.{pk}, load_intervals.minutes FROM load_intervals JOIN loaded USING (line)'
+                    ')'.format(intervals=self.interval_model._meta.db_table, pk=pk,
+                               owner=self.interval_model._meta.get_field(self.owner_field).column))
+            self.timings['copy'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            cursor.execute(
+                'WITH ranked AS ('
+                '    SELECT *, row_number() OVER (PARTITION BY {pk} ORDER BY line) AS position FROM load_staging'
+                '), inserted AS ('
+                '    INSERT INTO {table} ({columns}) SELECT {values} FROM ranked'
+                '    WHERE position = 1 {not_archived}'
+                '    ON CONFLICT ({pk}) DO NOTHING RETURNING {pk}'
+                '), loaded AS ('
+                '    SELECT line, {pk} FROM ranked JOIN inserted USING ({pk}) WHERE position = 1'
+                '){intervals} '
+                'SELECT line, {pk} FROM ranked WHERE line NOT IN (SELECT line FROM loaded) ORDER BY line'.format(
+                    pk=pk, table=meta.db_table,
+                    columns=', '.join(columns + [field.column for field in defaults]),
+                    values=', '.join(columns + ['%s'] * len(defaults)),
+                    not_archived=''.join(
+                        ' AND NOT EXISTS (SELECT 1 FROM {archive} WHERE {archive}.{pk} = ranked.{pk})'.format(
+                            archive=archive._meta.db_table, pk=archive._meta.pk.column)
+                        for archive in ARCHIVES.get(self.model, ())),
+                    intervals=intervals),
+                [field.get_default() for field in defaults])
+            taken = cursor.fetchall()
+            cursor.execute('DROP TABLE load_staging' + (', load_intervals' if self.interval_model else ''))
+            taken_lines = {line for line, _ in taken}
+            self.merged([row for line, row in batch if line not in taken_lines])
+            self.timings['merge'] += time.perf_counter() - start
+        for line, object_id in taken:
+            self.reject(line, object_id, {meta.pk.name: ['This field must be unique.']})
+        self.rejected += len(taken)
+        self.loaded += len(batch) - len(taken)
+
+    def merged(self, rows):
+        # called in the transaction of a batch with its rows that were loaded
+        pass
+
+
+class CourierLoader(Loader):
+    object_name = 'courier'
+    model = CourierModel
+    fields = COURIER_FIELDS
+    list_fields = ('regions', 'working_hours')
+
+
+class OrderLoader(Loader):
+    object_name = 'order'
+    model = OrderModel
+    fields = ORDER_FIELDS
+    list_fields = ('delivery_hours',)
+    interval_model = DeliveryIntervalModel
+    owner_field = 'order'
+    hours_field = 'delivery_hours'
+
+    def merged(self, rows):
+        stats.record_imported(row['region'] for row in rows)
@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from delivery_service.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Moves completed orders from the live orders table to the archive in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=settings.ORDER_ARCHIVE_AFTER_HOURS,
+                            help='Archive orders completed more than this many hours ago.')
+        parser.add_argument('--batch-size', type=int, default=settings.ORDER_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds to wait between batches to leave room for requests.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and archive every this many seconds.')
+
+    def handle(self, *args, **options):
+        pause = (lambda: time.sleep(options['sleep'])) if options['sleep'] else None
+        while True:
+            completed_before = timezone.now() - timedelta(hours=options['older_than'])
+            moved = archive_orders(completed_before, options['batch_size'], pause)
+            self.stdout.write('Archived {} orders completed before {}'.format(moved, completed_before.isoformat()))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
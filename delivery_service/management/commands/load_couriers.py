@@ -0,0 +1,56 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from delivery_service.codec import dumps
+from delivery_service.loader import READERS, CourierLoader
+
+
+class Command(BaseCommand):
+    help = 'Loads couriers from a CSV or NDJSON file with COPY, writing the rejected rows to a rejects file.'
+    loader_class = CourierLoader
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help='File format, by default csv for a .csv file and ndjson otherwise.')
+        parser.add_argument('--batch-size', type=int, default=settings.BULK_LOAD_BATCH_SIZE)
+        parser.add_argument('--rejects', help='NDJSON file for the rejected rows, by default the path with '
+                                              '.rejects appended. Not created when every row is loaded.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        rejects_path = options['rejects'] or path + '.rejects'
+        rejects = None
+        name = self.loader_class.object_name + 's'
+
+        def reject(line, object_id, errors):
+            nonlocal rejects
+            if rejects is None:
+                rejects = open(rejects_path, 'wb')
+            rejects.write(dumps({'line': line, 'id': object_id, 'errors': errors}) + b'\n')
+
+        def progress(loader):
+            if options['verbosity'] > 1:
+                self.stdout.write('{} {} loaded, {} rejected'.format(loader.loaded, name, loader.rejected))
+
+        loader = self.loader_class(reject, options['batch_size'])
+        start = time.perf_counter()
+        try:
+            with open(path, newline='') as file:
+                loader.load(file, file_format, progress)
+        finally:
+            if rejects is not None:
+                rejects.close()
+        elapsed = time.perf_counter() - start
+        rows = loader.loaded + loader.rejected
+        self.stdout.write('Loaded {} {} from {}, rejected {}{}'.format(
+            loader.loaded, name, os.path.basename(path), loader.rejected,
+            ' (see {})'.format(rejects_path) if loader.rejected else ''))
+        self.stdout.write('{} rows in {:.1f} s, {:.0f} rows/s: validation {:.1f} s, COPY {:.1f} s, '
+                          'merge {:.1f} s'.format(rows, elapsed, rows / elapsed if elapsed else 0,
+                                                  loader.timings['validation'], loader.timings['copy'],
+                                                  loader.timings['merge']))
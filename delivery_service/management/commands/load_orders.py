@@ -0,0 +1,7 @@
+from delivery_service.loader import OrderLoader
+from delivery_service.management.commands.load_couriers import Command as LoadCouriersCommand
+
+
+class Command(LoadCouriersCommand):
+    help = 'Loads orders from a CSV or NDJSON file with COPY, writing the rejected rows to a rejects file.'
+    loader_class = OrderLoader
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from delivery_service.outbox import process_events
+
+
+class Command(BaseCommand):
+    help = 'Applies completion events from the outbox to the earnings and ratings of the couriers in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and poll the outbox every this many seconds once it is empty.')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_events(options['batch_size'])
+            if processed or not options['interval']:
+                self.stdout.write('Processed {} completion events'.format(processed))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from delivery_service.idempotency import expired_before, purge_keys
+
+
+class Command(BaseCommand):
+    help = 'Deletes idempotency keys older than IDEMPOTENCY_KEY_TTL hours in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and purge every this many seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            purged = purge_keys(expired_before(), options['batch_size'])
+            self.stdout.write('Purged {} expired idempotency keys'.format(purged))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,361 @@
+import asyncio
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 1000)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+# any other verb a client sends is recorded as 'other', so that clients can not add label values
+METHODS = frozenset(('GET', 'POST', 'PATCH', 'PUT', 'DELETE', 'HEAD', 'OPTIONS'))
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}
+        self.lock = Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            if labels not in self.values:
+                self.values[labels] = [[0] * (len(self.buckets) + 1), 0]
+            counts = self.values[labels]
+            counts[0][index] += 1
+            counts[1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {labels: [[*counts], total] for labels, (counts, total) in self.values.items()}
+
+    def samples(self, values):
+        for labels, (counts, total) in sorted(values.items()):
+            names = ''.join('{}="{}",'.format(name, value) for name, value in zip(self.labels, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield '{}_bucket{{{}le="{}"}} {}'.format(self.name, names, bound, cumulative)
+            yield '{}_sum{{{}}} {}'.format(self.name, names.rstrip(','), total)
+            yield '{}_count{{{}}} {}'.format(self.name, names.rstrip(','), cumulative)
+
+    def render(self, values=None):
+        return '\n'.join(['# HELP {} {}'.format(self.name, self.documentation),
+                          '# TYPE {} histogram'.format(self.name),
+                          *self.samples(self.snapshot() if values is None else values)])
+
+
+class Counter:
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+        self.lock = Lock()
+
+    def inc(self, labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + 1
+
+    def value(self, labels):
+        with self.lock:
+            return self.values.get(labels, 0)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    def render(self, values=None):
+        if values is None:
+            values = self.snapshot()
+        return '\n'.join(['# HELP {} {}'.format(self.name, self.documentation),
+                          '# TYPE {} counter'.format(self.name)] + [
+            '{}{{{}}} {}'.format(self.name, ','.join('{}="{}"'.format(name, value)
+                                                      for name, value in zip(self.labels, labels)), count)
+            for labels, count in sorted(values.items())])
+
+
+class Gauge:
+    """
+    A value read on every render, for figures kept outside the process.
+    """
+    def __init__(self, name, documentation, read):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self):
+        return '\n'.join(['# HELP {} {}'.format(self.name, self.documentation),
+                          '# TYPE {} gauge'.format(self.name), '{} {}'.format(self.name, self.read())])
+
+
+request_duration = Histogram('delivery_request_duration_seconds', 'Time spent handling the request.',
+                             ('view', 'method', 'status'), DURATION_BUCKETS)
+sql_queries = Histogram('delivery_sql_queries', 'SQL queries executed per request.', ('view',), QUERY_BUCKETS)
+sql_duration = Histogram('delivery_sql_duration_seconds', 'Time spent in SQL queries per request.', ('view',),
+                         DURATION_BUCKETS)
+serializer_duration = Histogram('delivery_serializer_duration_seconds',
+                                'Time spent parsing, validating and rendering JSON per request.', ('view',),
+                                DURATION_BUCKETS)
+response_size = Histogram('delivery_response_size_bytes', 'Size of the response body.', ('view',), SIZE_BUCKETS)
+registry = [request_duration, sql_queries, sql_duration, serializer_duration, response_size]
+
+
+def combine(value, other):
+    # a counter is a number, a histogram the bucket counts and the sum
+    if isinstance(value, list):
+        return [combine(*pair) for pair in zip(value, other)]
+    return value + other
+
+
+def read_values(path, values):
+    with open(path) as file:
+        for name, samples in json.load(file).items():
+            metric = values.setdefault(name, {})
+            for labels, value in samples:
+                labels = tuple(labels)
+                metric[labels] = combine(metric[labels], value) if labels in metric else value
+    return values
+
+
+def write_values(path, values):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump({name: [[list(labels), value] for labels, value in samples.items()]
+                   for name, samples in values.items()}, file)
+    os.replace(temporary, path)
+
+
+class SharedDirectory:
+    """
+    With METRICS_DIR set, every process writes its histograms and counters to <pid>.json there every
+    METRICS_FLUSH_INTERVAL seconds and when its gunicorn worker exits, and /metrics adds up the files of the other
+    processes, so that any worker reports the whole server. The files of exited workers are folded into exited.json
+    by the gunicorn master (gunicorn.conf.py); values a worker observed after its last write are lost if it is
+    killed.
+    """
+    exited = 'exited.json'
+
+    def __init__(self):
+        self.lock = Lock()
+        self.pid = None
+
+    def path(self, pid):
+        return os.path.join(settings.METRICS_DIR, '{}.json'.format(pid))
+
+    def start(self):
+        # the first observation in a process starts writing its values
+        if not settings.METRICS_DIR or self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def flush(self):
+        if self.pid == os.getpid():
+            write_values(self.path(self.pid), snapshot())
+
+    @contextmanager
+    def locked(self, operation):
+        # a fold replaces two files, readers see either both before or both after it
+        with open(os.path.join(settings.METRICS_DIR, '.lock'), 'a') as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    def others(self, values):
+        own = self.path(os.getpid())
+        with self.locked(fcntl.LOCK_SH):
+            for name in sorted(os.listdir(settings.METRICS_DIR)):
+                path = os.path.join(settings.METRICS_DIR, name)
+                if name.endswith('.json') and path != own:
+                    read_values(path, values)
+        return values
+
+    def fold(self, pid):
+        # called in the gunicorn master once a worker has exited
+        path = self.path(pid)
+        exited = os.path.join(settings.METRICS_DIR, self.exited)
+        with self.locked(fcntl.LOCK_EX):
+            if not os.path.exists(path):
+                return
+            values = read_values(exited, {}) if os.path.exists(exited) else {}
+            write_values(exited, read_values(path, values))
+            os.remove(path)
+
+
+shared = SharedDirectory()
+
+
+def snapshot():
+    return {metric.name: metric.snapshot() for metric in registry if hasattr(metric, 'snapshot')}
+
+
+def render():
+    values = snapshot()
+    if settings.METRICS_DIR:
+        values = shared.others(values)
+    return '\n'.join(metric.render(values.get(metric.name, {})) if hasattr(metric, 'snapshot') else metric.render()
+                     for metric in registry) + '\n'
+
+
+class RequestStats:
+    __slots__ = ('queries', 'sql', 'serializer')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.serializer = 0.0
+
+
+# Set for the duration of a request; copied into the threads that asgiref runs synchronous code in
+current = ContextVar('delivery_service_request_stats', default=None)
+
+
+@contextmanager
+def measure(field):
+    stats = current.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(stats, field, getattr(stats, field) + time.perf_counter() - start)
+        if field == 'sql':
+            stats.queries += 1
+
+
+def record_query(execute, sql, params, many, context):
+    with measure('sql'):
+        return execute(sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+class TimedSerializer:
+    """
+    Wraps a serializer so that validation and rendering count as serializer time of the current request.
+    """
+    def __init__(self, serializer):
+        self.serializer = serializer
+
+    def is_valid(self, *args, **kwargs):
+        with measure('serializer'):
+            return self.serializer.is_valid(*args, **kwargs)
+
+    @property
+    def data(self):
+        with measure('serializer'):
+            return self.serializer.data
+
+    def __getattr__(self, name):
+        return getattr(self.serializer, name)
+
+
+def timed_serializer(serializer_class):
+    return lambda *args, **kwargs: TimedSerializer(serializer_class(*args, **kwargs))
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # marks the instance as a coroutine function for Django, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token, start = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.observed(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats, token, start = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.observed(request, response, stats, start)
+
+    @staticmethod
+    def start():
+        stats = RequestStats()
+        return stats, current.set(stats), time.perf_counter()
+
+    def observed(self, request, response, stats, start):
+        if response.streaming:
+            response.streaming_content = self.stream(request, response, response.streaming_content, stats, start)
+        else:
+            self.observe(request, response, stats, start, len(response.content))
+        return response
+
+    def stream(self, request, response, content, stats, start):
+        # the body of a streaming response is produced after the view returns: it runs under the stats of the
+        # request, which are recorded once the body is exhausted or closed
+        size = 0
+        try:
+            while True:
+                token = current.set(stats)
+                try:
+                    chunk = next(content, None)
+                finally:
+                    current.reset(token)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            self.observe(request, response, stats, start, size)
+
+    @staticmethod
+    def observe(request, response, stats, start, size):
+        view = request.resolver_match.url_name if request.resolver_match else 'unmatched'
+        if view == 'metrics':
+            return
+        shared.start()
+        method = request.method if request.method in METHODS else 'other'
+        request_duration.observe((view, method, str(response.status_code)), time.perf_counter() - start)
+        sql_queries.observe((view,), stats.queries)
+        sql_duration.observe((view,), stats.sql)
+        serializer_duration.observe((view,), stats.serializer)
+        response_size.observe((view,), size)
@@ -0,0 +1,50 @@
+# Generated by Django 3.2 on 2026-10-18 15:33
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+from psycopg2.extras import NumericRange
+
+
+def minute_ranges(time_ranges):
+    for time_range in time_ranges:
+        start = time_range[0].hour * 60 + time_range[0].minute
+        end = time_range[-1].hour * 60 + time_range[-1].minute
+        if start <= end:
+            yield NumericRange(start, end, '[]')
+        else:
+            yield NumericRange(start, 24 * 60 - 1, '[]')
+            yield NumericRange(0, end, '[]')
+
+
+def fill_intervals(apps, schema_editor):
+    OrderModel = apps.get_model('delivery_service', 'OrderModel')
+    DeliveryIntervalModel = apps.get_model('delivery_service', 'DeliveryIntervalModel')
+    DeliveryIntervalModel.objects.bulk_create(
+        (DeliveryIntervalModel(order_id=order_id, minutes=minutes)
+         for order_id, delivery_hours in OrderModel.objects.values_list('order_id', 'delivery_hours').iterator()
+         for minutes in minute_ranges(delivery_hours)), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery_service', '0003_auto_20210510_1243'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryIntervalModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minutes', django.contrib.postgres.fields.ranges.IntegerRangeField()),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_intervals', to='delivery_service.ordermodel')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='deliveryintervalmodel',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['minutes'], name='delivery_se_minutes_ff6b21_gist'),
+        ),
+        migrations.RunPython(fill_intervals, migrations.RunPython.noop),
+    ]
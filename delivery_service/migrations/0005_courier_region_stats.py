@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-18 15:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_region_stats(apps, schema_editor):
+    OrderModel = apps.get_model('delivery_service', 'OrderModel')
+    CourierRegionStatsModel = apps.get_model('delivery_service', 'CourierRegionStatsModel')
+    completed = OrderModel.objects.exclude(complete_time=None).exclude(courier=None) \
+        .values('courier_id', 'region') \
+        .annotate(completed_orders=models.Count('order_id'), delivery_time_sum=models.Sum('delivery_time'),
+                  last_complete_time=models.Max('complete_time')).order_by()
+    CourierRegionStatsModel.objects.bulk_create(
+        (CourierRegionStatsModel(courier_id=row['courier_id'], region=row['region'],
+                                 completed_orders=row['completed_orders'],
+                                 delivery_time_sum=row['delivery_time_sum'] or 0,
+                                 last_complete_time=row['last_complete_time'])
+         for row in completed.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery_service', '0004_time_intervals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourierRegionStatsModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.IntegerField()),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('delivery_time_sum', models.BigIntegerField(default=0)),
+                ('last_complete_time', models.DateTimeField(null=True)),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='region_stats', to='delivery_service.couriermodel')),
+            ],
+            options={
+                'unique_together': {('courier', 'region')},
+            },
+        ),
+        migrations.RunPython(fill_region_stats, migrations.RunPython.noop),
+    ]
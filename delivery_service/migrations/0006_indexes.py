@@ -0,0 +1,29 @@
+# Generated by Django 3.2 on 2026-10-18 16:04
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the indexes are built without locking the tables against writes
+    atomic = False
+
+    dependencies = [
+        ('delivery_service', '0005_courier_region_stats'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='couriermodel',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['regions'], name='courier_regions_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='ordermodel',
+            index=models.Index(condition=models.Q(assign_time=None), fields=['region', 'weight'], name='order_unassigned_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='ordermodel',
+            index=models.Index(condition=models.Q(complete_time=None), fields=['courier', 'region', 'weight'], name='order_open_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2 on 2026-10-18 16:16
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery_service', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrderModel',
+            fields=[
+                ('order_id', models.IntegerField(primary_key=True, serialize=False, unique=True)),
+                ('weight', models.FloatField()),
+                ('region', models.IntegerField()),
+                ('delivery_hours', django.contrib.postgres.fields.ArrayField(base_field=django.contrib.postgres.fields.ArrayField(base_field=models.TimeField(), size=None), size=None)),
+                ('courier_salary_coefficient', models.IntegerField(null=True)),
+                ('assign_time', models.DateTimeField(null=True)),
+                ('complete_time', models.DateTimeField()),
+                ('delivery_time', models.IntegerField(null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='ordermodel',
+            index=models.Index(condition=models.Q(complete_time__isnull=False), fields=['complete_time'], name='order_completed_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedordermodel',
+            name='courier',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='delivery_service.couriermodel'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 3.2 on 2026-10-18 16:55
+
+from collections import Counter, defaultdict
+
+from django.db import migrations, models
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+
+def fill_stats(apps, schema_editor):
+    RegionStatsModel = apps.get_model('delivery_service', 'RegionStatsModel')
+    RegionHourStatsModel = apps.get_model('delivery_service', 'RegionHourStatsModel')
+    CourierTypeStatsModel = apps.get_model('delivery_service', 'CourierTypeStatsModel')
+    regions = defaultdict(Counter)
+    hours = defaultdict(Counter)
+    courier_types = defaultdict(Counter)
+    for name in ('OrderModel', 'ArchivedOrderModel'):
+        orders = apps.get_model('delivery_service', name).objects.order_by()
+        for row in orders.values('region').annotate(
+                unassigned_orders=models.Count('order_id', filter=models.Q(assign_time=None)),
+                assigned_orders=models.Count('order_id', filter=models.Q(assign_time__isnull=False,
+                                                                         complete_time=None)),
+                completed_orders=models.Count('order_id', filter=models.Q(complete_time__isnull=False)),
+                delivery_time_sum=models.Sum('delivery_time', filter=models.Q(complete_time__isnull=False))):
+            regions[row.pop('region')].update({key: value or 0 for key, value in row.items()})
+        completed = orders.exclude(complete_time=None)
+        for row in completed.values('region', hour=TruncHour('complete_time', tzinfo=timezone.utc)).annotate(
+                completed_orders=models.Count('order_id'), delivery_time_sum=models.Sum('delivery_time')):
+            hours[row.pop('region'), row.pop('hour')].update({key: value or 0 for key, value in row.items()})
+        for row in completed.exclude(courier=None).values('courier__courier_type').annotate(
+                completed_orders=models.Count('order_id'), earnings=models.Sum('courier_salary_coefficient')):
+            courier_types[row['courier__courier_type']].update(completed_orders=row['completed_orders'],
+                                                               earnings=500 * (row['earnings'] or 0))
+    RegionStatsModel.objects.bulk_create(
+        [RegionStatsModel(region=region, **counters) for region, counters in regions.items()], batch_size=1000)
+    RegionHourStatsModel.objects.bulk_create(
+        [RegionHourStatsModel(region=region, hour=hour, **counters) for (region, hour), counters in hours.items()],
+        batch_size=1000)
+    CourierTypeStatsModel.objects.bulk_create(
+        [CourierTypeStatsModel(courier_type=courier_type, **counters)
+         for courier_type, counters in courier_types.items()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery_service', '0007_archived_orders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourierTypeStatsModel',
+            fields=[
+                ('courier_type', models.CharField(choices=[('foot', 'foot'), ('bike', 'bike'), ('car', 'car')], max_length=5, primary_key=True, serialize=False, unique=True)),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('earnings', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RegionStatsModel',
+            fields=[
+                ('region', models.IntegerField(primary_key=True, serialize=False, unique=True)),
+                ('unassigned_orders', models.IntegerField(default=0)),
+                ('assigned_orders', models.IntegerField(default=0)),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('delivery_time_sum', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RegionHourStatsModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.IntegerField()),
+                ('hour', models.DateTimeField()),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('delivery_time_sum', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('hour', 'region')},
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery_service', '0008_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKeyModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('path', models.CharField(max_length=255)),
+                ('request_hash', models.CharField(max_length=64)),
+                ('status', models.IntegerField(null=True)),
+                ('content_type', models.CharField(max_length=255, null=True)),
+                ('response', models.BinaryField(null=True)),
+                ('created', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='idempotencykeymodel',
+            index=models.Index(fields=['created'], name='idempotency_key_created_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='idempotencykeymodel',
+            unique_together={('key', 'path')},
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2 on 2026-10-18 17:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_batches(apps, schema_editor):
+    # the open orders of each courier become one batch with the earliest of their assign times
+    OrderModel = apps.get_model('delivery_service', 'OrderModel')
+    DeliveryBatchModel = apps.get_model('delivery_service', 'DeliveryBatchModel')
+    open_orders = OrderModel.objects.exclude(courier=None).filter(complete_time=None)
+    for row in open_orders.order_by().values('courier_id').annotate(
+            assign_time=models.Min('assign_time'), open_orders=models.Count('order_id')).iterator():
+        batch = DeliveryBatchModel.objects.create(**row)
+        open_orders.filter(courier_id=row['courier_id']).update(batch=batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery_service', '0009_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryBatchModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assign_time', models.DateTimeField()),
+                ('open_orders', models.IntegerField()),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='delivery_service.couriermodel')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedordermodel',
+            name='batch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='delivery_service.deliverybatchmodel'),
+        ),
+        migrations.AddField(
+            model_name='ordermodel',
+            name='batch',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='delivery_service.deliverybatchmodel'),
+        ),
+        migrations.AddConstraint(
+            model_name='deliverybatchmodel',
+            constraint=models.UniqueConstraint(condition=models.Q(open_orders__gt=0), fields=('courier',), name='delivery_batch_open_idx'),
+        ),
+        migrations.RunPython(open_batches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-18 17:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery_service', '0010_delivery_batches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompletionEventModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.IntegerField()),
+                ('payment', models.IntegerField()),
+                ('created', models.DateTimeField()),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completion_events', to='delivery_service.couriermodel')),
+            ],
+        ),
+    ]
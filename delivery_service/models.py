@@ -1,5 +1,6 @@
 from django.db import models
-from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields import ArrayField, IntegerRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
 
 TYPE_CHOICES = [('foot', 'foot'), ('bike', 'bike'), ('car', 'car')]
 
@@ -13,6 +14,20 @@ class CourierModel(models.Model):
     earnings = models.IntegerField(default=0)
     min_delivery_time = models.FloatField(null=True)
 
+    class Meta:
+        indexes = [GinIndex(fields=['regions'], name='courier_regions_idx')]
+
+
+class DeliveryBatchModel(models.Model):
+    # orders given to a courier by one POST /orders/assign, returned to repeat calls until all of them are delivered
+    courier = models.ForeignKey(CourierModel, on_delete=models.CASCADE, related_name='batches')
+    assign_time = models.DateTimeField()
+    open_orders = models.IntegerField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['courier'], condition=models.Q(open_orders__gt=0),
+                                               name='delivery_batch_open_idx')]
+
 
 class OrderModel(models.Model):
     order_id = models.IntegerField(unique=True, primary_key=True)
@@ -20,7 +35,105 @@ class OrderModel(models.Model):
     region = models.IntegerField()
     delivery_hours = ArrayField(ArrayField(models.TimeField()))
     courier = models.ForeignKey(CourierModel, on_delete=models.SET_NULL, null=True)
+    batch = models.ForeignKey(DeliveryBatchModel, on_delete=models.SET_NULL, null=True, related_name='orders')
     courier_salary_coefficient = models.IntegerField(null=True)
     assign_time = models.DateTimeField(null=True)
     complete_time = models.DateTimeField(null=True)
     delivery_time = models.IntegerField(null=True)
+
+    class Meta:
+        indexes = [
+            # unassigned orders of the courier's regions that fit the remaining capacity (assign_orders)
+            models.Index(fields=['region', 'weight'], condition=models.Q(assign_time=None),
+                         name='order_unassigned_idx'),
+            # open orders of a courier: their weight (assign_orders) and the orders to keep or release
+            # (withdraw_orders)
+            models.Index(fields=['courier', 'region', 'weight'], condition=models.Q(complete_time=None),
+                         name='order_open_idx'),
+            # completed orders waiting to be moved to ArchivedOrderModel (archive_orders)
+            models.Index(fields=['complete_time'], condition=models.Q(complete_time__isnull=False),
+                         name='order_completed_idx'),
+        ]
+
+
+class ArchivedOrderModel(models.Model):
+    # completed orders moved out of OrderModel by the archive_orders command
+    order_id = models.IntegerField(unique=True, primary_key=True)
+    weight = models.FloatField()
+    region = models.IntegerField()
+    delivery_hours = ArrayField(ArrayField(models.TimeField()))
+    courier = models.ForeignKey(CourierModel, on_delete=models.SET_NULL, null=True, related_name='archived_orders')
+    batch = models.ForeignKey(DeliveryBatchModel, on_delete=models.SET_NULL, null=True,
+                              related_name='archived_orders')
+    courier_salary_coefficient = models.IntegerField(null=True)
+    assign_time = models.DateTimeField(null=True)
+    complete_time = models.DateTimeField()
+    delivery_time = models.IntegerField(null=True)
+
+
+class CourierRegionStatsModel(models.Model):
+    courier = models.ForeignKey(CourierModel, on_delete=models.CASCADE, related_name='region_stats')
+    region = models.IntegerField()
+    completed_orders = models.IntegerField(default=0)
+    delivery_time_sum = models.BigIntegerField(default=0)
+    last_complete_time = models.DateTimeField(null=True)
+
+    class Meta:
+        unique_together = ('courier', 'region')
+
+
+class DeliveryIntervalModel(models.Model):
+    order = models.ForeignKey(OrderModel, on_delete=models.CASCADE, related_name='delivery_intervals')
+    minutes = IntegerRangeField()
+
+    class Meta:
+        indexes = [GistIndex(fields=['minutes'])]
+
+
+class RegionStatsModel(models.Model):
+    # order counters of a region, changed together with the orders (delivery_service.stats)
+    region = models.IntegerField(unique=True, primary_key=True)
+    unassigned_orders = models.IntegerField(default=0)
+    assigned_orders = models.IntegerField(default=0)
+    completed_orders = models.IntegerField(default=0)
+    delivery_time_sum = models.BigIntegerField(default=0)
+
+
+class RegionHourStatsModel(models.Model):
+    # orders of a region completed within an hour, for the throughput over the last hours
+    region = models.IntegerField()
+    hour = models.DateTimeField()
+    completed_orders = models.IntegerField(default=0)
+    delivery_time_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('hour', 'region')
+
+
+class CourierTypeStatsModel(models.Model):
+    courier_type = models.CharField(choices=TYPE_CHOICES, max_length=5, unique=True, primary_key=True)
+    completed_orders = models.IntegerField(default=0)
+    earnings = models.BigIntegerField(default=0)
+
+
+class IdempotencyKeyModel(models.Model):
+    # the first response to a request sent with an Idempotency-Key header (delivery_service.idempotency)
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status = models.IntegerField(null=True)
+    content_type = models.CharField(max_length=255, null=True)
+    response = models.BinaryField(null=True)
+    created = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('key', 'path')
+        indexes = [models.Index(fields=['created'], name='idempotency_key_created_idx')]
+
+
+class CompletionEventModel(models.Model):
+    # a completed order whose payment and rating are not applied to the courier yet (delivery_service.outbox)
+    courier = models.ForeignKey(CourierModel, on_delete=models.CASCADE, related_name='completion_events')
+    order_id = models.IntegerField()
+    payment = models.IntegerField()
+    created = models.DateTimeField()
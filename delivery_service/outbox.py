@@ -0,0 +1,96 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import metrics, stats
+from .cache import invalidate_courier
+from .models import CompletionEventModel, CourierModel, CourierRegionStatsModel
+
+EVENTS_TABLE = CompletionEventModel._meta.db_table
+
+
+def courier_rating(min_delivery_time):
+    return round((60 * 60 - min(min_delivery_time, 60 * 60)) / (60 * 60) * 5, 2)
+
+
+def add_events(events):
+    """
+    Writes an event per (courier_id, order_id, payment) in the transaction of the completion, for process_batch to
+    apply to the courier later.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {table} (courier_id, order_id, payment, created) '
+            'SELECT event.courier_id, event.order_id, event.payment, %s '
+            'FROM unnest(%s::integer[], %s::integer[], %s::integer[]) AS event (courier_id, order_id, payment)'.format(
+                table=EVENTS_TABLE),
+            [timezone.now(), [courier_id for courier_id, _, _ in events], [order_id for _, order_id, _ in events],
+             [payment for _, _, payment in events]])
+
+
+def process_batch(batch_size):
+    """
+    Applies up to batch_size of the oldest events to the earnings, minimal delivery time and rating of their
+    couriers and deletes them in the same transaction, so every event is applied once even if the worker dies.
+    Rows locked by another worker are skipped, so several workers may run at once.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        # the batch is materialized: rescanned as a subquery it skips the rows already deleted and returns new ones
+        cursor.execute(
+            'WITH batch AS MATERIALIZED ('
+            '    SELECT id FROM {table} ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED'
+            ') DELETE FROM {table} USING batch WHERE {table}.id = batch.id '
+            'RETURNING courier_id, payment'.format(table=EVENTS_TABLE), [batch_size])
+        events = cursor.fetchall()
+        if not events:
+            return 0
+        earnings = stats.totals((courier_id, payment) for courier_id, payment in events)
+        courier_ids = [courier_id for courier_id, _ in earnings]
+        # the courier lock waits for completions of the courier that are still updating its region stats
+        list(CourierModel.objects.select_for_update().filter(courier_id__in=courier_ids).order_by('courier_id')
+             .values_list('courier_id'))
+        min_delivery_times = {}
+        for courier_id, delivery_time_sum, completed_orders in CourierRegionStatsModel.objects.filter(
+                courier_id__in=courier_ids, completed_orders__gt=0).values_list(
+                    'courier_id', 'delivery_time_sum', 'completed_orders'):
+            average = delivery_time_sum / completed_orders
+            min_delivery_times[courier_id] = min(min_delivery_times.get(courier_id, average), average)
+        cursor.execute(
+            'UPDATE {table} SET earnings = {table}.earnings + courier.payment, '
+            'min_delivery_time = courier.min_delivery_time, rating = courier.rating '
+            'FROM unnest(%s::integer[], %s::integer[], %s::float8[], %s::float8[]) '
+            'AS courier (courier_id, payment, min_delivery_time, rating) '
+            'WHERE {table}.courier_id = courier.courier_id'.format(table=CourierModel._meta.db_table),
+            [courier_ids, [payment for _, (payment,) in earnings],
+             [min_delivery_times[courier_id] for courier_id in courier_ids],
+             [courier_rating(min_delivery_times[courier_id]) for courier_id in courier_ids]])
+        for courier_id in courier_ids:
+            invalidate_courier(courier_id)
+        return len(events)
+
+
+def process_events(batch_size):
+    processed = 0
+    while True:
+        batch = process_batch(batch_size)
+        processed += batch
+        if batch < batch_size:
+            return processed
+
+
+def pending_events():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM {table}'.format(table=EVENTS_TABLE))
+        return cursor.fetchone()[0]
+
+
+def lag():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT created FROM {table} ORDER BY id LIMIT 1'.format(table=EVENTS_TABLE))
+        oldest = cursor.fetchone()
+    return (timezone.now() - oldest[0]).total_seconds() if oldest else 0
+
+
+metrics.registry += [
+    metrics.Gauge('delivery_outbox_events', 'Completion events not yet applied to the couriers.', pending_events),
+    metrics.Gauge('delivery_outbox_lag_seconds', 'Age of the oldest completion event not yet applied.', lag),
+]
@@ -1,9 +1,53 @@
 from rest_framework import serializers
-from .models import CourierModel, OrderModel, TYPE_CHOICES
-from datetime import datetime
+from .models import CourierModel, OrderModel, TYPE_CHOICES, DeliveryIntervalModel
+from django.db import transaction
 from rest_framework.fields import empty
 from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
+from .intervals import parse_intervals, format_intervals
+from .utils import taken_positions, bulk_insert, insert_intervals
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model = self.child.Meta.model
+        self.id_field_name = self.model._meta.pk.name
+        id_field = self.child.fields[self.id_field_name]
+        id_field.validators = [validator for validator in id_field.validators
+                               if not isinstance(validator, UniqueValidator)]
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        ret = []
+        errors = []
+        for item in data:
+            try:
+                ret.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                ret.append(None)
+                errors.append(exc.detail)
+
+        # one query for the whole payload instead of a UniqueValidator SELECT per item
+        for position in taken_positions(self.model, [None if item is None else item[self.id_field_name]
+                                                     for item in ret]):
+            errors[position] = {self.id_field_name: [serializers.ErrorDetail(UniqueValidator.message, code='unique')]}
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return ret
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            objects = bulk_insert(self.model, validated_data)
+            # only orders keep their hours as a table of intervals
+            if hasattr(self.child, 'insert_intervals'):
+                self.child.insert_intervals(objects)
+        return objects
 
 
 class CourierSerializer(serializers.ModelSerializer):
@@ -17,6 +61,7 @@ class CourierSerializer(serializers.ModelSerializer):
     class Meta:
         model = CourierModel
         exclude = ('min_delivery_time',)
+        list_serializer_class = BulkCreateListSerializer
 
     def run_validation(self, data):
         required_fields = ('courier_id', 'courier_type', 'regions', 'working_hours')
@@ -37,22 +82,13 @@ class CourierSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
     def validate_working_hours(self, value):
-        working_hours_list = []
-        for time_range in value:
-            try:
-                time_range_list = time_range.split('-')
-                working_hours_list.append([datetime.strptime(x, '%H:%M').time() for x in time_range_list])
-            except:
-                raise serializers.ValidationError('Enter valid working hours intervals')
-        return working_hours_list
+        try:
+            return parse_intervals(value)
+        except ValueError:
+            raise serializers.ValidationError('Enter valid working hours intervals')
 
     def working_hours_representation(self, value):
-        working_hours_list = []
-        for time_range in value:
-            time_range = [x.strftime('%H:%M') for x in time_range]
-            time_range_joined = '-'.join(time_range)
-            working_hours_list.append(time_range_joined)
-        return working_hours_list
+        return format_intervals(value)
 
     def to_representation(self, instance):
         fields_to_be_removed = ('rating', 'earnings')
@@ -74,7 +110,8 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderModel
-        exclude = ('courier', 'assign_time', 'complete_time', 'delivery_time', 'courier_salary_coefficient')
+        exclude = ('courier', 'assign_time', 'complete_time', 'delivery_time', 'courier_salary_coefficient', 'batch')
+        list_serializer_class = BulkCreateListSerializer
 
     def run_validation(self, data):
         unknown = set(data) - set(self.fields)
@@ -85,24 +122,28 @@ class OrderSerializer(serializers.ModelSerializer):
                 })
         return super(OrderSerializer, self).run_validation(data)
 
+    def insert_intervals(self, orders):
+        insert_intervals(orders, DeliveryIntervalModel, 'order', 'delivery_hours')
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            order = super().create(validated_data)
+            self.insert_intervals([order])
+        return order
+
     def validate_weight(self, value):
         if value < 0.01 or value > 50:
             raise serializers.ValidationError('Weight should be more than 0.01 and less than 50')
         return round(value, 2)
 
     def validate_delivery_hours(self, value):
-        working_hours_list = []
-        for time_range in value:
-            try:
-                time_range_list = time_range.split('-')
-                working_hours_list.append([datetime.strptime(x, '%H:%M').time() for x in time_range_list])
-            except:
-                raise serializers.ValidationError('Enter valid working hours intervals')
-        return working_hours_list
+        try:
+            return parse_intervals(value)
+        except ValueError:
+            raise serializers.ValidationError('Enter valid working hours intervals')
 
 
-class OrderAssignSerializer(serializers.Serializer):
-    courier_id = serializers.IntegerField(min_value=1)
+class StrictSerializer(serializers.Serializer):
 
     def run_validation(self, data=empty):
         if data is not empty:
@@ -112,7 +153,15 @@ class OrderAssignSerializer(serializers.Serializer):
                 raise serializers.ValidationError({
                     api_settings.NON_FIELD_ERRORS_KEY: errors,
                 })
-        return super(OrderAssignSerializer, self).run_validation(data)
+        return super(StrictSerializer, self).run_validation(data)
+
+
+class OrderAssignSerializer(StrictSerializer):
+    courier_id = serializers.IntegerField(min_value=1)
+
+
+class OrderBatchAssignSerializer(StrictSerializer):
+    courier_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
 
 
 class OrderCompleteSerializer(OrderAssignSerializer):
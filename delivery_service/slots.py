@@ -0,0 +1,213 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .assignment import Candidate, order_candidate, weight_units
+from .intervals import minute_intervals
+from .models import OrderModel
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MINUTES_PER_DAY = 24 * 60
+WORDS = -(-MINUTES_PER_DAY // 64)
+# orders of a region are kept in buckets of 5 kg so that a courier with little capacity left skips the heavy ones
+WEIGHT_BUCKET = weight_units(5)
+LOAD_CHUNK_SIZE = 10000
+
+
+def day_bitmap(time_ranges):
+    # bit m is set when minute m of the day lies in one of the closed intervals, as little-endian 64-bit words
+    bits = 0
+    for start, end in minute_intervals(time_ranges):
+        bits |= (1 << (end + 1)) - (1 << start)
+    return bits.to_bytes(WORDS * 8, 'little')
+
+
+class SlotGroup:
+    """
+    Unassigned orders of one region and weight bucket in parallel arrays. A removed order is replaced by the last
+    one so that the first `size` rows stay dense.
+    """
+    arrays = ('order_ids', 'weights', 'deadlines', 'bitmaps')
+
+    def __init__(self, order_ids=(), weights=(), deadlines=(), bitmaps=()):
+        self.size = len(order_ids)
+        self.order_ids = numpy.array(order_ids, dtype=numpy.int64)
+        self.weights = numpy.array(weights, dtype=numpy.int32)
+        self.deadlines = numpy.array(deadlines, dtype=numpy.int32)
+        self.bitmaps = numpy.frombuffer(b''.join(bitmaps), dtype='<u8').reshape(self.size, WORDS).copy()
+
+    def append(self, candidate, bitmap):
+        if self.size == len(self.order_ids):
+            for name in self.arrays:
+                array = getattr(self, name)
+                grown = numpy.zeros((max(16, 2 * self.size),) + array.shape[1:], dtype=array.dtype)
+                grown[:self.size] = array[:self.size]
+                setattr(self, name, grown)
+        self.order_ids[self.size] = candidate.order_id
+        self.weights[self.size] = candidate.weight
+        self.deadlines[self.size] = candidate.deadline
+        self.bitmaps[self.size] = numpy.frombuffer(bitmap, dtype='<u8')
+        self.size += 1
+        return self.size - 1
+
+    def remove(self, position):
+        # returns the id of the order moved to the freed position
+        self.size -= 1
+        if position == self.size:
+            return None
+        for name in self.arrays:
+            array = getattr(self, name)
+            array[position] = array[self.size]
+        return int(self.order_ids[position])
+
+    def match(self, mask, words, capacity):
+        hits = (self.bitmaps[:self.size, words] & mask[words]).any(axis=1) & (self.weights[:self.size] <= capacity)
+        positions = numpy.flatnonzero(hits)
+        return list(map(Candidate, self.order_ids[positions].tolist(), self.weights[positions].tolist(),
+                        self.deadlines[positions].tolist()))
+
+
+class SlotIndex:
+    """
+    Unassigned orders grouped by region and weight bucket, each with a bitmap of the minutes of its delivery hours.
+    The orders that fit a courier are those of its regions whose bitmap shares a bit with the bitmap of its working
+    hours, which is what utils.time_overlap finds with range overlaps in SQL.
+    """
+    def __init__(self, rows=()):
+        self.groups = {}
+        self.positions = {}
+        columns = {}
+        for order_id, weight, region, delivery_hours in rows:
+            candidate = order_candidate(order_id, weight, delivery_hours)
+            key = (region, candidate.weight // WEIGHT_BUCKET)
+            if key not in columns:
+                columns[key] = ([], [], [], [])
+            for column, value in zip(columns[key], candidate + (day_bitmap(delivery_hours),)):
+                column.append(value)
+        for key, group_columns in columns.items():
+            self.groups[key] = SlotGroup(*group_columns)
+            for position, order_id in enumerate(group_columns[0]):
+                self.positions[order_id] = (key, position)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, rows):
+        for order_id, weight, region, delivery_hours in rows:
+            self.remove([order_id])
+            candidate = order_candidate(order_id, weight, delivery_hours)
+            key = (region, candidate.weight // WEIGHT_BUCKET)
+            if key not in self.groups:
+                self.groups[key] = SlotGroup()
+            self.positions[order_id] = (key, self.groups[key].append(candidate, day_bitmap(delivery_hours)))
+
+    def remove(self, order_ids):
+        for order_id in order_ids:
+            if order_id not in self.positions:
+                continue
+            key, position = self.positions.pop(order_id)
+            moved = self.groups[key].remove(position)
+            if moved is not None:
+                self.positions[moved] = (key, position)
+
+    def candidates(self, regions, working_hours, capacity):
+        mask = numpy.frombuffer(day_bitmap(working_hours), dtype='<u8')
+        words = numpy.flatnonzero(mask)
+        result = []
+        if not len(words):
+            return result
+        for region in set(regions):
+            for bucket in range(capacity // WEIGHT_BUCKET + 1):
+                group = self.groups.get((region, bucket))
+                if group is not None and group.size:
+                    result += group.match(mask, words, capacity)
+        return result
+
+
+def unassigned_orders():
+    return OrderModel.objects.filter(assign_time=None).values_list(
+        'order_id', 'weight', 'region', 'delivery_hours').iterator(chunk_size=LOAD_CHUNK_SIZE)
+
+
+class SharedSlotIndex:
+    """
+    The index of this process: built from the database on first use and changed by the views once their
+    transactions commit. Orders imported or assigned by other processes are picked up by a rebuild in a background
+    thread once the index is older than ASSIGNMENT_SLOT_INDEX_MAX_AGE; the changes made while it runs are replayed
+    on the new index.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.built = 0
+        self.pending = None
+
+    def candidates(self, regions, working_hours, capacity):
+        with self.lock:
+            if self.index is None:
+                self.index = SlotIndex(unassigned_orders())
+                self.built = time.monotonic()
+            elif settings.ASSIGNMENT_SLOT_INDEX_MAX_AGE and self.pending is None and \
+                    time.monotonic() - self.built > settings.ASSIGNMENT_SLOT_INDEX_MAX_AGE:
+                self.pending = []
+                threading.Thread(target=self.rebuild, daemon=True).start()
+            return self.index.candidates(regions, working_hours, capacity)
+
+    def rebuild(self):
+        try:
+            index = SlotIndex(unassigned_orders())
+        except Exception:
+            with self.lock:
+                self.pending = None
+                self.built = time.monotonic()
+            raise
+        finally:
+            connection.close()
+        with self.lock:
+            for method, argument in self.pending or ():
+                getattr(index, method)(argument)
+            self.index, self.built, self.pending = index, time.monotonic(), None
+
+    def change(self, method, argument):
+        with self.lock:
+            if self.index is None:
+                return
+            getattr(self.index, method)(argument)
+            if self.pending is not None:
+                self.pending.append((method, argument))
+
+    def reset(self):
+        with self.lock:
+            self.index = None
+            self.pending = None
+
+
+shared = SharedSlotIndex()
+
+
+def enabled():
+    return bool(settings.ASSIGNMENT_SLOT_INDEX) and numpy is not None
+
+
+def candidates(regions, working_hours, capacity):
+    return shared.candidates(regions, working_hours, capacity)
+
+
+def add_orders(orders):
+    # orders that became unassigned: imported or taken away from a courier; a rolled back change is never applied
+    if enabled():
+        rows = [(order.order_id, order.weight, order.region, order.delivery_hours) for order in orders]
+        transaction.on_commit(lambda: shared.change('add', rows))
+
+
+def remove_orders(order_ids):
+    # orders that were assigned, here or by a transaction that has committed
+    if enabled():
+        order_ids = list(order_ids)
+        transaction.on_commit(lambda: shared.change('remove', order_ids))
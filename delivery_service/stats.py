@@ -0,0 +1,75 @@
+import datetime
+from collections import Counter
+
+from django.db import connection
+
+from .models import CourierTypeStatsModel, RegionHourStatsModel, RegionStatsModel
+
+REGION_COUNTERS = ('unassigned_orders', 'assigned_orders', 'completed_orders', 'delivery_time_sum')
+
+
+def upsert(model, keys, counters, rows, replaced=()):
+    """
+    SQL adding the counters of `rows` (a query or VALUES selecting the keys, the counters, then the replaced
+    columns) to the rows of `model` and overwriting the replaced columns, creating the missing rows. The rows are
+    locked in key order so that concurrent requests changing the same regions do not deadlock.
+    """
+    table = model._meta.db_table
+    return ('INSERT INTO {table} ({columns}) {rows} ORDER BY {order} '
+            'ON CONFLICT ({keys}) DO UPDATE SET {updates}').format(
+        table=table, columns=', '.join(keys + counters + replaced), rows=rows,
+        order=', '.join(str(position) for position in range(1, len(keys) + 1)), keys=', '.join(keys),
+        updates=', '.join(['{0} = {1}.{0} + EXCLUDED.{0}'.format(counter, table) for counter in counters] +
+                          ['{0} = EXCLUDED.{0}'.format(column) for column in replaced]))
+
+
+def region_upsert(rows):
+    # rows select region, unassigned, assigned, completed orders and delivery time to add
+    return upsert(RegionStatsModel, ('region',), REGION_COUNTERS, rows)
+
+
+def values(rows):
+    return 'VALUES ' + ', '.join('(' + ', '.join(['%s'] * len(row)) + ')' for row in rows), \
+           [value for row in rows for value in row]
+
+
+def record_imported(regions):
+    # new unassigned orders, by the region of each
+    counts = sorted(Counter(regions).items())
+    if not counts:
+        return
+    rows, params = values([(region, count, 0, 0, 0) for region, count in counts])
+    with connection.cursor() as cursor:
+        cursor.execute(region_upsert(rows), params)
+
+
+def completion_hour(complete_time):
+    return complete_time.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def totals(rows):
+    # sums the counters of rows with the same key, (key, counters...) -> sorted [(key, sums...)]
+    sums = {}
+    for key, *counters in rows:
+        sums[key] = [total + counter for total, counter in zip(sums.get(key, [0] * len(counters)), counters)]
+    return sorted(sums.items())
+
+
+def record_completed(completions):
+    # completions are (region, complete_time, delivery_time, courier_type, payment) of the completed orders
+    region_rows, region_params = values([
+        (region, 0, -completed, completed, delivery_time) for region, (completed, delivery_time) in totals(
+            (region, 1, delivery_time) for region, _, delivery_time, _, _ in completions)])
+    hour_rows, hour_params = values([
+        key + (completed, delivery_time) for key, (completed, delivery_time) in totals(
+            ((region, completion_hour(complete_time)), 1, delivery_time)
+            for region, complete_time, delivery_time, _, _ in completions)])
+    type_rows, type_params = values([
+        (courier_type, completed, earnings) for courier_type, (completed, earnings) in totals(
+            (courier_type, 1, payment) for _, _, _, courier_type, payment in completions)])
+    with connection.cursor() as cursor:
+        cursor.execute('WITH regions AS ({}), hours AS ({}) {}'.format(
+            region_upsert(region_rows),
+            upsert(RegionHourStatsModel, ('region', 'hour'), ('completed_orders', 'delivery_time_sum'), hour_rows),
+            upsert(CourierTypeStatsModel, ('courier_type',), ('completed_orders', 'earnings'), type_rows)),
+            region_params + hour_params + type_params)
@@ -1,4 +1,10 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse, resolve
 
 from delivery_service import views
@@ -21,6 +27,65 @@ class TestUrls(TestCase):
         url = reverse('assign_orders')
         self.assertEquals(resolve(url).func.view_class, views.AssignOrdersView)
 
+    def test_url_batch_assign_orders_resolves(self):
+        url = reverse('batch_assign_orders')
+        self.assertEquals(resolve(url).func.view_class, views.BatchAssignOrdersView)
+
     def test_url_complete_order_resolves(self):
         url = reverse('complete_order')
         self.assertEquals(resolve(url).func.view_class, views.OrderCompleteView)
+
+    def test_url_batch_complete_orders_resolves(self):
+        url = reverse('batch_complete_orders')
+        self.assertEquals(resolve(url).func.view_class, views.BatchOrderCompleteView)
+
+    def test_url_metrics_resolves(self):
+        url = reverse('metrics')
+        self.assertEquals(resolve(url).func.view_class, views.MetricsView)
+
+    def test_url_stream_import_couriers_resolves(self):
+        url = reverse('stream_import_couriers')
+        self.assertEquals(resolve(url).func.view_class, views.CouriersStreamView)
+
+    def test_url_stream_import_orders_resolves(self):
+        url = reverse('stream_import_orders')
+        self.assertEquals(resolve(url).func.view_class, views.OrdersStreamView)
+
+    def test_url_stats_resolves(self):
+        url = reverse('stats')
+        self.assertEquals(resolve(url).func.view_class, views.StatsView)
+
+    def test_url_region_stats_resolves(self):
+        url = reverse('region_stats')
+        self.assertEquals(resolve(url).func.view_class, views.RegionStatsView)
+
+    def test_url_courier_type_stats_resolves(self):
+        url = reverse('courier_type_stats')
+        self.assertEquals(resolve(url).func.view_class, views.CourierTypeStatsView)
+
+
+API_ONLY_SCRIPT = """
+import json, sys
+import django
+django.setup()
+from django.conf import settings
+from django.urls import Resolver404, resolve
+try:
+    resolve('/admin/')
+    admin = True
+except Resolver404:
+    admin = False
+print(json.dumps({'admin': admin, 'contrib': sorted(name for name in sys.modules if name.startswith('django.contrib.')
+                                                     and name.count('.') == 2 and name != 'django.contrib.postgres'),
+                  'courier': resolve('/couriers/1').url_name, 'middleware': len(settings.MIDDLEWARE)}))
+"""
+
+
+class TestApiOnlyProfile(SimpleTestCase):
+    def test_admin_and_unused_apps_are_not_loaded(self):
+        # settings are read once per process, so the profile is checked in a fresh interpreter
+        output = subprocess.run([sys.executable, '-c', API_ONLY_SCRIPT], cwd=settings.BASE_DIR, check=True,
+                                capture_output=True, text=True, env=dict(
+                                    os.environ, API_ONLY='1', DJANGO_SETTINGS_MODULE='online_store.settings')).stdout
+        self.assertEquals(json.loads(output), {'admin': False, 'contrib': [], 'courier': 'modify_courier',
+                                               'middleware': 3})
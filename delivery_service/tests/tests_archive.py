@@ -0,0 +1,75 @@
+import datetime
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from delivery_service.models import ArchivedOrderModel, CourierModel, DeliveryIntervalModel, OrderModel
+from delivery_service.outbox import process_events
+from delivery_service.tests.tests_views import couriers_json
+
+assign_time = datetime.datetime(2021, 1, 10, 9, 0, tzinfo=datetime.timezone.utc)
+
+
+class TestArchiveOrders(TestCase):
+    def setUp(self):
+        self.client.post(reverse('import_couriers'), data=json.dumps(couriers_json), content_type='application/json')
+        self.client.post(reverse('import_orders'), content_type='application/json', data=json.dumps({'data': [
+            {"order_id": order_id, "weight": 0.5, "region": 23, "delivery_hours": ["12:00-13:00"]}
+            for order_id in range(1, 21)]}))
+        OrderModel.objects.filter(order_id__lte=15).update(courier_id=2, assign_time=assign_time,
+                                                           courier_salary_coefficient=9)
+        for order_id in range(1, 11):
+            self.complete(order_id, assign_time + datetime.timedelta(minutes=order_id))
+
+    def complete(self, order_id, complete_time):
+        return self.client.post(reverse('complete_order'), content_type='application/json', data=json.dumps({
+            "courier_id": 2, "order_id": order_id, "complete_time": complete_time.isoformat()}))
+
+    def archive(self, **options):
+        output = StringIO()
+        call_command('archive_orders', stdout=output, **options)
+        return output.getvalue()
+
+    def test_moves_completed_orders_in_batches(self):
+        completed = {order.order_id: order for order in OrderModel.objects.exclude(complete_time=None)}
+        output = self.archive(older_than=0, batch_size=3)
+        self.assertIn('Archived 10 orders', output)
+        self.assertFalse(OrderModel.objects.exclude(complete_time=None).exists())
+        self.assertEquals(set(OrderModel.objects.values_list('order_id', flat=True)), set(range(11, 21)))
+        self.assertFalse(DeliveryIntervalModel.objects.filter(order_id__lte=10).exists())
+        for archived in ArchivedOrderModel.objects.all():
+            order = completed[archived.order_id]
+            self.assertEquals((archived.weight, archived.region, archived.delivery_hours, archived.courier_id,
+                               archived.courier_salary_coefficient, archived.assign_time, archived.complete_time,
+                               archived.delivery_time),
+                              (order.weight, order.region, order.delivery_hours, order.courier_id,
+                               order.courier_salary_coefficient, order.assign_time, order.complete_time,
+                               order.delivery_time))
+        self.assertEquals(ArchivedOrderModel.objects.count(), 10)
+
+    def test_keeps_orders_completed_within_the_period(self):
+        self.archive(older_than=(datetime.datetime.now(datetime.timezone.utc) - assign_time).days * 24 + 24)
+        self.assertEquals(ArchivedOrderModel.objects.count(), 0)
+        self.assertEquals(OrderModel.objects.count(), 20)
+
+    def test_rating_and_earnings_continue_after_archiving(self):
+        self.archive(older_than=0)
+        self.assertEquals(self.complete(11, assign_time + datetime.timedelta(minutes=11)).status_code, 200)
+        process_events(100)
+        courier = CourierModel.objects.get(courier_id=2)
+        self.assertEquals(courier.earnings, 11 * 500 * 9)
+        self.assertEquals(courier.rating, 4.92)
+
+    def test_archived_order_ids_stay_taken(self):
+        self.archive(older_than=0)
+        response = self.client.post(reverse('import_orders'), content_type='application/json', data=json.dumps({
+            'data': [{"order_id": 1, "weight": 0.5, "region": 23, "delivery_hours": ["12:00-13:00"]}]}))
+        self.assertEquals(response.status_code, 400)
+        self.assertEquals(json.loads(response.content), {'validation_error': {'orders': [{'id': 1}]}})
+
+    def test_archived_order_cannot_be_completed_again(self):
+        self.archive(older_than=0)
+        self.assertEquals(self.complete(1, assign_time + datetime.timedelta(minutes=30)).status_code, 400)
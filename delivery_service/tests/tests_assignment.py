@@ -0,0 +1,53 @@
+import random
+import time
+import tracemalloc
+
+from django.test import SimpleTestCase, override_settings
+
+from delivery_service.assignment import Candidate, budgeted, greedy, knapsack, smallest_first
+
+
+class TestKnapsack(SimpleTestCase):
+    def candidates(self, count, max_weight):
+        rng = random.Random(0)
+        return [Candidate(order_id, rng.randint(1, max_weight), 0) for order_id in range(1, count + 1)]
+
+    @override_settings(ASSIGNMENT_KNAPSACK_MAX_ITEMS=50)
+    def test_count_is_not_capped_by_the_window(self):
+        for max_weight in (10, 100):
+            with self.subTest(max_weight=max_weight):
+                candidates = self.candidates(2000, max_weight)
+                chosen = knapsack(candidates, 5000)
+                self.assertEquals(len(chosen), len(smallest_first(candidates, 5000)))
+                self.assertGreater(len(chosen), 50)
+                self.assertEquals(len({candidate.order_id for candidate in chosen}), len(chosen))
+                self.assertLessEqual(sum(candidate.weight for candidate in chosen), 5000)
+                self.assertGreaterEqual(sum(candidate.weight for candidate in chosen),
+                                        sum(candidate.weight for candidate in smallest_first(candidates, 5000)))
+                self.assertGreaterEqual(len(chosen), len(greedy(candidates, 5000)))
+                self.assertGreaterEqual(len(chosen), len(budgeted(candidates, 5000)))
+
+    def test_bounded_at_scale(self):
+        # the DP runs while the courier and its orders are locked
+        candidates = self.candidates(10000, 5000)
+        tracemalloc.start()
+        try:
+            started = time.perf_counter()
+            chosen = knapsack(candidates, 5000)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEquals(len(chosen), len(smallest_first(candidates, 5000)))
+        self.assertLess(elapsed, 0.25)
+        self.assertLess(peak, 5 * 1024 * 1024)
+
+    @override_settings(ASSIGNMENT_TIME_BUDGET=0)
+    def test_lightest_orders_when_out_of_time(self):
+        candidates = self.candidates(1000, 100)
+        self.assertEquals(knapsack(candidates, 5000), smallest_first(candidates, 5000))
+
+    def test_exact_when_all_candidates_fit_the_window(self):
+        candidates = [Candidate(1, 6, 0), Candidate(2, 5, 0), Candidate(3, 4, 0), Candidate(4, 3, 0)]
+        chosen = knapsack(candidates, 10)
+        self.assertEquals((len(chosen), sum(candidate.weight for candidate in chosen)), (2, 10))
@@ -0,0 +1,121 @@
+import asyncio
+import datetime
+import io
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+
+from delivery_service import async_views, views
+from delivery_service.outbox import process_events
+from delivery_service.tests.tests_views import couriers_json, orders_json
+
+
+@override_settings(ROOT_URLCONF='delivery_service.tests.urls_async')
+class TestAsyncViews(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient()
+
+    async def post(self, name, data):
+        return await self.client.post(reverse(name), data=json.dumps(data), content_type='application/json')
+
+    async def get_courier(self, courier_id):
+        return await self.client.get(reverse('modify_courier', args=[courier_id]))
+
+    def test_same_url_names_and_view_classes(self):
+        for name, view_class in (('import_couriers', views.CouriersView), ('import_orders', views.OrdersView),
+                                 ('assign_orders', views.AssignOrdersView),
+                                 ('batch_assign_orders', views.BatchAssignOrdersView),
+                                 ('complete_order', views.OrderCompleteView)):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(reverse(name)).func))
+            self.assertEquals(resolve(reverse(name)).func.view_class, view_class)
+        self.assertEquals(resolve(reverse('modify_courier', args=[1])).func.view_class, views.CourierView)
+
+    async def test_endpoints(self):
+        try:
+            response = await self.post('import_couriers', couriers_json)
+            self.assertEquals(response.status_code, 201)
+            response = await self.post('import_orders', orders_json)
+            self.assertEquals(response.status_code, 201)
+
+            response = await self.get_courier(2)
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(json.loads(response.content), {
+                'courier_id': 2, 'courier_type': 'car', 'regions': [23, 35, 42],
+                'working_hours': ['12:00-14:40', '16:00-18:00'], 'earnings': 0})
+            self.assertEquals((await self.get_courier(100)).status_code, 404)
+
+            response = await self.post('assign_orders', {'courier_id': 2})
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(json.loads(response.content)['orders'], [{'id': 12}, {'id': 35}, {'id': 39}])
+
+            response = await self.client.patch(reverse('modify_courier', args=[2]), content_type='application/json',
+                                               data=json.dumps({'working_hours': ['12:00-14:40']}))
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(json.loads(response.content)['working_hours'], ['12:00-14:40'])
+
+            complete_time = datetime.datetime.now() + datetime.timedelta(minutes=30)
+            response = await self.post('complete_order', {'courier_id': 2, 'order_id': 12,
+                                                          'complete_time': complete_time.isoformat()})
+            self.assertEquals(response.status_code, 200)
+            await sync_to_async(process_events)(100)
+            response = await self.get_courier(2)
+            self.assertEquals(json.loads(response.content)['earnings'], 4500)
+            self.assertEquals(json.loads(response.content)['working_hours'], ['12:00-14:40'])
+
+            response = await self.client.get(reverse('metrics'))
+            self.assertRegex(response.content.decode(), r'delivery_sql_queries_sum\{view="assign_orders"\} [1-9]')
+        finally:
+            await async_views.close_pool()
+
+    async def test_concurrent_reads(self):
+        try:
+            await self.post('import_couriers', couriers_json)
+            with override_settings(COURIER_CACHE_TIMEOUT=0):
+                responses = await asyncio.gather(*(self.get_courier(i % 9 + 1) for i in range(50)))
+            self.assertEquals({response.status_code for response in responses}, {200})
+            self.assertEquals([json.loads(response.content)['courier_id'] for response in responses],
+                              [i % 9 + 1 for i in range(50)])
+        finally:
+            await async_views.close_pool()
+
+    async def test_failed_pool_is_created_again(self):
+        async def unreachable(**kwargs):
+            raise OSError('connection refused')
+
+        await self.post('import_couriers', couriers_json)
+        with mock.patch.object(async_views.asyncpg, 'create_pool', unreachable):
+            with self.assertRaises(OSError):
+                await self.get_courier(1)
+        try:
+            with override_settings(COURIER_CACHE_TIMEOUT=0):
+                self.assertEquals((await self.get_courier(1)).status_code, 200)
+        finally:
+            await async_views.close_pool()
+
+    async def test_stream_import(self):
+        # the test client's ASGI body can not be read line by line, a server spools it to a file
+        body = ''.join(json.dumps(order) + '\n' for order in orders_json['data']).encode()
+        request = ASGIRequest({'type': 'http', 'method': 'POST', 'path': reverse('stream_import_orders'),
+                               'headers': [(b'content-type', b'application/x-ndjson'),
+                                           (b'content-length', str(len(body)).encode())]}, io.BytesIO(body))
+        response = await resolve(reverse('stream_import_orders')).func(request)
+        self.assertEquals(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+        await async_views.StreamingASGIHandler().send_response(response, send)
+        self.assertEquals(messages[0]['type'], 'http.response.start')
+        self.assertEquals([message.get('more_body') for message in messages[1:]],
+                          [True] * (len(messages) - 2) + [None])
+        lines = b''.join(message.get('body', b'') for message in messages[1:]).splitlines()
+        self.assertEquals(json.loads(lines[0]),
+                          {'orders': [{'id': order['order_id']} for order in orders_json['data']]})
+        self.assertEquals(json.loads(lines[-1]), {'imported': 9, 'rejected': 0})
@@ -0,0 +1,110 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from delivery_service import codec
+from delivery_service.models import CourierModel, DeliveryBatchModel
+from delivery_service.serializers import CourierSerializer, OrderSerializer, OrderAssignSerializer, \
+    OrderCompleteSerializer
+from delivery_service.tests import tests_stream, tests_views
+
+courier = {"courier_id": 1, "courier_type": "foot", "regions": [5, 12, 22], "working_hours": ["11:35-14:55"]}
+order = {"order_id": 1, "weight": 0.23, "region": 12, "delivery_hours": ["11:30-15:00"]}
+complete = {"courier_id": 2, "order_id": 33, "complete_time": "2021-01-10T10:33:01.42Z"}
+
+couriers = [courier] + [dict(courier, **change) for change in (
+    {"courier_id": "7"}, {"courier_id": 7.0}, {"courier_id": 7.5}, {"courier_id": True}, {"courier_id": None},
+    {"courier_id": 0}, {"courier_id": "text"}, {"courier_type": 5}, {"courier_type": "run"},
+    {"regions": [1, "2", -2]}, {"regions": ["1", 2.0]}, {"regions": "1"}, {"regions": {"1": 1}}, {"regions": []},
+    {"working_hours": ["11:35-14:99"]}, {"working_hours": "11:35-14:55"}, {"working_hours": [None]},
+    {"working_hours": []}, {"rating": 5}, {"earnings": 0}, {"unknown": 1})] + [
+    {key: value for key, value in courier.items() if key != name} for name in courier]
+orders = [order] + [dict(order, **change) for change in (
+    {"weight": 50}, {"weight": 50.01}, {"weight": 0.001}, {"weight": "1.5"}, {"weight": True}, {"weight": None},
+    {"weight": "heavy"}, {"region": "3"}, {"region": 0}, {"delivery_hours": ["8:00-9:00", "9:5-10:00"]},
+    {"delivery_hours": ["25:00-26:00"]}, {"temperature": 4}, {"batch": 1})] + [
+    {key: value for key, value in order.items() if key != name} for name in order]
+completes = [complete] + [dict(complete, **change) for change in (
+    {"complete_time": "2021-05-10T21-09-27.42Z"}, {"complete_time": "2021-05-10T21:45:01"},
+    {"complete_time": "2021-05-10T21:45:01+03:00"}, {"complete_time": "2021-13-10T21:45:01"},
+    {"complete_time": 1620683101}, {"complete_time": "9999-12-31T23:59:59-01:00"},
+    {"complete_time": "0001-01-01T00:00:00+01:00"}, {"complete_time": "9999-12-31T23:59:59"}, {"order_id": -1},
+    {"courier_id": "2"}, {"extra": 1})] + [
+    {key: value for key, value in complete.items() if key != name} for name in complete]
+
+
+class TestCodecMatchesSerializers(TestCase):
+    def assertSameValidation(self, drf_class, fast_class, items, **kwargs):
+        for item in items:
+            with self.subTest(item=item):
+                drf = drf_class(data=item, **kwargs)
+                fast = fast_class(data=item, **kwargs)
+                self.assertEquals(fast.is_valid(), drf.is_valid())
+                if drf.is_valid():
+                    self.assertEquals(fast.validated_data, dict(drf.validated_data))
+
+    def test_courier(self):
+        self.assertSameValidation(CourierSerializer, codec.FastCourierSerializer, couriers)
+
+    def test_courier_partial(self):
+        self.assertSameValidation(CourierSerializer, codec.FastCourierSerializer, couriers, partial=True)
+
+    def test_order(self):
+        self.assertSameValidation(OrderSerializer, codec.FastOrderSerializer, orders)
+
+    def test_order_batch_is_not_accepted(self):
+        courier_object = CourierModel.objects.create(courier_id=1, courier_type='foot', regions=[12], working_hours=[])
+        batch = DeliveryBatchModel.objects.create(courier=courier_object, assign_time=timezone.now(), open_orders=1)
+        self.assertSameValidation(OrderSerializer, codec.FastOrderSerializer, [dict(order, batch=batch.id)])
+        self.assertFalse(OrderSerializer(data=dict(order, batch=batch.id)).is_valid())
+
+    def test_assign(self):
+        self.assertSameValidation(OrderAssignSerializer, codec.FastOrderAssignSerializer,
+                                  [{"courier_id": 1}, {"courier_id": "1"}, {"courier_id": "x"}, {}, {"id": 1}])
+
+    def test_complete(self):
+        self.assertSameValidation(OrderCompleteSerializer, codec.FastOrderCompleteSerializer, completes)
+
+
+@override_settings(SERIALIZER_CODEC='drf')
+class TestCouriersViewDRF(tests_views.TestCouriersView):
+    pass
+
+
+@override_settings(SERIALIZER_CODEC='drf')
+class TestCourierViewDRF(tests_views.TestCourierView):
+    pass
+
+
+@override_settings(SERIALIZER_CODEC='drf')
+class TestOrdersViewDRF(tests_views.TestOrdersView):
+    pass
+
+
+@override_settings(SERIALIZER_CODEC='drf')
+class AssignOrdersViewDRF(tests_views.AssignOrdersView):
+    pass
+
+
+@override_settings(SERIALIZER_CODEC='drf')
+class BatchAssignOrdersViewDRF(tests_views.BatchAssignOrdersView):
+    pass
+
+
+@override_settings(SERIALIZER_CODEC='drf')
+class CompleteOrderViewDRF(tests_views.CompleteOrderView):
+    pass
+
+
+@override_settings(SERIALIZER_CODEC='drf')
+class BatchCompleteOrdersViewDRF(tests_views.BatchCompleteOrdersView):
+    pass
+
+
+@override_settings(SERIALIZER_CODEC='drf')
+class TestCourierViewGetDRF(tests_views.TestCourierViewGet):
+    pass
+
+
+@override_settings(SERIALIZER_CODEC='drf')
+class TestStreamImportDRF(tests_stream.TestStreamImport):
+    pass
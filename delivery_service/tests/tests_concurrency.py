@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.db import connection
+from django.test import TransactionTestCase, Client, override_settings
+from django.urls import reverse
+
+from delivery_service.models import CourierModel, OrderModel
+from delivery_service.outbox import process_events
+from delivery_service.utils import check_connections, release_connections
+from delivery_service.views import CourierView
+
+couriers_url = reverse('import_couriers')
+orders_url = reverse('import_orders')
+assign_orders_url = reverse('assign_orders')
+
+
+class TestParallelAssign(TransactionTestCase):
+    couriers = 20
+    orders = 400
+    assigns = 300
+
+    def setUp(self):
+        client = Client()
+        client.post(couriers_url, data=json.dumps({'data': [
+            {"courier_id": courier_id, "courier_type": "car", "regions": [1, 2], "working_hours": ["00:00-23:59"]}
+            for courier_id in range(1, self.couriers + 1)]}), content_type='application/json')
+        client.post(orders_url, data=json.dumps({'data': [
+            {"order_id": order_id, "weight": 1.5, "region": order_id % 2 + 1, "delivery_hours": ["10:00-12:00"]}
+            for order_id in range(1, self.orders + 1)]}), content_type='application/json')
+
+    def assign(self, courier_id):
+        try:
+            response = Client().post(assign_orders_url, data=json.dumps({"courier_id": courier_id}),
+                                     content_type='application/json')
+            return courier_id, response.status_code, json.loads(response.content)['orders']
+        finally:
+            connection.close()
+
+    def test_parallel_assign_claims_each_order_once(self):
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(self.assign, [i % self.couriers + 1 for i in range(self.assigns)]))
+        self.assertEquals({status_code for _, status_code, _ in results}, {200})
+        # repeat calls of a courier return its open batch again, but an order never goes to two couriers
+        owners = {}
+        for courier_id, _, orders in results:
+            for order in orders:
+                owners.setdefault(order['id'], set()).add(courier_id)
+        self.assertEquals({len(courier_ids) for courier_ids in owners.values()}, {1})
+        assigned = dict(OrderModel.objects.exclude(courier=None).values_list('order_id', 'courier_id'))
+        self.assertEquals(set(owners), set(assigned))
+        for courier_id, _, orders in results:
+            for order in orders:
+                self.assertEquals(assigned[order['id']], courier_id)
+
+
+class TestParallelRetries(TransactionTestCase):
+    def setUp(self):
+        client = Client()
+        client.post(couriers_url, data=json.dumps({'data': [
+            {"courier_id": 1, "courier_type": "car", "regions": [1], "working_hours": ["00:00-23:59"]}]}),
+            content_type='application/json')
+        client.post(orders_url, data=json.dumps({'data': [
+            {"order_id": 1, "weight": 1.5, "region": 1, "delivery_hours": ["10:00-12:00"]}]}),
+            content_type='application/json')
+        client.post(assign_orders_url, data=json.dumps({"courier_id": 1}), content_type='application/json')
+
+    def complete(self, key):
+        try:
+            response = Client().post(reverse('complete_order'), data=json.dumps({
+                "courier_id": 1, "order_id": 1, "complete_time": "2030-01-10T10:33:01.42Z"}),
+                content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+            return response.status_code, json.loads(response.content)
+        finally:
+            connection.close()
+
+    def test_concurrent_retries_complete_once(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(self.complete, ['complete-1'] * 16))
+        self.assertEquals(results, [(200, {'order_id': 1})] * 16)
+        process_events(100)
+        self.assertEquals(CourierModel.objects.get(courier_id=1).earnings, 500 * 9)
+
+
+class TestPatchDuringCompletion(TransactionTestCase):
+    def setUp(self):
+        client = Client()
+        client.post(couriers_url, data=json.dumps({'data': [
+            {"courier_id": 1, "courier_type": "car", "regions": [1], "working_hours": ["00:00-23:59"]}]}),
+            content_type='application/json')
+        client.post(orders_url, data=json.dumps({'data': [
+            {"order_id": 1, "weight": 1.5, "region": 1, "delivery_hours": ["10:00-12:00"]}]}),
+            content_type='application/json')
+        client.post(assign_orders_url, data=json.dumps({"courier_id": 1}), content_type='application/json')
+
+    def request(self, send):
+        try:
+            return send(Client()).status_code
+        except Exception as error:
+            return error
+        finally:
+            connection.close()
+
+    def test_withdraw_and_complete_do_not_deadlock(self):
+        # the PATCH holds the courier and waits before withdrawing the order while the completion starts
+        patched, proceed = threading.Event(), threading.Event()
+        withdraw_orders = CourierView.withdraw_orders
+
+        def paused_withdraw_orders(view, courier_object):
+            patched.set()
+            proceed.wait(5)
+            return withdraw_orders(view, courier_object)
+
+        with mock.patch.object(CourierView, 'withdraw_orders', paused_withdraw_orders), \
+                ThreadPoolExecutor(max_workers=2) as executor:
+            patch = executor.submit(self.request, lambda client: client.patch(
+                reverse('modify_courier', args=[1]), data=json.dumps({"regions": [2]}),
+                content_type='application/json'))
+            self.assertTrue(patched.wait(5))
+            complete = executor.submit(self.request, lambda client: client.post(
+                reverse('complete_order'), data=json.dumps({
+                    "courier_id": 1, "order_id": 1, "complete_time": "2030-01-10T10:33:01.42Z"}),
+                content_type='application/json'))
+            time.sleep(0.5)
+            proceed.set()
+            self.assertEquals((patch.result(), complete.result()), (200, 400))
+        self.assertIsNone(OrderModel.objects.get(order_id=1).courier_id)
+
+
+class TestParallelOutboxWorkers(TransactionTestCase):
+    couriers = 5
+    orders = 200
+
+    def setUp(self):
+        client = Client()
+        client.post(couriers_url, data=json.dumps({'data': [
+            {"courier_id": courier_id, "courier_type": "foot", "regions": [1], "working_hours": ["00:00-23:59"]}
+            for courier_id in range(1, self.couriers + 1)]}), content_type='application/json')
+        client.post(orders_url, data=json.dumps({'data': [
+            {"order_id": order_id, "weight": 1, "region": 1, "delivery_hours": ["10:00-12:00"]}
+            for order_id in range(1, self.orders + 1)]}), content_type='application/json')
+        OrderModel.objects.update(courier_salary_coefficient=2, assign_time='2030-01-10T10:00:00Z')
+        for courier_id in range(1, self.couriers + 1):
+            OrderModel.objects.filter(order_id__in=range(courier_id, self.orders + 1, self.couriers)).update(
+                courier_id=courier_id)
+        client.post(reverse('batch_complete_orders'), data=json.dumps({'data': [
+            {"courier_id": (order_id - 1) % self.couriers + 1, "order_id": order_id,
+             "complete_time": "2030-01-10T10:{:02}:00Z".format(order_id % 60)}
+            for order_id in range(1, self.orders + 1)]}), content_type='application/json')
+
+    def process(self, batch_size):
+        try:
+            return process_events(batch_size)
+        finally:
+            connection.close()
+
+    def test_parallel_workers_apply_each_event_once(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            processed = list(executor.map(self.process, [7] * 8))
+        self.assertEquals(sum(processed), self.orders)
+        self.assertEquals(set(CourierModel.objects.values_list('earnings', flat=True)),
+                          {self.orders // self.couriers * 500 * 2})
+
+
+class TestConnectionHealthCheck(TransactionTestCase):
+    def setUp(self):
+        connection.ensure_connection()
+        self.addCleanup(connection.settings_dict.__setitem__, 'CONN_MAX_AGE', connection.settings_dict['CONN_MAX_AGE'])
+        connection.settings_dict['CONN_MAX_AGE'] = 60
+        # not released by a request of an earlier test
+        connection.released_at = None
+
+    def test_broken_persistent_connection_is_closed(self):
+        with mock.patch.object(connection, 'is_usable', return_value=False):
+            check_connections()
+        self.assertIsNone(connection.connection)
+
+    def test_usable_persistent_connection_is_kept(self):
+        database_connection = connection.connection
+        check_connections()
+        self.assertIs(connection.connection, database_connection)
+
+    def test_recently_released_connection_is_not_checked(self):
+        release_connections()
+        with mock.patch.object(connection, 'is_usable', return_value=False) as is_usable:
+            check_connections()
+        is_usable.assert_not_called()
+        self.assertIsNotNone(connection.connection)
+
+    @override_settings(CONN_HEALTH_CHECK_IDLE=0)
+    def test_idle_connection_is_checked(self):
+        release_connections()
+        with mock.patch.object(connection, 'is_usable', return_value=False):
+            check_connections()
+        self.assertIsNone(connection.connection)
+
+    @override_settings(CONN_HEALTH_CHECKS=False)
+    def test_disabled(self):
+        with mock.patch.object(connection, 'is_usable', return_value=False):
+            check_connections()
+        self.assertIsNotNone(connection.connection)
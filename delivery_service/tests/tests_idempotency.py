@@ -0,0 +1,77 @@
+import datetime
+import json
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from delivery_service.models import CourierModel, IdempotencyKeyModel, OrderModel
+from delivery_service.outbox import process_events
+from delivery_service.tests.tests_views import assign_orders_url, complete_order_url, couriers_json, couriers_url, \
+    orders_json, orders_url
+
+
+class TestIdempotencyKeys(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.post(couriers_url, content_type='application/json', data=json.dumps(couriers_json))
+        self.client.post(orders_url, content_type='application/json', data=json.dumps(orders_json))
+
+    def post(self, url, data, key):
+        return self.client.post(url, content_type='application/json', data=json.dumps(data),
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def complete(self, key):
+        assign_time = OrderModel.objects.get(order_id=5).assign_time
+        return self.post(complete_order_url, {'courier_id': 1, 'order_id': 5, 'complete_time': (
+            assign_time + datetime.timedelta(minutes=20)).isoformat()}, key)
+
+    def test_retried_assign_and_complete_are_replayed(self):
+        first = self.post(assign_orders_url, {'courier_id': 1}, 'assign-1')
+        self.assertEquals(json.loads(first.content)['orders'], [{'id': 5}])
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post(assign_orders_url, {'courier_id': 1}, 'assign-1')
+        self.assertEquals((retry.status_code, retry.content), (200, first.content))
+        self.assertEquals(retry['Idempotent-Replayed'], 'true')
+        self.assertFalse([query for query in queries if OrderModel._meta.db_table in query['sql']])
+
+        self.assertEquals(self.complete('complete-1').status_code, 200)
+        retry = self.complete('complete-1')
+        self.assertEquals((retry.status_code, json.loads(retry.content)), (200, {'order_id': 5}))
+        # without a key the retry runs again and finds the order completed
+        self.assertEquals(self.client.post(complete_order_url, content_type='application/json', data=json.dumps({
+            'courier_id': 1, 'order_id': 5, 'complete_time': '2021-01-10T10:33:01.42Z'})).status_code, 400)
+        process_events(100)
+        self.assertEquals(CourierModel.objects.get(courier_id=1).earnings, 500 * 2)
+
+    def test_key_reused_with_another_request(self):
+        self.post(assign_orders_url, {'courier_id': 1}, 'key')
+        self.assertEquals(self.post(assign_orders_url, {'courier_id': 2}, 'key').status_code, 422)
+        # the same key on another endpoint is another request
+        self.assertEquals(self.post(reverse('batch_assign_orders'), {'courier_ids': [2]}, 'key').status_code, 200)
+        self.assertEquals(self.post(assign_orders_url, {'courier_id': 1}, 'x' * 256).status_code, 400)
+
+    def test_expired_keys_run_again_and_are_purged(self):
+        self.assertEquals(json.loads(self.post(assign_orders_url, {'courier_id': 1}, 'key').content)['orders'],
+                          [{'id': 5}])
+        self.post(assign_orders_url, {'courier_id': 2}, 'other')
+        IdempotencyKeyModel.objects.filter(key='key').update(
+            created=datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=25))
+        response = self.post(assign_orders_url, {'courier_id': 1}, 'key')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEquals(json.loads(response.content)['orders'], [{'id': 5}])
+        IdempotencyKeyModel.objects.filter(key='key').update(
+            created=datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=25))
+        output = StringIO()
+        call_command('purge_idempotency_keys', stdout=output)
+        self.assertIn('Purged 1 expired idempotency keys', output.getvalue())
+        self.assertEquals(list(IdempotencyKeyModel.objects.values_list('key', flat=True)), ['other'])
+
+    @override_settings(IDEMPOTENCY_MAX_RESPONSE_SIZE=10)
+    def test_large_responses_are_not_stored(self):
+        self.post(assign_orders_url, {'courier_id': 1}, 'key')
+        self.assertFalse(IdempotencyKeyModel.objects.exists())
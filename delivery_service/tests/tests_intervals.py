@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from django.test import SimpleTestCase
+
+from delivery_service.intervals import parse_intervals, format_intervals
+
+
+class TestIntervals(SimpleTestCase):
+    def test_parse_matches_strptime(self):
+        for value in ('9:00-15:00', '09:05-23:59', '0:0-1:5', '23:00-01:30'):
+            expected = [[datetime.strptime(x, '%H:%M').time() for x in value.split('-')]]
+            self.assertEquals(parse_intervals([value]), expected)
+
+    def test_parse_invalid(self):
+        for value in ('11:35-14:99', '24:00-25:00', '11:35', '11:35-12:00-13:00', ' 9:00-10:00', 930, None):
+            with self.assertRaises(ValueError):
+                parse_intervals([value])
+
+    def test_format(self):
+        self.assertEquals(format_intervals(parse_intervals(['8:00-10:00', '12:05-14:40'])),
+                          ['08:00-10:00', '12:05-14:40'])
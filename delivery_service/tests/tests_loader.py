@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from delivery_service.codec import COURIER_FIELDS
+from delivery_service.loader import validate_row, validate_rows
+from delivery_service.models import ArchivedOrderModel, CourierModel, DeliveryIntervalModel, OrderModel
+
+
+class TestLoadCommands(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def load(self, command, path, **options):
+        output = StringIO()
+        call_command(command, path, stdout=output, **options)
+        return output.getvalue()
+
+    def rejects(self, path):
+        with open(path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_load_orders_from_csv(self):
+        ArchivedOrderModel.objects.create(order_id=9, weight=1, region=1, delivery_hours=[],
+                                          complete_time='2021-01-10T10:00Z')
+        path = self.write('orders.csv', 'order_id,weight,region,delivery_hours\n'
+                                        '1,0.23,12,09:00-18:00\n'
+                                        '2,15,1,09:00-12:00 16:00-21:30\n'
+                                        '3,51,22,09:00-18:00\n'
+                                        '2,1,1,10:00-11:00\n'
+                                        '4,0.01,22,23:00-01:00\n'
+                                        '9,1,1,10:00-11:00\n'
+                                        '5,1,1\n')
+        output = self.load('load_orders', path, batch_size=2)
+        self.assertIn('Loaded 3 orders from orders.csv, rejected 4', output)
+        self.assertIn('7 rows in', output)
+        self.assertEquals(self.rejects(path + '.rejects'), [
+            {'line': 4, 'id': '3', 'errors': {'weight': ['Invalid value.']}},
+            {'line': 5, 'id': 2, 'errors': {'order_id': ['This field must be unique.']}},
+            {'line': 7, 'id': 9, 'errors': {'order_id': ['This field must be unique.']}},
+            {'line': 8, 'id': '5', 'errors': {'delivery_hours': ['Invalid value.']}},
+        ])
+
+        loaded = {order.order_id: order for order in OrderModel.objects.all()}
+        OrderModel.objects.all().delete()
+        response = self.client.post(reverse('import_orders'), content_type='application/json', data=json.dumps({
+            'data': [{'order_id': 1, 'weight': 0.23, 'region': 12, 'delivery_hours': ['09:00-18:00']},
+                     {'order_id': 2, 'weight': 15, 'region': 1, 'delivery_hours': ['09:00-12:00', '16:00-21:30']},
+                     {'order_id': 4, 'weight': 0.01, 'region': 22, 'delivery_hours': ['23:00-01:00']}]}))
+        self.assertEquals(response.status_code, 201)
+        imported = {order.order_id: order for order in OrderModel.objects.all()}
+        self.assertEquals(loaded.keys(), imported.keys())
+        for order_id, order in imported.items():
+            self.assertEquals((loaded[order_id].weight, loaded[order_id].region, loaded[order_id].delivery_hours),
+                              (order.weight, order.region, order.delivery_hours))
+        self.assertEquals(DeliveryIntervalModel.objects.count(), 5)
+
+    def test_load_couriers_from_ndjson(self):
+        path = self.write('couriers.ndjson', '\n'.join([
+            json.dumps({'courier_id': 1, 'courier_type': 'car', 'regions': [12, 22], 'working_hours': ['09:00-18:00']}),
+            '',
+            '{"courier_id": 2,',
+            json.dumps({'courier_id': 3, 'courier_type': 'boat', 'regions': [1], 'working_hours': []}),
+            json.dumps({'courier_id': 4, 'courier_type': 'foot', 'regions': [1], 'working_hours': [], 'rating': 5}),
+            json.dumps({'courier_id': 5, 'courier_type': 'bike', 'regions': [], 'working_hours': ['22:00-02:00']}),
+        ]) + '\n')
+        rejects = os.path.join(self.directory, 'rejected.ndjson')
+        output = self.load('load_couriers', path, rejects=rejects)
+        self.assertIn('Loaded 2 couriers from couriers.ndjson, rejected 3 (see {})'.format(rejects), output)
+        self.assertEquals(self.rejects(rejects), [
+            {'line': 3, 'id': None, 'errors': {'non_field_errors': ['Invalid JSON.']}},
+            {'line': 4, 'id': 3, 'errors': {'courier_type': ['Invalid value.']}},
+            {'line': 5, 'id': 4, 'errors': {'non_field_errors': ['Unknown field: rating']}},
+        ])
+        self.assertEquals(CourierModel.objects.count(), 2)
+        self.assertEquals(CourierModel.objects.get(courier_id=5).earnings, 0)
+        response = self.client.get(reverse('modify_courier', args=[1]))
+        self.assertEquals(json.loads(response.content), {
+            'courier_id': 1, 'courier_type': 'car', 'regions': [12, 22], 'working_hours': ['09:00-18:00'],
+            'earnings': 0})
+
+    def test_no_rejects_file_when_every_row_is_loaded(self):
+        path = self.write('orders.txt', json.dumps({'order_id': 1, 'weight': 1, 'region': 1,
+                                                    'delivery_hours': ['10:00-11:00']}) + '\n')
+        output = self.load('load_orders', path)
+        self.assertIn('Loaded 1 orders from orders.txt, rejected 0\n', output)
+        self.assertFalse(os.path.exists(path + '.rejects'))
+        self.assertTrue(OrderModel.objects.filter(order_id=1).exists())
+
+
+class TestValidateRows(SimpleTestCase):
+    def test_same_as_each_row_alone(self):
+        courier = {'courier_id': 1, 'courier_type': 'foot', 'regions': [1, 2], 'working_hours': ['09:00-12:00']}
+        rows = [courier, dict(courier, courier_id=2), dict(courier, courier_id=True), dict(courier, courier_id='3'),
+                dict(courier, regions=[True]), dict(courier, regions=['1', 2]), dict(courier, courier_type='boat'),
+                dict(courier, courier_type='boat', extra=1), {'courier_id': 4}, [courier], None]
+        results = validate_rows(COURIER_FIELDS, rows)
+        self.assertEquals(results, [validate_row(COURIER_FIELDS, row) for row in rows])
+        self.assertEquals([bool(errors) for _, errors in results],
+                          [False, False, True, False, True, False, True, True, True, True, True])
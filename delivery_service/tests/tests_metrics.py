@@ -0,0 +1,133 @@
+import json
+import os
+import re
+import tempfile
+
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from delivery_service import metrics
+from delivery_service.tests.tests_views import couriers_json
+
+
+def sample(text, name, **labels):
+    pattern = r'^{}\{{{}\}} (\S+)$'.format(re.escape(name), ','.join(
+        '{}="{}"'.format(label, re.escape(value)) for label, value in labels.items()))
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+class TestHistogram(SimpleTestCase):
+    def test_render(self):
+        histogram = metrics.Histogram('test_seconds', 'Test.', ('view',), (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(('a',), value)
+        self.assertEquals(histogram.render(), '\n'.join([
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{view="a",le="0.1"} 2',
+            'test_seconds_bucket{view="a",le="1"} 3',
+            'test_seconds_bucket{view="a",le="+Inf"} 4',
+            'test_seconds_sum{view="a"} 3.65',
+            'test_seconds_count{view="a"} 4']))
+
+
+class TestCounter(SimpleTestCase):
+    def test_render(self):
+        counter = metrics.Counter('test_total', 'Test.', ('result',))
+        for result in ('hit', 'miss', 'hit'):
+            counter.inc((result,))
+        self.assertEquals(counter.value(('hit',)), 2)
+        self.assertEquals(counter.render(), '\n'.join([
+            '# HELP test_total Test.',
+            '# TYPE test_total counter',
+            'test_total{result="hit"} 2',
+            'test_total{result="miss"} 1']))
+
+
+class TestSharedDirectory(SimpleTestCase):
+    def test_other_processes_are_added(self):
+        name = 'delivery_response_size_bytes'
+        histogram = metrics.Histogram(name, 'Test.', ('view',), metrics.SIZE_BUCKETS)
+        histogram.observe(('shared',), 500)
+        counts, total = histogram.snapshot()[('shared',)]
+        added = {name: {('shared',): [[2 * count for count in counts], 2 * total]}}
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            for pid in (1, 2):
+                metrics.write_values(os.path.join(directory, '{}.json'.format(pid)), {name: histogram.snapshot()})
+            self.assertEquals(metrics.shared.others({}), added)
+            # the master folds the files of exited workers into one
+            metrics.shared.fold(1)
+            metrics.shared.fold(2)
+            self.assertEquals(sorted(file_name for file_name in os.listdir(directory) if file_name.endswith('.json')),
+                              ['exited.json'])
+            self.assertEquals(metrics.shared.others({}), added)
+            self.assertEquals(sample(histogram.render(added[name]), name + '_count', view='shared'), 2)
+
+
+class TestMetricsView(TestCase):
+    def get_metrics(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEquals(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_request_is_recorded(self):
+        before = self.get_metrics()
+        response = self.client.post(reverse('import_couriers'), data=json.dumps(couriers_json),
+                                    content_type='application/json')
+        after = self.get_metrics()
+        labels = {'view': 'import_couriers'}
+        request_labels = dict(labels, method='POST', status='201')
+        count = 'delivery_request_duration_seconds_count'
+        self.assertEquals(sample(after, count, **request_labels) - (sample(before, count, **request_labels) or 0), 1)
+        self.assertGreater(sample(after, 'delivery_sql_queries_sum', **labels) -
+                           (sample(before, 'delivery_sql_queries_sum', **labels) or 0), 0)
+        self.assertGreater(sample(after, 'delivery_serializer_duration_seconds_sum', **labels), 0)
+        self.assertEquals(sample(after, 'delivery_response_size_bytes_sum', **labels) -
+                          (sample(before, 'delivery_response_size_bytes_sum', **labels) or 0), len(response.content))
+
+    @override_settings(COURIER_CACHE_TIMEOUT=300)
+    def test_courier_cache_lookups(self):
+        self.client.post(reverse('import_couriers'), data=json.dumps(couriers_json), content_type='application/json')
+        before = self.get_metrics()
+        for _ in range(2):
+            self.client.get(reverse('modify_courier', args=[1]))
+        after = self.get_metrics()
+        name = 'delivery_courier_cache_lookups_total'
+        self.assertEquals([sample(after, name, result=result) - (sample(before, name, result=result) or 0)
+                           for result in ('hit', 'miss')], [1, 1])
+
+    def test_streaming_request_is_recorded_after_its_body(self):
+        before = self.get_metrics()
+        response = self.client.post(reverse('stream_import_couriers'), content_type='application/x-ndjson',
+                                    data=''.join(json.dumps(courier) + '\n' for courier in couriers_json['data']))
+        self.assertEquals(self.get_metrics(), before)
+        body = b''.join(response.streaming_content)
+        after = self.get_metrics()
+        labels = {'view': 'stream_import_couriers'}
+
+        def change(name, **extra):
+            return sample(after, name, **labels, **extra) - (sample(before, name, **labels, **extra) or 0)
+        self.assertEquals(change('delivery_request_duration_seconds_count', method='POST', status='200'), 1)
+        self.assertGreater(change('delivery_sql_queries_sum'), 0)
+        self.assertGreater(change('delivery_serializer_duration_seconds_sum'), 0)
+        self.assertEquals(change('delivery_response_size_bytes_sum'), len(body))
+
+    def test_unknown_methods_share_a_label(self):
+        for method in ('BREW', 'PROPFIND'):
+            self.client.generic(method, reverse('import_couriers'))
+        metrics_text = self.get_metrics()
+        self.assertEquals(sample(metrics_text, 'delivery_request_duration_seconds_count', view='import_couriers',
+                                 method='other', status='405'), 2)
+        self.assertNotIn('method="BREW"', metrics_text)
+
+    def test_metrics_requests_are_not_recorded(self):
+        self.get_metrics()
+        self.assertNotIn('view="metrics"', self.get_metrics())
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        before = metrics.render()
+        Client().post(reverse('import_couriers'), data=json.dumps(couriers_json), content_type='application/json')
+        self.assertEquals(metrics.render(), before)
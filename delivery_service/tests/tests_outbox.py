@@ -0,0 +1,68 @@
+import datetime
+import json
+import re
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from delivery_service.models import CompletionEventModel, CourierModel, OrderModel
+from delivery_service.outbox import process_batch
+from delivery_service.tests.tests_views import assign_orders_url, complete_order_url, couriers_json, couriers_url, \
+    orders_json, orders_url
+
+
+def gauge(text, name):
+    return float(re.search(r'^{} (\S+)$'.format(name), text, re.MULTILINE).group(1))
+
+
+@override_settings(COURIER_CACHE_TIMEOUT=300)
+class TestCompletionOutbox(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.post(couriers_url, content_type='application/json', data=json.dumps(couriers_json))
+        self.client.post(orders_url, content_type='application/json', data=json.dumps(orders_json))
+        self.client.post(assign_orders_url, content_type='application/json', data=json.dumps({'courier_id': 2}))
+        assign_time = OrderModel.objects.get(order_id=12).assign_time
+        for order_id, minutes in ((12, 20), (35, 30), (39, 50)):
+            response = self.client.post(complete_order_url, content_type='application/json', data=json.dumps({
+                'courier_id': 2, 'order_id': order_id,
+                'complete_time': (assign_time + datetime.timedelta(minutes=minutes)).isoformat()}))
+            self.assertEquals(response.status_code, 200)
+
+    def get_courier(self):
+        return json.loads(self.client.get(reverse('modify_courier', args=[2])).content)
+
+    def process_outbox(self):
+        output = StringIO()
+        call_command('process_outbox', stdout=output)
+        return output.getvalue()
+
+    def test_courier_reflects_events_once(self):
+        self.assertEquals(self.get_courier()['earnings'], 0)
+        self.assertEquals(CompletionEventModel.objects.count(), 3)
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertEquals(gauge(text, 'delivery_outbox_events'), 3)
+        self.assertGreaterEqual(gauge(text, 'delivery_outbox_lag_seconds'), 0)
+
+        self.assertIn('Processed 3 completion events', self.process_outbox())
+        courier = self.get_courier()
+        self.assertEquals((courier['earnings'], courier['rating']), (3 * 500 * 9, 3.33))
+        self.assertIn('Processed 0 completion events', self.process_outbox())
+        self.assertEquals(self.get_courier(), courier)
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertEquals((gauge(text, 'delivery_outbox_events'), gauge(text, 'delivery_outbox_lag_seconds')), (0, 0))
+
+    def test_failed_batch_keeps_its_events(self):
+        with mock.patch('delivery_service.outbox.invalidate_courier', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                process_batch(2)
+        self.assertEquals(CompletionEventModel.objects.count(), 3)
+        self.assertEquals(CourierModel.objects.get(courier_id=2).earnings, 0)
+        self.assertEquals(process_batch(2), 2)
+        self.assertEquals(CourierModel.objects.get(courier_id=2).earnings, 2 * 500 * 9)
+        self.assertEquals(process_batch(2), 1)
+        self.assertEquals(CourierModel.objects.get(courier_id=2).earnings, 3 * 500 * 9)
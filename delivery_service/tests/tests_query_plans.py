@@ -0,0 +1,118 @@
+import datetime
+import json
+import random
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from psycopg2.extras import NumericRange
+
+from delivery_service.models import CourierModel, CourierRegionStatsModel, DeliveryIntervalModel, OrderModel
+
+LARGE_TABLES = {model._meta.db_table for model in (CourierModel, OrderModel, CourierRegionStatsModel,
+                                                   DeliveryIntervalModel)}
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+class TestHotQueryPlans(TestCase):
+    """
+    Runs the endpoints on a dataset where most orders are completed and checks with EXPLAIN that none of the
+    statements they execute reads a large table sequentially.
+    """
+    couriers = 1000
+    regions = 100
+    completed_orders = 50000
+    open_orders = 500
+    unassigned_orders = 3000
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        day = datetime.datetime(2021, 1, 10, tzinfo=datetime.timezone.utc)
+        couriers = [CourierModel(courier_id=courier_id, courier_type=rng.choice(['foot', 'bike', 'car']),
+                                 regions=rng.sample(range(1, cls.regions + 1), 3),
+                                 working_hours=[[datetime.time(9), datetime.time(18)]])
+                    for courier_id in range(1, cls.couriers + 1)]
+        CourierModel.objects.bulk_create(couriers, batch_size=5000)
+        orders = []
+        for order_id in range(1, cls.completed_orders + cls.open_orders + cls.unassigned_orders + 1):
+            order = OrderModel(order_id=order_id, weight=round(rng.uniform(0.01, 5), 2),
+                               region=rng.randint(1, cls.regions),
+                               delivery_hours=[[datetime.time(10), datetime.time(12)]])
+            if order_id <= cls.completed_orders + cls.open_orders:
+                order.courier_id = rng.randint(1, cls.couriers)
+                order.courier_salary_coefficient = 2
+                order.assign_time = day
+            if order_id <= cls.completed_orders:
+                order.complete_time = day + datetime.timedelta(minutes=30)
+                order.delivery_time = 30 * 60
+            orders.append(order)
+        OrderModel.objects.bulk_create(orders, batch_size=5000)
+        DeliveryIntervalModel.objects.bulk_create(
+            (DeliveryIntervalModel(order_id=order.order_id, minutes=NumericRange(10 * 60, 12 * 60, '[]'))
+             for order in orders), batch_size=5000)
+        CourierRegionStatsModel.objects.bulk_create(
+            (CourierRegionStatsModel(courier_id=courier_id, region=region, completed_orders=1,
+                                     delivery_time_sum=30 * 60, last_complete_time=day)
+             for courier_id, region in {(order.courier_id, order.region) for order in orders[:cls.completed_orders]}),
+            batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertNoSequentialScans(self, queries):
+        # INSERTs only read their conflict target through the unique index; CTEs are checked like plain statements
+        statements = [query['sql'] for query in queries
+                      if query['sql'].startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH'))]
+        self.assertTrue(statements)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = [node['Relation Name'] for node in plan_nodes(plan[0]['Plan'])
+                         if node['Node Type'] == 'Seq Scan' and node['Relation Name'] in LARGE_TABLES]
+                self.assertEquals(scans, [], sql)
+
+    def request(self, method, url, data=None):
+        kwargs = {} if data is None else {'data': json.dumps(data), 'content_type': 'application/json'}
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertEquals(response.status_code, 200, response.content)
+        return response, queries
+
+    def test_assign_orders(self):
+        response, queries = self.request('post', reverse('assign_orders'), {'courier_id': 1})
+        self.assertTrue(json.loads(response.content)['orders'])
+        self.assertNoSequentialScans(queries)
+
+    def test_batch_assign_orders(self):
+        _, queries = self.request('post', reverse('batch_assign_orders'), {'courier_ids': [1, 2, 3]})
+        self.assertNoSequentialScans(queries)
+
+    def test_patch_courier(self):
+        courier_id = OrderModel.objects.filter(complete_time=None).exclude(courier=None).first().courier_id
+        _, queries = self.request('patch', reverse('modify_courier', args=[courier_id]),
+                                  {'working_hours': ['10:30-11:00'], 'regions': [1]})
+        self.assertNoSequentialScans(queries)
+
+    def test_complete_order(self):
+        order = OrderModel.objects.filter(complete_time=None).exclude(courier=None).first()
+        _, queries = self.request('post', reverse('complete_order'), {
+            'courier_id': order.courier_id, 'order_id': order.order_id,
+            'complete_time': (order.assign_time + datetime.timedelta(minutes=20)).isoformat()})
+        self.assertNoSequentialScans(queries)
+
+    def test_get_courier(self):
+        _, queries = self.request('get', reverse('modify_courier', args=[1]))
+        self.assertNoSequentialScans(queries)
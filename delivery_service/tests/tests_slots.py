@@ -0,0 +1,180 @@
+import datetime
+import json
+import random
+import unittest
+from unittest import mock
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from delivery_service import slots, views
+from delivery_service.assignment import weight_units
+from delivery_service.intervals import minute_intervals, overlaps, parse_intervals
+from delivery_service.models import DeliveryBatchModel, OrderModel
+from delivery_service.tests import tests_views
+
+
+def random_hours(rng):
+    hours = []
+    for _ in range(rng.randint(0, 2)):
+        start = rng.randrange(24 * 60)
+        end = rng.randrange(24 * 60)
+        hours.append('{:02d}:{:02d}-{:02d}:{:02d}'.format(start // 60, start % 60, end // 60, end % 60))
+    return parse_intervals(hours)
+
+
+@unittest.skipIf(slots.numpy is None, 'NumPy is not installed')
+class TestSlotIndex(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.rng = rng
+        self.orders = {order_id: (order_id, round(rng.uniform(0.01, 50), 2), rng.randint(1, 10), random_hours(rng))
+                       for order_id in range(1, 2001)}
+
+    def expected(self, orders, regions, working_hours, capacity):
+        # what the SQL query of AssignOrdersView selects
+        return sorted(order_id for order_id, weight, region, delivery_hours in orders.values()
+                      if region in regions and weight_units(weight) <= capacity and
+                      overlaps(minute_intervals(working_hours), minute_intervals(delivery_hours)))
+
+    def assertSameCandidates(self, index, orders):
+        for _ in range(200):
+            regions = self.rng.sample(range(1, 11), self.rng.randint(1, 3))
+            working_hours = random_hours(self.rng)
+            capacity = self.rng.randint(0, 5000)
+            self.assertEquals(sorted(candidate.order_id for candidate in index.candidates(regions, working_hours,
+                                                                                           capacity)),
+                              self.expected(orders, regions, working_hours, capacity))
+
+    def test_candidates_match_interval_overlap(self):
+        self.assertSameCandidates(slots.SlotIndex(self.orders.values()), self.orders)
+
+    def test_add_and_remove(self):
+        index = slots.SlotIndex(list(self.orders.values())[:1000])
+        index.add(list(self.orders.values())[1000:])
+        removed = self.rng.sample(sorted(self.orders), 700)
+        index.remove(removed + [5000])
+        for order_id in removed:
+            del self.orders[order_id]
+        self.assertEquals(len(index), len(self.orders))
+        self.assertSameCandidates(index, self.orders)
+
+    def test_bitmap_edges(self):
+        index = slots.SlotIndex([(1, 1, 1, parse_intervals(['23:00-00:30'])),
+                                 (2, 1, 1, parse_intervals(['12:00-12:00'])),
+                                 (3, 1, 1, parse_intervals(['00:00-23:59']))])
+        candidates = lambda hours: sorted(candidate.order_id for candidate in index.candidates(
+            [1], parse_intervals(hours), weight_units(10)))
+        self.assertEquals(candidates(['00:30-01:00']), [1, 3])
+        self.assertEquals(candidates(['11:00-12:00']), [2, 3])
+        self.assertEquals(candidates(['12:01-22:59']), [3])
+        self.assertEquals(candidates([]), [])
+        self.assertEquals(index.candidates([1], [[datetime.time(0), datetime.time(0)]], 99), [])
+
+
+class SlotIndexMixin:
+    def setUp(self):
+        slots.shared.reset()
+        self.addCleanup(slots.shared.reset)
+        # a TestCase never commits: the index is changed where the transaction of the view would commit
+        patcher = mock.patch.object(transaction, 'on_commit', lambda func, using=None: func())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+@unittest.skipIf(slots.numpy is None, 'NumPy is not installed')
+@override_settings(ASSIGNMENT_SLOT_INDEX=1, ASSIGNMENT_SLOT_INDEX_MAX_AGE=0)
+class TestCourierViewSlotIndex(SlotIndexMixin, tests_views.TestCourierView):
+    pass
+
+
+@unittest.skipIf(slots.numpy is None, 'NumPy is not installed')
+@override_settings(ASSIGNMENT_SLOT_INDEX=1, ASSIGNMENT_SLOT_INDEX_MAX_AGE=0)
+class AssignOrdersViewSlotIndex(SlotIndexMixin, tests_views.AssignOrdersView):
+    def test_assign_order_capacity(self):
+        self.client.post(tests_views.orders_url, content_type='application/json', data=json.dumps({"data": [
+            {"order_id": 50, "weight": 6, "region": 5, "delivery_hours": ["12:00-14:30"]},
+            {"order_id": 51, "weight": 4, "region": 12, "delivery_hours": ["11:00-12:00"]}]}))
+        for engine in ('greedy', 'knapsack', 'budgeted'):
+            with self.subTest(engine=engine), self.settings(ASSIGNMENT_ENGINE=engine):
+                OrderModel.objects.update(courier=None, assign_time=None)
+                DeliveryBatchModel.objects.all().delete()
+                # the index does not see this update, as with one made by another process, until it is rebuilt
+                slots.shared.reset()
+                data = json.loads(self.assignOrders(1).content)
+                self.assertEquals(len(data['orders']), 2)
+                self.assertLessEqual(sum(OrderModel.objects.filter(courier_id=1).values_list('weight', flat=True)),
+                                     10)
+
+    def test_orders_assigned_elsewhere_are_dropped(self):
+        self.assertEquals(json.loads(self.assignOrders(2).content)['orders'], [{'id': 12}, {'id': 35}, {'id': 39}])
+        OrderModel.objects.filter(order_id=35).update(courier=None, assign_time=None, batch=None)
+        DeliveryBatchModel.objects.update(open_orders=0)
+        # another process released order 35 and the batch was delivered, the index of this one still offers 12 and
+        # 39 as well
+        slots.add_orders(OrderModel.objects.filter(order_id__in=[12, 35, 39]))
+        self.assertEquals(json.loads(self.assignOrders(2).content)['orders'], [{'id': 35}])
+        self.assertFalse({12, 35} & set(slots.shared.index.positions))
+
+    def test_imported_and_released_orders_are_offered(self):
+        self.assertEquals(json.loads(self.assignOrders(1).content)['orders'], [{'id': 5}])
+        self.client.post(tests_views.orders_url, content_type='application/json', data=json.dumps({"data": [
+            {"order_id": 60, "weight": 1, "region": 12, "delivery_hours": ["11:00-12:00"]}]}))
+        b''.join(self.client.post(reverse('stream_import_orders'), content_type='application/x-ndjson', data=json.dumps(
+            {"order_id": 61, "weight": 1, "region": 22, "delivery_hours": ["14:00-15:00"]})).streaming_content)
+        self.client.patch(reverse('modify_courier', args=[1]), content_type='application/json',
+                          data=json.dumps({'regions': [99]}))
+        self.client.patch(reverse('modify_courier', args=[1]), content_type='application/json',
+                          data=json.dumps({'regions': [5, 12, 22]}))
+        self.assertEquals(json.loads(self.assignOrders(1).content)['orders'], [{'id': 5}, {'id': 60}, {'id': 61}])
+
+
+@unittest.skipIf(slots.numpy is None, 'NumPy is not installed')
+@override_settings(ASSIGNMENT_SLOT_INDEX=1, ASSIGNMENT_SLOT_INDEX_MAX_AGE=0)
+class BatchAssignOrdersViewSlotIndex(SlotIndexMixin, tests_views.BatchAssignOrdersView):
+    pass
+
+
+@unittest.skipIf(slots.numpy is None, 'NumPy is not installed')
+@override_settings(ASSIGNMENT_SLOT_INDEX=1, ASSIGNMENT_SLOT_INDEX_MAX_AGE=0)
+class CompleteOrderViewSlotIndex(SlotIndexMixin, tests_views.CompleteOrderView):
+    pass
+
+
+@unittest.skipIf(slots.numpy is None, 'NumPy is not installed')
+@override_settings(ASSIGNMENT_SLOT_INDEX=1, ASSIGNMENT_SLOT_INDEX_MAX_AGE=0)
+class TestSlotIndexTransactions(TestCase):
+    def setUp(self):
+        slots.shared.reset()
+        self.addCleanup(slots.shared.reset)
+        self.hours = parse_intervals(['10:00-12:00'])
+        for order_id in (1, 2, 3):
+            OrderModel.objects.create(order_id=order_id, weight=1, region=1, delivery_hours=self.hours)
+        slots.candidates([1], self.hours, weight_units(10))
+
+    def test_changes_wait_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            slots.remove_orders([1])
+            self.assertIn(1, slots.shared.index.positions)
+        self.assertNotIn(1, slots.shared.index.positions)
+
+    def test_rolled_back_changes_are_not_applied(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    slots.remove_orders([1])
+                    slots.add_orders([OrderModel(order_id=4, weight=1, region=1, delivery_hours=self.hours)])
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEquals(sorted(slots.shared.index.positions), [1, 2, 3])
+
+    def test_skipped_orders_stay_offered_until_assigned(self):
+        # order 1 was claimed, order 2 is assigned by another transaction and order 3 was only locked for a moment
+        OrderModel.objects.filter(order_id=2).update(assign_time=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            views.drop_assigned([1, 2, 3], [1])
+        self.assertEquals(sorted(slots.shared.index.positions), [3])
@@ -0,0 +1,90 @@
+import datetime
+import importlib
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from delivery_service.models import CourierTypeStatsModel, OrderModel, RegionHourStatsModel, RegionStatsModel
+from delivery_service.tests.tests_views import batch_assign_orders_url, couriers_json, couriers_url, orders_json, \
+    orders_url
+
+fill_stats = importlib.import_module('delivery_service.migrations.0008_stats').fill_stats
+
+
+class TestStatsViews(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.post(couriers_url, content_type='application/json', data=json.dumps(couriers_json))
+        self.client.post(orders_url, content_type='application/json', data=json.dumps(orders_json))
+        b''.join(self.client.post(reverse('stream_import_orders'), content_type='application/x-ndjson', data=json.dumps(
+            {"order_id": 60, "weight": 2, "region": 23, "delivery_hours": ["12:00-13:00"]})).streaming_content)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'orders.ndjson')
+            with open(path, 'w') as file:
+                file.write(json.dumps({"order_id": 61, "weight": 1, "region": 5, "delivery_hours": ["11:00-12:00"]}))
+            call_command('load_orders', path, stdout=StringIO())
+
+    def post(self, url, data):
+        return self.client.post(url, content_type='application/json', data=json.dumps(data))
+
+    def complete(self, courier_id, order_id, complete_time):
+        response = self.post(reverse('complete_order'), {'courier_id': courier_id, 'order_id': order_id,
+                                                          'complete_time': complete_time.isoformat()})
+        self.assertEquals(response.status_code, 200)
+
+    def snapshot(self):
+        return (set(RegionStatsModel.objects.values_list()),
+                set(RegionHourStatsModel.objects.values_list('region', 'hour', 'completed_orders',
+                                                             'delivery_time_sum')),
+                set(CourierTypeStatsModel.objects.values_list()))
+
+    def test_stats_follow_imports_assignments_and_completions(self):
+        self.assertEquals(json.loads(self.client.get(reverse('stats')).content), {
+            'unassigned_orders': 11, 'assigned_orders': 0, 'completed_orders': 0, 'average_delivery_time': None,
+            'earnings': 0})
+
+        self.post(reverse('assign_orders'), {'courier_id': 1})
+        self.post(reverse('assign_orders'), {'courier_id': 2})
+        assign_times = dict(OrderModel.objects.filter(order_id__in=[5, 12]).values_list('courier_id', 'assign_time'))
+        self.post(batch_assign_orders_url, {'courier_ids': [3, 5]})
+        # orders 35 and 39 are released
+        self.client.patch(reverse('modify_courier', args=[2]), content_type='application/json',
+                          data=json.dumps({'regions': [23]}))
+        self.complete(1, 5, assign_times[1] + datetime.timedelta(minutes=20))
+        self.complete(1, 61, assign_times[1] + datetime.timedelta(minutes=30))
+        self.complete(2, 12, assign_times[2] + datetime.timedelta(minutes=40))
+
+        self.assertEquals(json.loads(self.client.get(reverse('stats')).content), {
+            'unassigned_orders': 5, 'assigned_orders': 3, 'completed_orders': 3,
+            'average_delivery_time': (20 + 10 + 40) * 60 / 3, 'earnings': 2 * 500 * 2 + 500 * 9})
+        response = self.client.get(reverse('region_stats'))
+        regions = {row['region']: row for row in json.loads(response.content)['regions']}
+        self.assertEquals(regions[5], {'region': 5, 'unassigned_orders': 0, 'assigned_orders': 0,
+                                       'completed_orders': 2, 'average_delivery_time': 15 * 60, 'throughput': 0.08})
+        self.assertEquals(regions[23]['unassigned_orders'] + regions[23]['assigned_orders'], 1)
+        self.assertEquals(sum(row['assigned_orders'] for row in regions.values()), 3)
+        self.assertEquals(json.loads(self.client.get(reverse('courier_type_stats')).content), {'courier_types': [
+            {'courier_type': 'foot', 'completed_orders': 2, 'earnings': 2000},
+            {'courier_type': 'bike', 'completed_orders': 0, 'earnings': 0},
+            {'courier_type': 'car', 'completed_orders': 1, 'earnings': 4500}]})
+
+        # the counters kept by the views are what the migration computes from the orders
+        kept = self.snapshot()
+        for model in (RegionStatsModel, RegionHourStatsModel, CourierTypeStatsModel):
+            model.objects.all().delete()
+        fill_stats(apps, None)
+        self.assertEquals(self.snapshot(), kept)
+
+    def test_throughput_hours(self):
+        response = self.client.get(reverse('region_stats'), {'hours': 2})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(json.loads(response.content)['hours'], 2)
+        for hours in ('0', '100000', 'day'):
+            self.assertEquals(self.client.get(reverse('region_stats'), {'hours': hours}).status_code, 400)
@@ -0,0 +1,112 @@
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from delivery_service import utils
+from delivery_service.models import CourierModel, DeliveryIntervalModel, OrderModel
+
+
+def ndjson(*items):
+    return ''.join((item if isinstance(item, str) else json.dumps(item)) + '\n' for item in items).encode()
+
+
+def order(order_id, **change):
+    return dict({"order_id": order_id, "weight": 1.5, "region": 3, "delivery_hours": ["10:00-12:00"]}, **change)
+
+
+@override_settings(BULK_IMPORT_BATCH_SIZE=2)
+class TestStreamImport(TestCase):
+    def post(self, name, body):
+        response = self.client.post(reverse(name), data=body, content_type='application/x-ndjson')
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response['Content-Type'], 'application/x-ndjson')
+        return response
+
+    def lines(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_import_orders(self):
+        response = self.post('stream_import_orders', ndjson(
+            order(1), order(2, weight=100), '', order(3), '{"order_id": 4,', order(1), order(5)))
+        self.assertEquals(self.lines(response), [
+            {'orders': [{'id': 1}]},
+            {'validation_error': {'orders': [{'id': 2, 'line': 2, 'errors': {'weight': ['Invalid value.']}}]}},
+            {'orders': [{'id': 3}]},
+            {'validation_error': {'orders': [{'id': None, 'line': 5, 'errors': {'non_field_errors': ['Invalid JSON.']}}]}},
+            {'orders': [{'id': 5}]},
+            {'validation_error': {'orders': [{'id': 1, 'line': 6,
+                                              'errors': {'order_id': ['This field must be unique.']}}]}},
+            {'imported': 3, 'rejected': 3}])
+        self.assertEquals(set(OrderModel.objects.values_list('order_id', flat=True)), {1, 3, 5})
+        self.assertEquals(DeliveryIntervalModel.objects.count(), 3)
+
+    def test_import_couriers(self):
+        response = self.post('stream_import_couriers', ndjson(*(
+            {"courier_id": courier_id, "courier_type": "bike", "regions": [1, 2], "working_hours": ["09:00-18:00"]}
+            for courier_id in range(1, 6))))
+        self.assertEquals(self.lines(response)[-1], {'imported': 5, 'rejected': 0})
+        self.assertEquals(CourierModel.objects.count(), 5)
+
+    def test_chunks_are_saved_while_the_body_is_read(self):
+        response = self.post('stream_import_orders', ndjson(*(order(order_id) for order_id in range(1, 7))))
+        content = iter(response.streaming_content)
+        self.assertEquals(json.loads(next(content)), {'orders': [{'id': 1}, {'id': 2}]})
+        self.assertEquals(OrderModel.objects.count(), 2)
+        self.assertEquals(len(list(content)), 3)
+        self.assertEquals(OrderModel.objects.count(), 6)
+
+    @override_settings(STREAM_IMPORT_MAX_LINE_LENGTH=100)
+    def test_too_long_line(self):
+        response = self.post('stream_import_orders', ndjson(order(1), order(2, delivery_hours=['10:00-12:00'] * 20),
+                                                            order(3)))
+        self.assertEquals(self.lines(response), [
+            {'orders': [{'id': 1}]},
+            {'validation_error': {'orders': [{'id': None, 'line': 2,
+                                              'errors': {'non_field_errors': ['Line is too long.']}}]}},
+            {'orders': [{'id': 3}]},
+            {'imported': 2, 'rejected': 1}])
+
+    def test_rejected_items_report_their_fields(self):
+        response = self.post('stream_import_orders', ndjson('5', order(1, region=0, courier=1), '[]',
+                                                            {"order_id": 2}))
+        self.assertEquals(self.lines(response), [
+            {'validation_error': {'orders': [
+                {'id': None, 'line': 1, 'errors': {'non_field_errors': ['Invalid data.']}},
+                {'id': 1, 'line': 2, 'errors': {'non_field_errors': ['Unknown field: courier'],
+                                                'region': ['Invalid value.']}}]}},
+            {'validation_error': {'orders': [
+                {'id': None, 'line': 3, 'errors': {'non_field_errors': ['Invalid data.']}},
+                {'id': 2, 'line': 4, 'errors': {'weight': ['This field is required.'],
+                                                'region': ['This field is required.'],
+                                                'delivery_hours': ['This field is required.']}}]}},
+            {'imported': 0, 'rejected': 4}])
+
+    def test_ids_saved_by_a_concurrent_import_are_rejected(self):
+        self.lines(self.post('stream_import_orders', ndjson(order(2))))
+        existing_ids = utils.existing_ids
+        checks = []
+
+        def check_before_concurrent_import(model, ids):
+            # the first check runs before a concurrent import commits order 2
+            checks.append(ids)
+            return set() if len(checks) == 1 else existing_ids(model, ids)
+        with mock.patch('delivery_service.utils.existing_ids', side_effect=check_before_concurrent_import):
+            response = self.post('stream_import_orders', ndjson(order(1), order(2)))
+            self.assertEquals(self.lines(response), [
+                {'orders': [{'id': 1}]},
+                {'validation_error': {'orders': [{'id': 2, 'line': 2,
+                                                  'errors': {'order_id': ['This field must be unique.']}}]}},
+                {'imported': 1, 'rejected': 1}])
+        self.assertEquals(set(OrderModel.objects.values_list('order_id', flat=True)), {1, 2})
+        self.assertEquals(DeliveryIntervalModel.objects.count(), 2)
+
+    def test_empty_body(self):
+        self.assertEquals(self.lines(self.post('stream_import_orders', b'')), [{'imported': 0, 'rejected': 0}])
+
+    @override_settings(SERIALIZER_CODEC='drf')
+    def test_import_orders_with_drf_serializers(self):
+        response = self.post('stream_import_orders', ndjson(order(1), order(2, weight=100), order(3), order(1)))
+        self.assertEquals(self.lines(response)[-1], {'imported': 2, 'rejected': 2})
+        self.assertEquals(set(OrderModel.objects.values_list('order_id', flat=True)), {1, 3})
@@ -1,9 +1,17 @@
 import json
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 import datetime
 
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from delivery_service import cache as courier_cache
+from delivery_service.models import CourierModel, DeliveryBatchModel, OrderModel
+from delivery_service.outbox import process_events
+
 
 couriers_json = {"data": [
     {"courier_id": 1, "courier_type": "foot", "regions": [5, 12, 22], "working_hours": ["11:35-14:55"]},
@@ -30,7 +38,9 @@ orders_json = {"data": [
 couriers_url = reverse('import_couriers')
 orders_url = reverse('import_orders')
 assign_orders_url = reverse('assign_orders')
+batch_assign_orders_url = reverse('batch_assign_orders')
 complete_order_url = reverse('complete_order')
+batch_complete_orders_url = reverse('batch_complete_orders')
 
 
 class TestCouriersView(TestCase):
@@ -103,6 +113,7 @@ class TestCourierView(TestCase):
                        "working_hours": ["11:35-14:55"], 'earnings': 0}
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.client.post(couriers_url,
                          data=json.dumps(couriers_json).encode('utf-8'),
@@ -138,12 +149,81 @@ class TestCourierView(TestCase):
         response = self.modifyCourier(self.patch_json_plus_id_bad, 1)
         self.assertEquals(response.status_code, 400)
 
+    def test_courier_working_hours_withdraw_orders(self):
+        self.client.post(orders_url,
+                         data=json.dumps(orders_json).encode('utf-8'),
+                         content_type='application/json')
+        self.client.post(assign_orders_url,
+                         data=json.dumps({"courier_id": 2}).encode('utf-8'),
+                         content_type='application/json')
+        response = self.modifyCourier({"working_hours": ["19:00-21:00"]}, 2)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(list(OrderModel.objects.filter(courier_id=2).order_by('order_id')
+                                    .values_list('order_id', flat=True)), [35])
+        self.assertEquals(DeliveryBatchModel.objects.get(courier_id=2).open_orders, 1)
+
+    def test_courier_withdraw_large_open_order_set(self):
+        self.client.post(orders_url,
+                         data=json.dumps({'data': [
+                             {"order_id": order_id, "weight": 0.01, "region": 23 + order_id % 2,
+                              "delivery_hours": ["12:00-13:00"]} for order_id in range(1000, 4000)]}).encode('utf-8'),
+                         content_type='application/json')
+        OrderModel.objects.filter(order_id__gte=1000).update(courier_id=2, assign_time=datetime.datetime.now(
+            datetime.timezone.utc), courier_salary_coefficient=9)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.modifyCourier({"regions": [23]}, 2)
+        self.assertEquals(response.status_code, 200)
+        self.assertLess(len(queries), 15)
+        self.assertEquals(OrderModel.objects.filter(courier_id=2).count(), 1500)
+        self.assertFalse(OrderModel.objects.filter(order_id__gte=1000, courier=None)
+                         .exclude(assign_time=None, courier_salary_coefficient=None).exists())
+
+    def test_courier_withdraw_over_capacity(self):
+        self.client.post(orders_url,
+                         data=json.dumps({'data': [
+                             {"order_id": order_id, "weight": 4, "region": 23, "delivery_hours": ["12:00-13:00"]}
+                             for order_id in range(1000, 1005)]}).encode('utf-8'),
+                         content_type='application/json')
+        OrderModel.objects.filter(order_id__gte=1000).update(courier_id=2, assign_time=datetime.datetime.now(
+            datetime.timezone.utc), courier_salary_coefficient=9)
+        response = self.modifyCourier({"courier_type": "foot"}, 2)
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(OrderModel.objects.filter(courier_id=2).count(), 2)
+
     def test_courier_json_get_good_one(self):
         response = self.getCourier(1)
         self.assertEquals(response.status_code, 200)
         data = json.loads(response.content)
         self.assertEquals(data, self.courier_one_inf)
 
+    @override_settings(COURIER_CACHE_TIMEOUT=300)
+    def test_courier_get_cached_until_patch(self):
+        hits, misses = courier_cache.lookups.value(('hit',)), courier_cache.lookups.value(('miss',))
+        self.getCourier(1)
+        with self.assertNumQueries(0):
+            response = self.getCourier(1)
+        self.assertEquals(json.loads(response.content), self.courier_one_inf)
+        self.assertEquals(courier_cache.lookups.value(('hit',)) - hits, 1)
+        self.assertEquals(courier_cache.lookups.value(('miss',)) - misses, 1)
+        self.modifyCourier(self.patch_json_good_one, 1)
+        response = self.getCourier(1)
+        self.assertEquals(json.loads(response.content)['working_hours'], self.patch_json_good_one['working_hours'])
+
+    @override_settings(COURIER_CACHE_TIMEOUT=300)
+    def test_courier_read_before_invalidation_is_not_served(self):
+        def render_during_patch():
+            # the PATCH commits after the GET read the row and before it stores the representation
+            courier_cache.invalidate_courier(1)
+            return {'courier_id': 1, 'rating': 'stale'}
+
+        self.assertEquals(courier_cache.cached_courier(1, render_during_patch)['rating'], 'stale')
+        self.assertEquals(courier_cache.cached_courier(1, lambda: {'courier_id': 1, 'rating': 5}),
+                          {'courier_id': 1, 'rating': 5})
+
+    def test_courier_get_not_exists(self):
+        response = self.getCourier(35)
+        self.assertEquals(response.status_code, 404)
+
 
 class TestOrdersView(TestCase):
     orders_json_good = {'data': [
@@ -162,6 +242,11 @@ class TestOrdersView(TestCase):
         {"order_id": 'text', 'temperature': 4, "weight": 0.23, "region": 12, "delivery_hours": ["11:30-15:00"]}]}
     orders_json_id_exists = {'data': [
         {"order_id": 4, "weight": 0.23, "region": 12, "delivery_hours": ["11:30-15:00"]}]}
+    orders_json_id_exists_response = {"validation_error": {"orders": [{"id": 4}]}}
+    orders_json_id_repeated = {'data': [
+        {"order_id": 100, "weight": 0.23, "region": 12, "delivery_hours": ["11:30-15:00"]},
+        {"order_id": 100, "weight": 1, "region": 12, "delivery_hours": ["11:30-15:00"]}]}
+    orders_json_id_repeated_response = {"validation_error": {"orders": [{"id": 100}]}}
 
     def setUp(self):
         self.client = Client()
@@ -196,7 +281,15 @@ class TestOrdersView(TestCase):
 
     def test_orders_id_exists(self):
         response = self.publishOrders(self.orders_json_id_exists)
+        data = json.loads(response.content)
+        self.assertEquals(response.status_code, 400)
+        self.assertEquals(data, self.orders_json_id_exists_response)
+
+    def test_orders_id_repeated(self):
+        response = self.publishOrders(self.orders_json_id_repeated)
+        data = json.loads(response.content)
         self.assertEquals(response.status_code, 400)
+        self.assertEquals(data, self.orders_json_id_repeated_response)
 
 
 class AssignOrdersView(TestCase):
@@ -227,12 +320,85 @@ class AssignOrdersView(TestCase):
         response = self.assignOrders(2)
         self.assertEquals(response.status_code, 200)
         data = json.loads(response.content)
-        self.assertEquals(data['orders'], [{'id': 12}, {'id': 35}, {'id': 39}, {'id': 40}])
+        self.assertEquals(data['orders'], [{'id': 12}, {'id': 35}, {'id': 39}])
+
+    def test_assign_order_capacity(self):
+        self.client.post(orders_url,
+                         data=json.dumps({"data": [
+                             {"order_id": 50, "weight": 6, "region": 5, "delivery_hours": ["12:00-14:30"]},
+                             {"order_id": 51, "weight": 4, "region": 12, "delivery_hours": ["11:00-12:00"]}]})
+                         .encode('utf-8'),
+                         content_type='application/json')
+        for engine in ('greedy', 'knapsack', 'budgeted'):
+            with self.subTest(engine=engine), self.settings(ASSIGNMENT_ENGINE=engine):
+                OrderModel.objects.update(courier=None, assign_time=None)
+                DeliveryBatchModel.objects.all().delete()
+                response = self.assignOrders(1)
+                self.assertEquals(response.status_code, 200)
+                data = json.loads(response.content)
+                self.assertEquals(len(data['orders']), 2)
+                weights = OrderModel.objects.filter(courier_id=1).values_list('weight', flat=True)
+                self.assertLessEqual(sum(weights), 10)
 
     def test_assign_order_courier_id_not_exists(self):
         response = self.assignOrders(35)
         self.assertEquals(response.status_code, 400)
 
+    def test_repeat_assign_returns_open_batch(self):
+        first = json.loads(self.assignOrders(2).content)
+        self.assertEquals(first['orders'], [{'id': 12}, {'id': 35}, {'id': 39}])
+        self.client.post(complete_order_url, content_type='application/json', data=json.dumps(
+            {"courier_id": 2, "order_id": 12, "complete_time": "2030-01-10T10:33:01.42Z"}))
+        with self.assertNumQueries(5):
+            repeat = json.loads(self.assignOrders(2).content)
+        self.assertEquals(repeat, {'orders': [{'id': 35}, {'id': 39}], 'assign_time': first['assign_time']})
+        for order_id in (35, 39):
+            self.client.post(complete_order_url, content_type='application/json', data=json.dumps(
+                {"courier_id": 2, "order_id": order_id, "complete_time": "2030-01-10T10:33:01.42Z"}))
+        # the batch is delivered, the next call assigns new orders
+        self.assertEquals(json.loads(self.assignOrders(2).content)['orders'], [{'id': 40}])
+        self.assertEquals(DeliveryBatchModel.objects.filter(courier_id=2, open_orders__gt=0).count(), 1)
+
+
+class BatchAssignOrdersView(TestCase):
+    couriers_json = {"data": [
+        {"courier_id": 20, "courier_type": "foot", "regions": [70, 71], "working_hours": ["09:00-18:00"]},
+        {"courier_id": 21, "courier_type": "foot", "regions": [70], "working_hours": ["09:00-18:00"]}]}
+    orders_json = {"data": [
+        {"order_id": 70, "weight": 5, "region": 70, "delivery_hours": ["10:00-12:00"]},
+        {"order_id": 71, "weight": 5, "region": 71, "delivery_hours": ["10:00-12:00"]},
+        {"order_id": 72, "weight": 5, "region": 70, "delivery_hours": ["10:00-12:00"]}]}
+
+    def setUp(self):
+        self.client = Client()
+        for url, data in ((couriers_url, couriers_json), (orders_url, orders_json),
+                          (couriers_url, self.couriers_json), (orders_url, self.orders_json)):
+            self.client.post(url, data=json.dumps(data).encode('utf-8'), content_type='application/json')
+
+    def assignOrders(self, courier_ids):
+        return self.client.post(batch_assign_orders_url,
+                                data=json.dumps({"courier_ids": courier_ids}).encode('utf-8'),
+                                content_type='application/json')
+
+    def test_batch_assign_global_matching(self):
+        response = self.assignOrders([20, 21, 1])
+        self.assertEquals(response.status_code, 200)
+        data = json.loads(response.content)['couriers']
+        self.assertEquals([courier['courier_id'] for courier in data], [20, 21, 1])
+        self.assertIn({'id': 71}, data[0]['orders'])
+        self.assertEquals(len(data[0]['orders']) + len(data[1]['orders']), 3)
+        self.assertEquals(data[2]['orders'], [{'id': 5}])
+        self.assertEquals(len({courier['assign_time'] for courier in data}), 1)
+
+    def test_batch_assign_courier_not_exists(self):
+        response = self.assignOrders([20, 35])
+        self.assertEquals(response.status_code, 400)
+        self.assertFalse(OrderModel.objects.exclude(courier=None).exists())
+
+    def test_batch_assign_invalid(self):
+        response = self.assignOrders([])
+        self.assertEquals(response.status_code, 400)
+
 
 class CompleteOrderView(TestCase):
     complete_order_json_good = {
@@ -250,6 +416,7 @@ class CompleteOrderView(TestCase):
         "order_id": 5,
         "complete_time": (datetime.datetime.now() + datetime.timedelta(minutes=30)).strftime('%Y-%m-%dT%H:%M:%S')
     }
+    complete_order_queries = 10
 
     def setUp(self):
         self.client = Client()
@@ -288,11 +455,108 @@ class CompleteOrderView(TestCase):
         data = json.loads(response.content)
         self.assertEquals(data['order_id'], 35)
 
+    def test_complete_order_query_count_independent_of_history(self):
+        self.client.post(orders_url,
+                         data=json.dumps({'data': [
+                             {"order_id": order_id, "weight": 0.5, "region": 23, "delivery_hours": ["12:00-13:00"]}
+                             for order_id in range(100, 140)]}).encode('utf-8'),
+                         content_type='application/json')
+        assign_time = datetime.datetime(2021, 1, 10, 9, 0, tzinfo=datetime.timezone.utc)
+        OrderModel.objects.filter(order_id__gte=100).update(
+            courier_id=2, assign_time=assign_time, courier_salary_coefficient=9,
+            batch=DeliveryBatchModel.objects.create(courier_id=2, assign_time=assign_time, open_orders=40))
+        for order_id in range(100, 140):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.completeOrder({
+                    "courier_id": 2,
+                    "order_id": order_id,
+                    "complete_time": (assign_time + datetime.timedelta(minutes=order_id - 99)).isoformat()
+                })
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(len(queries), self.complete_order_queries)
+        process_events(100)
+        self.assertEquals(CourierModel.objects.get(courier_id=2).earnings, 40 * 500 * 9)
+        self.assertEquals(DeliveryBatchModel.objects.get().open_orders, 0)
+        self.assertEquals(CourierModel.objects.get(courier_id=2).rating, 4.92)
+
     def test_complete_order_courier_one_wrong(self):
         self.assignOrders(courier_id=2)
         response = self.completeOrder(self.complete_order_json_good_wrong_courier)
         self.assertEquals(response.status_code, 400)
 
+    def test_complete_time_out_of_range(self):
+        self.assignOrders(courier_id=2)
+        for complete_time in ('9999-12-31T23:59:59-01:00', '0001-01-01T00:00:00+01:00'):
+            response = self.completeOrder(dict(self.complete_order_json_good, complete_time=complete_time))
+            self.assertEquals(response.status_code, 400)
+
+
+class BatchCompleteOrdersView(TestCase):
+    assign_time = datetime.datetime(2021, 1, 10, 9, 0, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        for url, data in ((couriers_url, couriers_json), (orders_url, orders_json), (orders_url, {'data': [
+                {"order_id": order_id, "weight": 0.5, "region": 23 + order_id % 2, "delivery_hours": ["12:00-13:00"]}
+                for order_id in range(100, 120)]})):
+            self.client.post(url, data=json.dumps(data).encode('utf-8'), content_type='application/json')
+        # the same orders for couriers 2 and 4, both by car
+        for courier_id, first in ((2, 100), (4, 110)):
+            OrderModel.objects.filter(order_id__gte=first, order_id__lt=first + 10).update(
+                courier_id=courier_id, assign_time=self.assign_time, courier_salary_coefficient=9,
+                batch=DeliveryBatchModel.objects.create(courier_id=courier_id, assign_time=self.assign_time,
+                                                        open_orders=10))
+
+    def completeOrders(self, items):
+        return self.client.post(batch_complete_orders_url, data=json.dumps({'data': items}).encode('utf-8'),
+                                content_type='application/json')
+
+    def item(self, courier_id, order_id, minutes):
+        return {"courier_id": courier_id, "order_id": order_id,
+                "complete_time": (self.assign_time + datetime.timedelta(minutes=minutes)).isoformat()}
+
+    def test_batch_matches_single_completions(self):
+        minutes = [7, 3, 12, 30, 31, 45, 50, 52, 80, 95]
+        for position, order_id in enumerate(range(100, 110)):
+            self.client.post(complete_order_url, data=json.dumps(self.item(2, order_id, minutes[position])),
+                             content_type='application/json')
+        items = [self.item(4, 110 + position, minutes[position]) for position in range(10)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.completeOrders(items[::-1])
+        self.assertEquals(json.loads(response.content), {'orders': [{'id': order_id}
+                                                                    for order_id in range(119, 109, -1)]})
+        self.assertLessEqual(len(queries), 12)
+        self.assertEquals(list(OrderModel.objects.filter(courier_id=2).order_by('order_id')
+                               .values_list('delivery_time', flat=True)),
+                          list(OrderModel.objects.filter(courier_id=4).order_by('order_id')
+                               .values_list('delivery_time', flat=True)))
+        process_events(100)
+        single, batch = CourierModel.objects.get(courier_id=2), CourierModel.objects.get(courier_id=4)
+        self.assertEquals((single.earnings, single.rating, single.min_delivery_time),
+                          (batch.earnings, batch.rating, batch.min_delivery_time))
+        self.assertEquals(DeliveryBatchModel.objects.get(courier_id=4).open_orders, 0)
+
+    def test_rejected_items_are_reported(self):
+        response = self.completeOrders([self.item(4, 110, 5), self.item(2, 110, 6), self.item(4, 999, 7),
+                                        {"courier_id": 4, "order_id": 111}, self.item(4, 110, 8), self.item(2, 100, 9),
+                                        5])
+        self.assertEquals(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEquals(data['orders'], [{'id': 110}, {'id': 100}])
+        not_open = {'non_field_errors': ['The order is not assigned to the courier or is already completed.']}
+        self.assertEquals(data['validation_error']['orders'], [
+            {'id': 110, 'position': 1, 'errors': not_open},
+            {'id': 999, 'position': 2, 'errors': not_open},
+            {'id': 111, 'position': 3, 'errors': {'complete_time': ['This field is required.']}},
+            {'id': 110, 'position': 4, 'errors': not_open},
+            {'id': None, 'position': 6, 'errors': {'non_field_errors': ['Invalid data.']}}])
+        process_events(100)
+        self.assertEquals(CourierModel.objects.get(courier_id=4).earnings, 500 * 9)
+        self.assertEquals(self.completeOrders([]).status_code, 400)
+        self.assertEquals(self.client.post(batch_complete_orders_url, data=b'{"data": {}}',
+                                           content_type='application/json').status_code, 400)
+
 
 class TestCourierViewGet(TestCase):
     complete_order_json_one = {
@@ -323,10 +587,12 @@ class TestCourierViewGet(TestCase):
                                 content_type='application/json')
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.client.post(couriers_url,
                          data=json.dumps(couriers_json).encode('utf-8'),
                          content_type='application/json')
+        self.couriers_GET(1)
         self.client.post(orders_url,
                          data=json.dumps(orders_json).encode('utf-8'),
                          content_type='application/json')
@@ -342,6 +608,7 @@ class TestCourierViewGet(TestCase):
                 "complete_time": (datetime.datetime.now() + time_delta * i).strftime('%Y-%m-%dT%H:%M:%S')
             })
             i += 1
+        process_events(100)
 
     def couriers_GET(self, courier_id):
         courier_url = reverse('modify_courier', args=[courier_id])
@@ -0,0 +1,4 @@
+from delivery_service import async_views
+from delivery_service.urls import patterns
+
+urlpatterns = patterns(async_views)
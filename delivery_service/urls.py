@@ -1,10 +1,23 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 
-urlpatterns = [
-    path('couriers', views.CouriersView.as_view(), name='import_couriers'),
-    path('couriers/<int:courier_id>', views.CourierView.as_view(), name='modify_courier'),
-    path('orders', views.OrdersView.as_view(), name='import_orders'),
-    path('orders/assign', views.AssignOrdersView.as_view(), name='assign_orders'),
-    path('orders/complete', views.OrderCompleteView.as_view(), name='complete_order')]
+def patterns(views):
+    return [
+        path('couriers', views.CouriersView.as_view(), name='import_couriers'),
+        path('couriers/stream', views.CouriersStreamView.as_view(), name='stream_import_couriers'),
+        path('couriers/<int:courier_id>', views.CourierView.as_view(), name='modify_courier'),
+        path('orders', views.OrdersView.as_view(), name='import_orders'),
+        path('orders/stream', views.OrdersStreamView.as_view(), name='stream_import_orders'),
+        path('orders/assign', views.AssignOrdersView.as_view(), name='assign_orders'),
+        path('orders/assign/batch', views.BatchAssignOrdersView.as_view(), name='batch_assign_orders'),
+        path('orders/complete', views.OrderCompleteView.as_view(), name='complete_order'),
+        path('orders/complete/batch', views.BatchOrderCompleteView.as_view(), name='batch_complete_orders'),
+        path('stats', views.StatsView.as_view(), name='stats'),
+        path('stats/regions', views.RegionStatsView.as_view(), name='region_stats'),
+        path('stats/courier-types', views.CourierTypeStatsView.as_view(), name='courier_type_stats'),
+        path('metrics', views.MetricsView.as_view(), name='metrics')]
+
+
+urlpatterns = patterns(async_views if settings.ASYNC_VIEWS else views)
@@ -1,4 +1,14 @@
-from .models import OrderModel
+import time
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from psycopg2.extras import NumericRange
+from .intervals import minute_intervals
+from .models import ArchivedOrderModel, DeliveryBatchModel, DeliveryIntervalModel, OrderModel
+from .stats import region_upsert
+
+ARCHIVES = {OrderModel: (ArchivedOrderModel,)}
 
 
 class ResponseAfterValidation:
@@ -23,6 +33,65 @@ class ResponseAfterValidation:
         return not_validated_id
 
 
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def existing_ids(model, ids):
+    # ids stay unique across the service, including orders already moved to the archive
+    taken = set()
+    for stored_in in (model,) + ARCHIVES.get(model, ()):
+        for chunk in chunks(ids, settings.BULK_IMPORT_BATCH_SIZE):
+            taken.update(stored_in.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+    return taken
+
+
+def taken_positions(model, ids):
+    # positions of ids that are already stored or repeat an earlier id; None marks an item to skip
+    taken = existing_ids(model, [object_id for object_id in ids if object_id is not None])
+    positions = []
+    for position, object_id in enumerate(ids):
+        if object_id is None:
+            continue
+        if object_id in taken:
+            positions.append(position)
+        taken.add(object_id)
+    return positions
+
+
+def bulk_insert(model, validated_data):
+    objects = [model(**data) for data in validated_data]
+    with transaction.atomic():
+        model.objects.bulk_create(objects, batch_size=settings.BULK_IMPORT_BATCH_SIZE)
+    return objects
+
+
+def assign_to_couriers(assignments, assign_time):
+    """
+    Assigns the orders of each (order_ids, courier_id, salary_coefficient) as a new delivery batch of the courier.
+    The orders are updated in one statement, which also moves them from unassigned to assigned in the region stats.
+    """
+    batches = DeliveryBatchModel.objects.bulk_create([
+        DeliveryBatchModel(courier_id=courier_id, assign_time=assign_time, open_orders=len(order_ids))
+        for order_ids, courier_id, salary_coefficient in assignments])
+    rows = [(order_id, courier_id, salary_coefficient, batch.id)
+            for (order_ids, courier_id, salary_coefficient), batch in zip(assignments, batches)
+            for order_id in order_ids]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'WITH assigned AS ('
+            '    UPDATE {table} SET courier_id = assignment.courier_id, assign_time = %s,'
+            '    courier_salary_coefficient = assignment.salary_coefficient, batch_id = assignment.batch_id'
+            '    FROM unnest(%s::integer[], %s::integer[], %s::integer[], %s::bigint[])'
+            '    AS assignment (order_id, courier_id, salary_coefficient, batch_id)'
+            '    WHERE {table}.order_id = assignment.order_id RETURNING region'
+            ') '.format(table=OrderModel._meta.db_table) +
+            region_upsert('SELECT region, -count(*), count(*), 0, 0 FROM assigned GROUP BY region'),
+            [OrderModel._meta.get_field('assign_time').get_db_prep_value(assign_time, connection)] +
+            [list(column) for column in zip(*rows)])
+
+
 def courier_capacity_and_salary_coefficient(courier_type):
     if courier_type == 'foot':
         capacity = 10
@@ -36,13 +105,44 @@ def courier_capacity_and_salary_coefficient(courier_type):
     return {'capacity': capacity, 'salary_coefficient': salary_coefficient}
 
 
+def minute_ranges(time_ranges):
+    return [NumericRange(start, end, '[]') for start, end in minute_intervals(time_ranges)]
+
+
+def insert_intervals(owners, interval_model, owner_field, hours_field):
+    interval_model.objects.bulk_create(
+        [interval_model(**{owner_field: owner, 'minutes': minutes})
+         for owner in owners for minutes in minute_ranges(getattr(owner, hours_field))],
+        batch_size=settings.BULK_IMPORT_BATCH_SIZE)
+
+
 def time_overlap(query_set, courier_working_hours):
-    orders_set_suitable_working_intervals = []
-    for working_hours_interval in courier_working_hours:
-        for order_object in query_set:
-            for delivery_hours_interval in order_object.delivery_hours:
-                if working_hours_interval[0] <= delivery_hours_interval[1] \
-                        and delivery_hours_interval[0] <= working_hours_interval[1]:
-                    orders_set_suitable_working_intervals.append(order_object.order_id)
-                    break
-    return OrderModel.objects.filter(order_id__in=orders_set_suitable_working_intervals)
+    overlap = Q()
+    for minutes in minute_ranges(courier_working_hours):
+        overlap |= Q(minutes__overlap=minutes)
+    if not overlap:
+        return query_set.none()
+    return query_set.filter(Exists(DeliveryIntervalModel.objects.filter(overlap, order=OuterRef('pk'))))
+
+
+def check_connections(**kwargs):
+    # a persistent connection (CONN_MAX_AGE) may have been dropped by Postgres or the pooler while idle; one that
+    # served a request less than CONN_HEALTH_CHECK_IDLE seconds ago is used without the extra round trip
+    if not settings.CONN_HEALTH_CHECKS:
+        return
+    idle_since = time.monotonic() - settings.CONN_HEALTH_CHECK_IDLE
+    for conn in connections.all():
+        if conn.connection is None or not conn.settings_dict['CONN_MAX_AGE']:
+            continue
+        released_at = getattr(conn, 'released_at', None)
+        if released_at is not None and released_at > idle_since:
+            continue
+        if not conn.is_usable():
+            conn.close()
+
+
+def release_connections(**kwargs):
+    # called when a request finishes, after close_old_connections closed the connections that failed
+    now = time.monotonic()
+    for conn in connections.all():
+        conn.released_at = now if conn.connection is not None else None
@@ -1,142 +1,474 @@
-from django.http import JsonResponse, HttpResponse
-from .serializers import CourierSerializer, OrderSerializer, OrderCompleteSerializer, OrderAssignSerializer
+import itertools
+
+from django.http import HttpResponse, StreamingHttpResponse
+from .codec import COMPLETE_FIELDS, COURIER_FIELDS, ORDER_FIELDS, body_lines, dumps, get_serializer, json_response, \
+    loads, parse
+from .serializers import OrderBatchAssignSerializer
 from rest_framework import status
-from rest_framework.parsers import JSONParser
 from django.views import View
-from .models import CourierModel, OrderModel
+from .models import TYPE_CHOICES, CourierModel, CourierTypeStatsModel, DeliveryBatchModel, OrderModel, \
+    RegionHourStatsModel, RegionStatsModel
 from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 from django.shortcuts import get_object_or_404
-from datetime import datetime
-from django.db.models import Avg
-from .utils import ResponseAfterValidation, courier_capacity_and_salary_coefficient, time_overlap
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .cache import cached_courier, invalidate_courier
+from .completion import NOT_OPEN, complete_orders
+from .idempotency import idempotent
+from .loader import validate_row
+from . import metrics, slots, stats
+from .assignment import match_orders, order_candidate, order_candidates, select_orders, weight_units
+from .intervals import minute_intervals, overlaps
+from .utils import ResponseAfterValidation, assign_to_couriers, courier_capacity_and_salary_coefficient, time_overlap
 
 
 class CouriersView(View):
     def post(self, request):
-        data = JSONParser().parse(request)
-        serialized = CourierSerializer(data=data['data'], many=True)
+        data = parse(request)
+        serialized = get_serializer('courier')(data=data['data'], many=True)
         if serialized.is_valid():
             serialized.save()
-            return JsonResponse(ResponseAfterValidation.imported_id(serialized, 'courier'),
-                                status=status.HTTP_201_CREATED)
-        return JsonResponse(ResponseAfterValidation.not_validated_id(serialized, 'courier'),
-                            status=status.HTTP_400_BAD_REQUEST)
+            return json_response(ResponseAfterValidation.imported_id(serialized, 'courier'),
+                                 status=status.HTTP_201_CREATED)
+        return json_response(ResponseAfterValidation.not_validated_id(serialized, 'courier'),
+                             status=status.HTTP_400_BAD_REQUEST)
 
 
 class CourierView(View):
     def withdraw_orders(self, courier_object):
-        query_set = OrderModel.objects.filter(courier=courier_object.courier_id, complete_time=None)
-        query_set_suitable = query_set.filter(region__in=courier_object.regions,
-                                              weight__lte=
-                                              courier_capacity_and_salary_coefficient(courier_object.courier_type)[
-                                                  'capacity'])
-        query_set_suitable_delivery_time = time_overlap(query_set_suitable, courier_object.working_hours)
-        query_set_not_suitable = query_set.difference(query_set_suitable_delivery_time)
-        for order in query_set_not_suitable:
-            order.courier = None
-            order.assign_time = None
-            order.courier_capacity_and_salary_coefficient = None
-            order.save()
+        capacity = weight_units(courier_capacity_and_salary_coefficient(courier_object.courier_type)['capacity'])
+        query_set_suitable = OrderModel.objects.filter(courier=courier_object.courier_id, complete_time=None,
+                                                       region__in=courier_object.regions, weight__lte=capacity / 100)
+        candidates = order_candidates(time_overlap(query_set_suitable, courier_object.working_hours))
+        if sum(candidate.weight for candidate in candidates) > capacity:
+            candidates = select_orders(candidates, capacity)
+        with connection.cursor() as cursor:
+            # the released orders leave their delivery batch as if they were delivered
+            cursor.execute(
+                'WITH withdrawn AS ('
+                '    SELECT order_id, batch_id FROM {orders}'
+                '    WHERE courier_id = %s AND complete_time IS NULL AND NOT (order_id = ANY(%s)) FOR UPDATE'
+                '), released AS ('
+                '    UPDATE {orders} SET courier_id = NULL, assign_time = NULL, courier_salary_coefficient = NULL,'
+                '    batch_id = NULL WHERE order_id IN (SELECT order_id FROM withdrawn)'
+                '    RETURNING order_id, weight, region, delivery_hours'
+                '), batches AS ('
+                '    UPDATE {batches} SET open_orders = open_orders - withdrawn.count'
+                '    FROM (SELECT batch_id, count(*) FROM withdrawn GROUP BY batch_id) AS withdrawn'
+                '    WHERE {batches}.id = withdrawn.batch_id'
+                '), counted AS ({counted}) SELECT * FROM released'.format(
+                    orders=OrderModel._meta.db_table, batches=DeliveryBatchModel._meta.db_table,
+                    counted=stats.region_upsert(
+                        'SELECT region, count(*), -count(*), 0, 0 FROM released GROUP BY region')),
+                [courier_object.courier_id, [candidate.order_id for candidate in candidates]])
+            released = [OrderModel(order_id=order_id, weight=weight, region=region, delivery_hours=delivery_hours)
+                        for order_id, weight, region, delivery_hours in cursor.fetchall()]
+        slots.add_orders(released)
+        return sorted(order.order_id for order in released)
 
     def get(self, request, courier_id):
-        courier_object = get_object_or_404(CourierModel, courier_id=courier_id)
-        serializer = CourierSerializer(courier_object)
-        return JsonResponse(serializer.data, status=status.HTTP_200_OK)
+        representation = cached_courier(courier_id, lambda: dict(
+            get_serializer('courier')(get_object_or_404(CourierModel, courier_id=courier_id)).data))
+        return json_response(representation, status=status.HTTP_200_OK)
 
     def patch(self, request, courier_id):
-        courier_object = get_object_or_404(CourierModel, courier_id=courier_id)
-        data = JSONParser().parse(request)
-        serialized = CourierSerializer(courier_object, data=data, partial=True)
-        if serialized.is_valid():
-            try:
-                serialized.save()
-            except ValidationError:
-                return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
-            self.withdraw_orders(courier_object)
-            courier_object = get_object_or_404(CourierModel, courier_id=courier_id)
-            serializer = CourierSerializer(courier_object)
-            return JsonResponse(serializer.data, status=status.HTTP_200_OK)
+        data = parse(request)
+        with transaction.atomic():
+            courier_object = get_object_or_404(CourierModel.objects.select_for_update(), courier_id=courier_id)
+            serialized = get_serializer('courier')(courier_object, data=data, partial=True)
+            if serialized.is_valid():
+                try:
+                    courier_object = serialized.save()
+                except ValidationError:
+                    return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+                invalidate_courier(courier_id)
+                self.withdraw_orders(courier_object)
+                serializer = get_serializer('courier')(courier_object)
+                return json_response(serializer.data, status=status.HTTP_200_OK)
         return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
 
 
 class OrdersView(View):
     def post(self, request):
-        data = JSONParser().parse(request)
-        serialized = OrderSerializer(data=data['data'], many=True)
+        data = parse(request)
+        serialized = get_serializer('order')(data=data['data'], many=True)
         if serialized.is_valid():
-            serialized.save()
-            return JsonResponse(ResponseAfterValidation.imported_id(serialized, 'order'),
-                                status=status.HTTP_201_CREATED)
-        return JsonResponse(ResponseAfterValidation.not_validated_id(serialized, 'order'),
-                            status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                orders = serialized.save()
+                stats.record_imported(order.region for order in orders)
+            slots.add_orders(orders)
+            return json_response(ResponseAfterValidation.imported_id(serialized, 'order'),
+                                 status=status.HTTP_201_CREATED)
+        return json_response(ResponseAfterValidation.not_validated_id(serialized, 'order'),
+                             status=status.HTTP_400_BAD_REQUEST)
+
+
+class StreamImportView(View):
+    """
+    Imports newline-delimited JSON items in chunks of BULK_IMPORT_BATCH_SIZE while the body arrives. Each chunk is
+    saved in its own transaction without its invalid items, and a line with the imported ids and one with the
+    rejected items are written back for it, followed by a line with the totals.
+    """
+    object_name = None
+    fields = None
+
+    def post(self, request):
+        return StreamingHttpResponse(self.import_lines(body_lines(request)), content_type='application/x-ndjson')
+
+    def import_lines(self, lines):
+        imported = rejected = 0
+        numbered = ((number, line) for number, line in enumerate(lines, 1) if line is None or line.strip())
+        while True:
+            chunk = list(itertools.islice(numbered, settings.BULK_IMPORT_BATCH_SIZE))
+            if not chunk:
+                break
+            accepted, rejects = self.import_chunk(chunk)
+            imported += len(accepted)
+            rejected += len(rejects)
+            if accepted:
+                yield dumps({self.object_name + 's': [{'id': object_id} for object_id in accepted]}) + b'\n'
+            if rejects:
+                yield dumps({'validation_error': {self.object_name + 's': rejects}}) + b'\n'
+        yield dumps({'imported': imported, 'rejected': rejected}) + b'\n'
+
+    def import_chunk(self, chunk):
+        rejects = []
+        items = []
+        for number, line in chunk:
+            try:
+                if line is None:
+                    raise ValueError('Line is too long.')
+                items.append((number, loads(line)))
+            except ValueError as error:
+                message = str(error) if line is None else 'Invalid JSON.'
+                rejects.append({'id': None, 'line': number, 'errors': {api_settings.NON_FIELD_ERRORS_KEY: [message]}})
+        valid = []
+        for number, item in items:
+            # the errors of each field, the same under either codec; non-object lines never reach the serializer
+            _, errors = validate_row(self.fields, item)
+            if errors:
+                rejects.append({'id': item.get(self.object_name + '_id') if isinstance(item, dict) else None,
+                                'line': number, 'errors': errors})
+            else:
+                valid.append((number, item))
+        items = valid
+        conflict = None
+        while True:
+            serialized = get_serializer(self.object_name)(data=[item for _, item in items], many=True)
+            # what is left are ids taken by earlier lines or a concurrent import, which can change between the passes
+            if not serialized.is_valid():
+                conflict = None
+                valid = []
+                for (number, item), errors in zip(items, serialized.errors):
+                    if errors:
+                        rejects.append({'id': item[self.object_name + '_id'], 'line': number, 'errors': errors})
+                    else:
+                        valid.append((number, item))
+                items = valid
+                continue
+            if conflict is not None:
+                # no id is taken, the save failed for another reason
+                raise conflict
+            if items:
+                try:
+                    with transaction.atomic():
+                        self.saved(serialized.save())
+                except IntegrityError as error:
+                    # a concurrent import saved some of the ids after the check, the next pass rejects them
+                    conflict = error
+                    continue
+            break
+        return ([data[self.object_name + '_id'] for data in serialized.validated_data],
+                sorted(rejects, key=lambda reject: reject['line']))
+
+    def saved(self, objects):
+        pass
+
+
+class CouriersStreamView(StreamImportView):
+    object_name = 'courier'
+    fields = COURIER_FIELDS
+
+
+class OrdersStreamView(StreamImportView):
+    object_name = 'order'
+    fields = ORDER_FIELDS
+
+    def saved(self, objects):
+        stats.record_imported(order.region for order in objects)
+        slots.add_orders(objects)
+
+
+def open_batch(courier_id):
+    return DeliveryBatchModel.objects.filter(courier_id=courier_id, open_orders__gt=0).first()
+
+
+def batch_response(batch):
+    # the undelivered orders of a batch and the time it was assigned, for a repeat call
+    return {'orders': [{'id': order_id} for order_id in OrderModel.objects.filter(batch=batch, complete_time=None)
+                       .order_by('order_id').values_list('order_id', flat=True)],
+            'assign_time': batch.assign_time}
+
+
+def drop_assigned(tried, claimed):
+    """
+    Removes the claimed orders from the slot index once the transaction commits, with those of the other tried
+    orders that are assigned already. The rest were only locked for a moment, by a PATCH releasing them or a claim
+    that rolls back, and are still offered.
+    """
+    if not slots.enabled():
+        return
+    skipped = set(tried).difference(claimed)
+    taken = OrderModel.objects.filter(order_id__in=skipped).exclude(assign_time=None) \
+        .values_list('order_id', flat=True) if skipped else []
+    slots.remove_orders(set(claimed).union(taken))
 
 
 class AssignOrdersView(View):
     def assign_orders(self, courier_object):
+        batch = open_batch(courier_object.courier_id)
+        if batch is not None:
+            return batch_response(batch)
         response = {
             'orders': [],
         }
-        query_set = OrderModel.objects.filter(assign_time=None, region__in=courier_object.regions,
-                                              weight__lte=
-                                              courier_capacity_and_salary_coefficient(courier_object.courier_type)[
-                                                  'capacity'])
-        query_set_suitable_delivery_time = time_overlap(query_set, courier_object.working_hours)
-        if query_set_suitable_delivery_time:
-            response['assign_time'] = datetime.now()
-            query_set_suitable_delivery_time.update(courier=courier_object, assign_time=response['assign_time'],
-                                                    courier_salary_coefficient=courier_capacity_and_salary_coefficient(
-                                                        courier_object.courier_type)['salary_coefficient'])
-            for order in query_set_suitable_delivery_time:
-                response['orders'].append({'id': order.order_id})
+        capacity_and_salary_coefficient = courier_capacity_and_salary_coefficient(courier_object.courier_type)
+        open_weight = OrderModel.objects.filter(courier=courier_object, complete_time=None) \
+            .aggregate(Sum('weight'))['weight__sum'] or 0
+        capacity = weight_units(capacity_and_salary_coefficient['capacity']) - weight_units(open_weight)
+        if slots.enabled():
+            candidates = slots.candidates(courier_object.regions, courier_object.working_hours, capacity)
+        else:
+            query_set = OrderModel.objects.filter(assign_time=None, region__in=courier_object.regions,
+                                                  weight__lte=capacity / 100)
+            candidates = order_candidates(time_overlap(query_set, courier_object.working_hours))
+        order_ids = self.claim_orders(candidates, capacity)
+        if order_ids:
+            response['assign_time'] = timezone.now()
+            assign_to_couriers([(order_ids, courier_object.courier_id,
+                                 capacity_and_salary_coefficient['salary_coefficient'])], response['assign_time'])
+            for order_id in order_ids:
+                response['orders'].append({'id': order_id})
         return response
 
+    def claim_orders(self, candidates, capacity):
+        # Rows locked or already taken by a concurrent assign are skipped instead of waited for;
+        # the freed capacity is offered to the remaining candidates.
+        claimed = []
+        tried = set()
+        for attempt in range(settings.ASSIGNMENT_CLAIM_ATTEMPTS):
+            chosen = select_orders(candidates, capacity)
+            if not chosen:
+                break
+            locked = set(OrderModel.objects.select_for_update(skip_locked=True)
+                         .filter(order_id__in=[candidate.order_id for candidate in chosen], assign_time=None)
+                         .values_list('order_id', flat=True))
+            claimed += [candidate for candidate in chosen if candidate.order_id in locked]
+            tried.update(candidate.order_id for candidate in chosen)
+            if len(locked) == len(chosen):
+                break
+            capacity -= sum(candidate.weight for candidate in chosen if candidate.order_id in locked)
+            candidates = [candidate for candidate in candidates if candidate.order_id not in tried]
+        claimed = sorted(candidate.order_id for candidate in claimed)
+        drop_assigned(tried, claimed)
+        return claimed
+
+    @idempotent
     def post(self, request):
-        data = JSONParser().parse(request)
-        serialized_data = OrderAssignSerializer(data=data)
-        if serialized_data.is_valid:
-            try:
-                courier_object = CourierModel.objects.get(courier_id=int(data['courier_id']))
-            except CourierModel.DoesNotExist:
-                return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
-            response = self.assign_orders(courier_object)
-            return JsonResponse(response, status=status.HTTP_200_OK)
+        data = parse(request)
+        serialized_data = get_serializer('assign')(data=data)
+        if serialized_data.is_valid():
+            with transaction.atomic():
+                try:
+                    courier_object = CourierModel.objects.select_for_update().get(
+                        courier_id=serialized_data.validated_data['courier_id'])
+                except CourierModel.DoesNotExist:
+                    return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+                response = self.assign_orders(courier_object)
+            return json_response(response, status=status.HTTP_200_OK)
         return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
 
 
-class OrderCompleteView(View):
-    def calculate_order_delivery_time(self, order_object):
-        completed_orders = OrderModel.objects.filter(courier_id=order_object.courier_id, region=order_object.region) \
-            .exclude(complete_time=None).order_by('-complete_time')
-        if len(completed_orders) == 1:
-            order_object.delivery_time = (order_object.complete_time - order_object.assign_time).total_seconds()
+class BatchAssignOrdersView(View):
+    def assign_orders(self, couriers):
+        response = {}
+        for batch in DeliveryBatchModel.objects.filter(courier__in=couriers, open_orders__gt=0):
+            response[batch.courier_id] = batch_response(batch)
+        couriers = [courier for courier in couriers if courier.courier_id not in response]
+        if not couriers:
+            return response
+        open_weights = dict(OrderModel.objects.filter(courier__in=couriers, complete_time=None).order_by()
+                            .values('courier').annotate(Sum('weight')).values_list('courier', 'weight__sum'))
+        capacities = {courier.courier_id: weight_units(
+            courier_capacity_and_salary_coefficient(courier.courier_type)['capacity']) - weight_units(
+            open_weights.get(courier.courier_id, 0)) for courier in couriers}
+        if slots.enabled():
+            graph = self.index_graph(couriers, capacities)
         else:
-            order_object.delivery_time = (
-                    order_object.complete_time - completed_orders[1].complete_time).total_seconds()
-        order_object.save()
-        return completed_orders
-
-    def update_courier_data(self, courier_id, completed_orders, order_object):
-        courier = CourierModel.objects.get(courier_id=courier_id)
-        average_delivery_time = completed_orders.aggregate(Avg('delivery_time'))['delivery_time__avg']
-        if courier.min_delivery_time is None or average_delivery_time < courier.min_delivery_time:
-            courier.min_delivery_time = average_delivery_time
-            courier.rating = round((60 * 60 - min(courier.min_delivery_time, 60 * 60)) / (60 * 60) * 5, 2)
-        payment_for_order = 500 * order_object.courier_salary_coefficient
-        courier.earnings += payment_for_order
-        courier.save()
+            graph = self.query_graph(couriers, capacities)
+        matching = match_orders(graph, capacities)
+
+        chosen = [candidate.order_id for candidates in matching.values() for candidate in candidates]
+        claimed = set(OrderModel.objects.select_for_update(skip_locked=True)
+                      .filter(order_id__in=chosen, assign_time=None).values_list('order_id', flat=True))
+        drop_assigned(chosen, claimed)
+        assign_time = timezone.now()
+        assignments = []
+        for courier in couriers:
+            order_ids = sorted(candidate.order_id for candidate in matching[courier.courier_id]
+                               if candidate.order_id in claimed)
+            response[courier.courier_id] = {'orders': [{'id': order_id} for order_id in order_ids]}
+            if order_ids:
+                response[courier.courier_id]['assign_time'] = assign_time
+                assignments.append((order_ids, courier.courier_id, courier_capacity_and_salary_coefficient(
+                    courier.courier_type)['salary_coefficient']))
+        if assignments:
+            assign_to_couriers(assignments, assign_time)
+        return response
+
+    def query_graph(self, couriers, capacities):
+        query_set = OrderModel.objects.filter(assign_time=None,
+                                              region__in=set().union(*(courier.regions for courier in couriers)),
+                                              weight__lte=max(capacities.values()) / 100)
+        query_set = time_overlap(query_set, [time_range for courier in couriers
+                                             for time_range in courier.working_hours])
 
+        working_intervals = {courier.courier_id: minute_intervals(courier.working_hours) for courier in couriers}
+        graph = []
+        for order_id, weight, region, delivery_hours in query_set.values_list('order_id', 'weight', 'region',
+                                                                                'delivery_hours'):
+            candidate = order_candidate(order_id, weight, delivery_hours)
+            delivery_intervals = minute_intervals(delivery_hours)
+            courier_ids = [courier.courier_id for courier in couriers
+                           if region in courier.regions and candidate.weight <= capacities[courier.courier_id]
+                           and overlaps(working_intervals[courier.courier_id], delivery_intervals)]
+            if courier_ids:
+                graph.append((candidate, courier_ids))
+        return graph
+
+    def index_graph(self, couriers, capacities):
+        edges = {}
+        for courier in couriers:
+            for candidate in slots.candidates(courier.regions, courier.working_hours,
+                                              capacities[courier.courier_id]):
+                edges.setdefault(candidate.order_id, (candidate, []))[1].append(courier.courier_id)
+        return list(edges.values())
+
+    @idempotent
     def post(self, request):
-        data = JSONParser().parse(request)
-        serialized_data = OrderCompleteSerializer(data=data)
+        data = parse(request)
+        serialized_data = OrderBatchAssignSerializer(data=data)
         if serialized_data.is_valid():
-            try:
-                order_object = OrderModel.objects.get(courier_id=data['courier_id'], order_id=data['order_id'],
-                                                      complete_time=None)
-            except OrderModel.DoesNotExist:
-                return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
-            order_object.complete_time = serialized_data.validated_data['complete_time']
-            order_object.save()
-            completed_orders = self.calculate_order_delivery_time(order_object)
-            self.update_courier_data(data['courier_id'], completed_orders, order_object)
-            return JsonResponse({'order_id': data['order_id']}, status=status.HTTP_200_OK)
+            courier_ids = list(dict.fromkeys(serialized_data.validated_data['courier_ids']))
+            with transaction.atomic():
+                couriers = list(CourierModel.objects.select_for_update().filter(courier_id__in=courier_ids)
+                                .order_by('courier_id'))
+                if len(couriers) != len(courier_ids):
+                    return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+                response = self.assign_orders(couriers)
+            return json_response({'couriers': [dict(courier_id=courier_id, **response[courier_id])
+                                               for courier_id in courier_ids]}, status=status.HTTP_200_OK)
+        return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+
+
+class OrderCompleteView(View):
+    @idempotent
+    def post(self, request):
+        data = parse(request)
+        serialized_data = get_serializer('complete')(data=data)
+        if serialized_data.is_valid():
+            with transaction.atomic():
+                if complete_orders([serialized_data.validated_data]):
+                    return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+            return json_response({'order_id': data['order_id']}, status=status.HTTP_200_OK)
         return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+
+
+class BatchOrderCompleteView(View):
+    """
+    Completes many orders in one transaction, in complete_time order. Items that are invalid or whose order is not
+    open for the courier are reported and skipped, the others are completed.
+    """
+    @idempotent
+    def post(self, request):
+        data = parse(request)
+        items = data.get('data') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not 0 < len(items) <= settings.COMPLETE_BATCH_MAX_SIZE:
+            return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+        rejects = {}
+        valid = []
+        for position, item in enumerate(items):
+            # the same errors of each field as the stream imports report, whatever the codec
+            validated, errors = validate_row(COMPLETE_FIELDS, item)
+            if errors:
+                rejects[position] = errors
+            else:
+                valid.append((position, validated))
+        with transaction.atomic():
+            for rejected in complete_orders([item for _, item in valid]):
+                rejects[valid[rejected][0]] = {api_settings.NON_FIELD_ERRORS_KEY: [NOT_OPEN]}
+        response = {'orders': [{'id': items[position]['order_id']} for position, _ in valid
+                               if position not in rejects]}
+        if rejects:
+            response['validation_error'] = {'orders': [
+                {'id': items[position].get('order_id') if isinstance(items[position], dict) else None,
+                 'position': position, 'errors': errors} for position, errors in sorted(rejects.items())]}
+        return json_response(response, status=status.HTTP_200_OK)
+
+
+def average_delivery_time(delivery_time_sum, completed_orders):
+    return round(delivery_time_sum / completed_orders, 2) if completed_orders else None
+
+
+class StatsView(View):
+    def get(self, request):
+        totals = {counter: total or 0 for counter, total in RegionStatsModel.objects.aggregate(
+            **{counter: Sum(counter) for counter in stats.REGION_COUNTERS}).items()}
+        totals['average_delivery_time'] = average_delivery_time(totals.pop('delivery_time_sum'),
+                                                                totals['completed_orders'])
+        totals['earnings'] = CourierTypeStatsModel.objects.aggregate(Sum('earnings'))['earnings__sum'] or 0
+        return json_response(totals, status=status.HTTP_200_OK)
+
+
+class RegionStatsView(View):
+    def get(self, request):
+        try:
+            hours = int(request.GET.get('hours', settings.STATS_THROUGHPUT_HOURS))
+        except ValueError:
+            return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= hours <= settings.STATS_MAX_HOURS:
+            return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
+        # the current hour and the ones before it
+        since = stats.completion_hour(timezone.now()) - timedelta(hours=hours - 1)
+        recent = dict(RegionHourStatsModel.objects.filter(hour__gte=since).order_by().values('region')
+                      .annotate(Sum('completed_orders')).values_list('region', 'completed_orders__sum'))
+        regions = []
+        for region in RegionStatsModel.objects.order_by('region'):
+            regions.append({
+                'region': region.region,
+                'unassigned_orders': region.unassigned_orders,
+                'assigned_orders': region.assigned_orders,
+                'completed_orders': region.completed_orders,
+                'average_delivery_time': average_delivery_time(region.delivery_time_sum, region.completed_orders),
+                'throughput': round(recent.get(region.region, 0) / hours, 2)})
+        return json_response({'hours': hours, 'regions': regions}, status=status.HTTP_200_OK)
+
+
+class CourierTypeStatsView(View):
+    def get(self, request):
+        by_type = {row.courier_type: row for row in CourierTypeStatsModel.objects.all()}
+        courier_types = []
+        for courier_type, _ in TYPE_CHOICES:
+            row = by_type.get(courier_type, CourierTypeStatsModel(courier_type=courier_type))
+            courier_types.append({'courier_type': courier_type, 'completed_orders': row.completed_orders,
+                                  'earnings': row.earnings})
+        return json_response({'courier_types': courier_types}, status=status.HTTP_200_OK)
+
+
+class MetricsView(View):
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,60 @@
+"""
+Production serving profile: gunicorn -c gunicorn.conf.py online_store.wsgi
+
+GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker with online_store.asgi serves the async views instead.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# Django, the URL conf and the views are imported once in the master and shared by the forked workers
+preload_app = True
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+keepalive = 5
+accesslog = None
+
+# the workers write their metrics to this directory, so that /metrics served by any of them covers all of them
+created_metrics_dir = not os.environ.get('METRICS_DIR')
+if created_metrics_dir:
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='delivery_service_metrics_')
+
+
+def on_starting(server):
+    # runs after the application is preloaded; the workers and process_outbox would each invalidate their own copy
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+    if settings.COURIER_CACHE_TIMEOUT and settings.PROCESS_LOCAL_CACHE:
+        raise ImproperlyConfigured('COURIER_CACHE_TIMEOUT needs a CACHE_BACKEND shared by all processes')
+    # the metrics of an earlier run of the server are not counted again
+    metrics_dir = os.environ['METRICS_DIR']
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        if name.endswith('.json'):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def post_fork(server, worker):
+    # connections opened while preloading must not be shared between processes
+    from django.db import connections
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    from delivery_service import metrics
+    metrics.shared.flush()
+
+
+def child_exit(server, worker):
+    from delivery_service import metrics
+    metrics.shared.fold(worker.pid)
+
+
+def on_exit(server):
+    if created_metrics_dir:
+        shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
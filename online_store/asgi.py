@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'online_store.settings')
+os.environ.setdefault('ASYNC_VIEWS', '1')
 
-application = get_asgi_application()
+# get_asgi_application(), with a handler that streams the NDJSON import responses
+django.setup(set_prefix=False)
+
+from delivery_service.async_views import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
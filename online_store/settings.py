@@ -27,6 +27,10 @@ DEBUG = int(os.environ.get("DEBUG", default=1))
 
 ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", 'localhost 127.0.0.1 [::1]').split(" ")
 
+# Serve only the JSON API: without the admin, auth, sessions, messages, static files and templates, their
+# middleware and the /admin/ URLs, for faster worker start and less work per request
+API_ONLY = bool(int(os.environ.get("API_ONLY", 0)))
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -39,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'delivery_service.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +71,24 @@ TEMPLATES = [
     },
 ]
 
+if API_ONLY:
+    INSTALLED_APPS = [
+        'delivery_service',
+        'rest_framework',
+    ]
+    MIDDLEWARE = [
+        'delivery_service.metrics.MetricsMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+    TEMPLATES = []
+    # the endpoints are plain Django views, DRF is only used for serializers
+    REST_FRAMEWORK = {
+        'DEFAULT_AUTHENTICATION_CLASSES': [],
+        'DEFAULT_PERMISSION_CLASSES': [],
+        'UNAUTHENTICATED_USER': None,
+    }
+
 WSGI_APPLICATION = 'online_store.wsgi.application'
 
 # Database
@@ -79,9 +102,91 @@ DATABASES = {
         "PASSWORD": os.environ.get("SQL_PASSWORD", "4474"),
         "HOST": os.environ.get("SQL_HOST", "localhost"),
         "PORT": os.environ.get("SQL_PORT", "5432"),
+        # Seconds a connection is kept open between requests, 0 closes it after every request
+        "CONN_MAX_AGE": int(os.environ.get("SQL_CONN_MAX_AGE", 0)),
+        # Required behind a transaction-mode pooler such as pgbouncer
+        "DISABLE_SERVER_SIDE_CURSORS": bool(int(os.environ.get("SQL_DISABLE_SERVER_SIDE_CURSORS", 0))),
     }
 }
 
+# Check persistent connections with a round trip at the start of a request and reopen broken ones; a connection
+# that finished a request less than SQL_CONN_HEALTH_CHECK_IDLE seconds ago is not checked
+CONN_HEALTH_CHECKS = bool(int(os.environ.get("SQL_CONN_HEALTH_CHECKS", 1)))
+CONN_HEALTH_CHECK_IDLE = float(os.environ.get("SQL_CONN_HEALTH_CHECK_IDLE", 10))
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "delivery_service"),
+    }
+}
+
+# Seconds a rendered GET /couriers/<id> response stays cached, 0 disables the cache. PATCH and the process_outbox
+# worker invalidate it through the cache backend, so it needs a backend shared by all processes (memcached in
+# docker-compose): with the process-local locmem backend it is off by default, and gunicorn.conf.py refuses to
+# start with it turned on
+PROCESS_LOCAL_CACHE = CACHES["default"]["BACKEND"] == "django.core.cache.backends.locmem.LocMemCache"
+COURIER_CACHE_TIMEOUT = int(os.environ.get("COURIER_CACHE_TIMEOUT", 0 if PROCESS_LOCAL_CACHE else 300))
+
+# Request parsing, validation and rendering of the hot endpoints: 'fast' (delivery_service.codec,
+# orjson when installed) or 'drf' (the serializers in delivery_service.serializers)
+SERIALIZER_CODEC = os.environ.get("SERIALIZER_CODEC", "fast")
+
+# Number of rows per SELECT/INSERT statement when importing couriers and orders in bulk
+BULK_IMPORT_BATCH_SIZE = int(os.environ.get("BULK_IMPORT_BATCH_SIZE", 1000))
+# Longest line accepted by the NDJSON imports POST /couriers/stream and POST /orders/stream, in bytes
+STREAM_IMPORT_MAX_LINE_LENGTH = int(os.environ.get("STREAM_IMPORT_MAX_LINE_LENGTH", 64 * 1024))
+# Rows per COPY and merge of the load_couriers and load_orders commands
+BULK_LOAD_BATCH_SIZE = int(os.environ.get("BULK_LOAD_BATCH_SIZE", 10000))
+
+# How /orders/assign packs orders into a courier's capacity: 'greedy' (earliest delivery window first),
+# 'knapsack' (as many orders as the lightest first fit, the heaviest of them found by a DP over a window of
+# ASSIGNMENT_KNAPSACK_MAX_ITEMS orders at the end of that prefix, the lightest ones when it takes longer than
+# ASSIGNMENT_TIME_BUDGET seconds) or 'budgeted' (lightest first, then heavier swaps for at most ASSIGNMENT_TIME_BUDGET
+# seconds). Both run while the courier and its orders are locked
+ASSIGNMENT_ENGINE = os.environ.get("ASSIGNMENT_ENGINE", "knapsack")
+ASSIGNMENT_KNAPSACK_MAX_ITEMS = int(os.environ.get("ASSIGNMENT_KNAPSACK_MAX_ITEMS", 64))
+ASSIGNMENT_TIME_BUDGET = float(os.environ.get("ASSIGNMENT_TIME_BUDGET", 0.05))
+# Selection rounds when orders picked for a courier are claimed concurrently by another assign
+ASSIGNMENT_CLAIM_ATTEMPTS = int(os.environ.get("ASSIGNMENT_CLAIM_ATTEMPTS", 3))
+# Find a courier's candidate orders in an in-process bitmap index of the unassigned orders (delivery_service.slots,
+# needs NumPy) instead of an SQL interval overlap query. The index is rebuilt in the background every
+# ASSIGNMENT_SLOT_INDEX_MAX_AGE seconds to pick up orders imported by other processes, 0 never rebuilds it
+ASSIGNMENT_SLOT_INDEX = int(os.environ.get("ASSIGNMENT_SLOT_INDEX", 0))
+ASSIGNMENT_SLOT_INDEX_MAX_AGE = float(os.environ.get("ASSIGNMENT_SLOT_INDEX_MAX_AGE", 60))
+
+# Completed orders are moved to the archive table by `manage.py archive_orders` this many hours after completion,
+# ORDER_ARCHIVE_BATCH_SIZE orders per transaction
+ORDER_ARCHIVE_AFTER_HOURS = float(os.environ.get("ORDER_ARCHIVE_AFTER_HOURS", 24))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.environ.get("ORDER_ARCHIVE_BATCH_SIZE", 5000))
+
+# Items accepted by one POST /orders/complete/batch
+COMPLETE_BATCH_MAX_SIZE = int(os.environ.get("COMPLETE_BATCH_MAX_SIZE", 1000))
+
+# Responses of POST /orders/assign, /orders/assign/batch, /orders/complete and /orders/complete/batch sent with an
+# Idempotency-Key header are replayed for retries with the same key for this many hours;
+# `manage.py purge_idempotency_keys` deletes expired keys
+IDEMPOTENCY_KEY_TTL = float(os.environ.get("IDEMPOTENCY_KEY_TTL", 24))
+# Larger responses are not stored, their retries run again
+IDEMPOTENCY_MAX_RESPONSE_SIZE = int(os.environ.get("IDEMPOTENCY_MAX_RESPONSE_SIZE", 64 * 1024))
+
+# GET /stats/regions reports the throughput over this many last hours by default (?hours=), at most STATS_MAX_HOURS
+STATS_THROUGHPUT_HOURS = int(os.environ.get("STATS_THROUGHPUT_HOURS", 24))
+STATS_MAX_HOURS = int(os.environ.get("STATS_MAX_HOURS", 24 * 30))
+
+# Route the endpoints through delivery_service.async_views (set by online_store/asgi.py); blocking work runs on
+# ASYNC_DB_THREADS threads and GET /couriers/<id> reads through an asyncpg pool of ASYNC_DB_POOL_SIZE connections
+ASYNC_VIEWS = bool(int(os.environ.get("ASYNC_VIEWS", 0)))
+ASYNC_DB_THREADS = int(os.environ.get("ASYNC_DB_THREADS", 8))
+ASYNC_DB_POOL_SIZE = int(os.environ.get("ASYNC_DB_POOL_SIZE", 4))
+
+# Per-view request latency, SQL queries and time, serializer time and response size exported on /metrics
+METRICS_ENABLED = bool(int(os.environ.get("METRICS_ENABLED", 1)))
+# A directory shared by the processes of one server: each writes its metrics there every METRICS_FLUSH_INTERVAL
+# seconds and /metrics adds them up (set by gunicorn.conf.py); empty keeps the metrics of each process to itself
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
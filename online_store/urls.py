@@ -1,7 +1,11 @@
-from django.contrib import admin
+from django.conf import settings
 from django.urls import include, path
 
 urlpatterns = [
     path('', include('delivery_service.urls')),
-    path('admin/', admin.site.urls),
 ]
+
+if not settings.API_ONLY:
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))